@@ -6,9 +6,14 @@ import com.squareup.moshi.JsonClass
 
 @JsonClass(generateAdapter = true)
 data class ProcessOutfitRequest(
-    val image: String  // base64-encoded JPEG
+    val image: String,  // base64-encoded JPEG
+    val embedding_encoding: String = EMBEDDING_ENCODING
 )
 
+// Embeddings come back as an opaque base64 blob (float16) that is only ever
+// sent back to /confirm-match or /add-new-item, never inspected on-device.
+const val EMBEDDING_ENCODING = "float16"
+
 @JsonClass(generateAdapter = true)
 data class ItemMatchResult(
     val matched: Boolean,
@@ -16,7 +21,7 @@ data class ItemMatchResult(
     val similarity: Double? = null,
     val image_url: String? = null,
     val cropped_url: String? = null,
-    val embedding: List<Double>? = null
+    val embedding: String? = null
 )
 
 @JsonClass(generateAdapter = true)
@@ -34,7 +39,8 @@ data class ProcessOutfitResponse(
 data class ProcessManualCropRequest(
     val original_image: String,
     val shirt_image: String? = null,
-    val pants_image: String? = null
+    val pants_image: String? = null,
+    val embedding_encoding: String = EMBEDDING_ENCODING
 )
 
 // --- Confirm Match ---
@@ -45,7 +51,7 @@ data class ConfirmMatchRequest(
     val item_type: String,
     val original_photo_url: String,
     val similarity_score: Double? = null,
-    val embedding: List<Double>? = null,
+    val embedding: String? = null,
     val cropped_url: String? = null,
     val worn_at: String? = null
 )
@@ -64,7 +70,7 @@ data class ConfirmMatchResponse(
 data class AddNewItemRequest(
     val item_type: String,
     val cropped_image_url: String,
-    val embedding: List<Double>,
+    val embedding: String,
     val original_photo_url: String,
     val log_wear: Boolean
 )
@@ -82,6 +88,8 @@ data class ItemStats(
     val id: String,
     val type: String,
     val image_url: String,
+    val thumbnail_url: String? = null,
+    val thumbnail_hash: String? = null,
     val wear_count: Int,
     val last_worn: String?,
     val days_since_worn: Int?
@@ -140,6 +148,8 @@ data class ItemListEntry(
     val id: String,
     val image_url: String,
     val image_hash: String? = null,
+    val thumbnail_url: String? = null,
+    val thumbnail_hash: String? = null,
     val wear_count: Int,
     val last_worn: String?,
     val days_since_worn: Int?
@@ -32,7 +32,7 @@ class OutfitRepository @Inject constructor(
         itemType: String,
         originalPhotoUrl: String,
         similarityScore: Double? = null,
-        embedding: List<Double>? = null,
+        embedding: String? = null,
         croppedUrl: String? = null,
         wornAt: String? = null
     ): ConfirmMatchResponse {
@@ -56,7 +56,7 @@ class OutfitRepository @Inject constructor(
     suspend fun addNewItem(
         itemType: String,
         croppedImageUrl: String,
-        embedding: List<Double>,
+        embedding: String,
         originalPhotoUrl: String,
         logWear: Boolean
     ): AddNewItemResponse {
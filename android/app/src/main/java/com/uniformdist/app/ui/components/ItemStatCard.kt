@@ -33,7 +33,7 @@ fun ItemStatCard(
             verticalAlignment = Alignment.CenterVertically
         ) {
             AsyncImage(
-                model = item.image_url,
+                model = item.thumbnail_url ?: item.image_url,
                 contentDescription = "${item.type} image",
                 modifier = Modifier
                     .size(72.dp)
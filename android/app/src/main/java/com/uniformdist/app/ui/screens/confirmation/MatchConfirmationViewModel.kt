@@ -86,7 +86,7 @@ class MatchConfirmationViewModel @Inject constructor(
                 repository.addNewItem(
                     itemType = itemType,
                     croppedImageUrl = item.cropped_url ?: "",
-                    embedding = item.embedding ?: emptyList(),
+                    embedding = item.embedding ?: "",
                     originalPhotoUrl = _uiState.value.matchResults?.original_photo_url ?: "",
                     logWear = true
                 )
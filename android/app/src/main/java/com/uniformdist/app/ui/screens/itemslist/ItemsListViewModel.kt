@@ -96,11 +96,15 @@ class ItemsListViewModel @Inject constructor(
     /**
      * Coil request for an item's thumbnail: fetched from the (rotating) signed
      * URL but cached under the stable content hash, so later loads hit the disk
-     * cache instead of the network.
+     * cache instead of the network. Uses the server-side thumbnail when the item
+     * has one, else the full crop.
      */
     fun buildImageRequest(item: ItemListEntry): ImageRequest {
-        val builder = ImageRequest.Builder(context).data(item.image_url)
-        item.image_hash?.takeIf { it.isNotBlank() }?.let { hash ->
+        val hasThumbnail = !item.thumbnail_url.isNullOrBlank()
+        val url = if (hasThumbnail) item.thumbnail_url else item.image_url
+        val cacheHash = if (hasThumbnail) item.thumbnail_hash else item.image_hash
+        val builder = ImageRequest.Builder(context).data(url)
+        cacheHash?.takeIf { it.isNotBlank() }?.let { hash ->
             builder.memoryCacheKey(hash)
                 .diskCacheKey(hash)
                 .memoryCachePolicy(CachePolicy.ENABLED)
@@ -25,6 +25,7 @@ class ModelSerializationTest {
 
         assertTrue(json.contains("\"image\""))
         assertTrue(json.contains("\"base64data\""))
+        assertTrue(json.contains("\"embedding_encoding\":\"float16\""))
     }
 
     @Test
@@ -39,7 +40,7 @@ class ModelSerializationTest {
                 "similarity": 0.92,
                 "image_url": "https://example.com/shirt.jpg",
                 "cropped_url": "https://example.com/cropped.jpg",
-                "embedding": [0.1, 0.2, 0.3]
+                "embedding": "AWYuZjLNNA=="
             },
             "pants": null
         }
@@ -67,7 +68,7 @@ class ModelSerializationTest {
             "shirt": {
                 "matched": false,
                 "cropped_url": "https://example.com/cropped.jpg",
-                "embedding": [0.1, 0.2, 0.3]
+                "embedding": "AWYuZjLNNA=="
             },
             "pants": {
                 "matched": true,
@@ -149,7 +150,7 @@ class ModelSerializationTest {
         val request = AddNewItemRequest(
             item_type = "pants",
             cropped_image_url = "gs://bucket/cropped.jpg",
-            embedding = listOf(0.1, 0.2, 0.3),
+            embedding = "AWYuZjLNNA==",
             original_photo_url = "gs://bucket/photo.jpg",
             log_wear = true
         )
@@ -193,7 +194,7 @@ class ModelSerializationTest {
             pants = ItemMatchResult(
                 matched = false,
                 cropped_url = "https://img.com/p_crop.jpg",
-                embedding = listOf(0.1, 0.2)
+                embedding = "AWYuZjI="
             ),
             original_photo_url = "gs://bucket/photo.jpg"
         )
@@ -93,7 +93,7 @@ class OutfitRepositoryTest {
         val result = repository.addNewItem(
             itemType = "pants",
             croppedImageUrl = "gs://bucket/cropped.jpg",
-            embedding = listOf(0.1, 0.2, 0.3),
+            embedding = "AWYuZjLNNA==",
             originalPhotoUrl = "gs://bucket/photo.jpg",
             logWear = true
         )
@@ -118,7 +118,7 @@ class MatchConfirmationViewModelTest {
             pants = ItemMatchResult(
                 matched = false,
                 cropped_url = "gs://cropped.jpg",
-                embedding = listOf(0.1, 0.2)
+                embedding = "AWYuZjI="
             ),
             original_photo_url = "gs://photo.jpg"
         )
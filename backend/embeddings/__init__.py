@@ -1,4 +1,4 @@
 from .vertex_embedder import VertexEmbedder
-from .similarity import cosine_similarity, find_most_similar
+from .similarity import cosine_similarity, find_most_similar, search_matrix, stack_candidates
 
-__all__ = ['VertexEmbedder', 'cosine_similarity', 'find_most_similar']
+__all__ = ['VertexEmbedder', 'cosine_similarity', 'find_most_similar', 'search_matrix', 'stack_candidates']
@@ -0,0 +1,180 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+from google.cloud import firestore
+
+from . import embedding_codec
+
+
+EMBEDDING_CACHE_COLLECTION = 'embedding_cache'
+
+# Embeddings are tied to the model that produced them; bump on model change
+CACHE_MODEL = 'multimodalembedding@001'
+
+# How long a cached embedding is trusted. The Firestore tier also stores the
+# expiry in `expires_at` so a TTL policy on that field can purge old docs.
+CACHE_TTL_SECONDS = int(os.getenv('EMBEDDING_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+
+# In-memory LRU bound (1408 floats ~ 11 KB as a Python list per entry)
+CACHE_MAX_ENTRIES = int(os.getenv('EMBEDDING_CACHE_MAX_ENTRIES', '512'))
+
+
+def content_key(image_bytes: bytes) -> str:
+    """SHA-256 hex digest of the exact bytes sent to the embedding model."""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of crop embeddings keyed by content hash.
+
+    Lookups hit the in-memory LRU first, then the Firestore collection
+    (one batched read for all memory misses). Persistent hits are promoted
+    into memory. The Firestore tier is best-effort: if it errors, the cache
+    degrades to memory-only rather than failing the request.
+    """
+
+    def __init__(self, db: Optional[firestore.Client] = None,
+                 ttl_seconds: int = CACHE_TTL_SECONDS,
+                 max_entries: int = CACHE_MAX_ENTRIES):
+        self.db = db
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()  # key -> (embedding, expires_at)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        Look up several keys.
+
+        Args:
+            keys: Content hashes (see content_key)
+
+        Returns:
+            key -> embedding for every key found and not expired
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        now = time.time()
+
+        with self._lock:
+            for key in keys:
+                entry = self._memory.get(key)
+                if entry is None:
+                    continue
+                if entry[1] <= now:
+                    del self._memory[key]
+                    continue
+                self._memory.move_to_end(key)
+                found[key] = entry[0]
+            self.memory_hits += len(found)
+
+        remaining = [key for key in keys if key not in found]
+        if remaining and self.db is not None:
+            persisted = self._read_persistent(remaining)
+            if persisted:
+                self._remember(persisted)
+                found.update(persisted)
+            with self._lock:
+                self.persistent_hits += len(persisted)
+
+        with self._lock:
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, embeddings: Dict[str, List[float]]) -> None:
+        """
+        Store freshly generated embeddings in both tiers.
+
+        Args:
+            embeddings: key -> embedding
+        """
+        if not embeddings:
+            return
+        self._remember(embeddings)
+        if self.db is not None:
+            self._write_persistent(embeddings)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current memory tier size."""
+        with self._lock:
+            lookups = self.memory_hits + self.persistent_hits + self.misses
+            hits = self.memory_hits + self.persistent_hits
+            return {
+                'memory_hits': self.memory_hits,
+                'persistent_hits': self.persistent_hits,
+                'misses': self.misses,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'size': len(self._memory),
+            }
+
+    def _remember(self, embeddings: Dict[str, List[float]]) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            for key, embedding in embeddings.items():
+                self._memory[key] = (embedding, expires_at)
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _read_persistent(self, keys: List[str]) -> Dict[str, List[float]]:
+        collection = self.db.collection(EMBEDDING_CACHE_COLLECTION)
+        now = datetime.now(timezone.utc)
+        found = {}
+        try:
+            for snap in self.db.get_all([collection.document(key) for key in keys]):
+                if not snap.exists:
+                    continue
+                data = snap.to_dict()
+                # TTL deletion lags by up to a day; check expiry ourselves
+                expires_at = data.get('expires_at')
+                if data.get('model') != CACHE_MODEL or (expires_at and expires_at <= now):
+                    continue
+                # Packed (float16) entries, or lists written before the codec existed
+                found[snap.id] = embedding_codec.to_wire(data['embedding'])
+        except Exception as e:
+            print(f"Embedding cache read failed: {e}")
+        return found
+
+    def _write_persistent(self, embeddings: Dict[str, List[float]]) -> None:
+        collection = self.db.collection(EMBEDDING_CACHE_COLLECTION)
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)
+        try:
+            batch = self.db.batch()
+            for key, embedding in embeddings.items():
+                batch.set(collection.document(key), {
+                    'embedding': embedding_codec.encode(embedding),
+                    'model': CACHE_MODEL,
+                    'created_at': firestore.SERVER_TIMESTAMP,
+                    'expires_at': expires_at,
+                })
+            batch.commit()
+        except Exception as e:
+            print(f"Embedding cache write failed: {e}")
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache(db: Optional[firestore.Client] = None) -> EmbeddingCache:
+    """
+    Return the process-wide embedding cache.
+
+    The memory tier is shared by every request on a warm instance. The
+    Firestore tier is attached the first time a client is passed in.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache(db)
+        elif _cache.db is None and db is not None:
+            _cache.db = db
+        return _cache
@@ -0,0 +1,107 @@
+import base64
+import os
+import struct
+from typing import Optional, Sequence, Union
+import numpy as np
+
+
+# Compact embedding encoding, used both for Firestore storage and on the wire.
+#
+# A packed embedding is a bytes blob: one tag byte, then the payload.
+#   TAG_FLOAT16: D little-endian float16 values
+#   TAG_INT8:    little-endian float32 scale, then D int8 values (x ~= q * scale)
+# 1408 dims: float16 is 2.8 KB and int8 1.4 KB, against ~11 KB as doubles
+# (and ~20 KB as a JSON list). Transport uses the base64 of the same blob.
+TAG_FLOAT16 = 1
+TAG_INT8 = 2
+
+CODECS = {'float16': TAG_FLOAT16, 'int8': TAG_INT8}
+
+# Codec for stored samples ('float16', 'int8', or 'list' for legacy arrays)
+STORAGE_CODEC = os.getenv('EMBEDDING_STORAGE_CODEC', 'float16')
+
+_SCALE = struct.Struct('<f')
+
+Embedding = Union[bytes, str, Sequence[float], np.ndarray]
+
+
+def encode(embedding: Sequence[float], codec: str = 'float16') -> bytes:
+    """
+    Pack an embedding into a tagged bytes blob.
+
+    Args:
+        embedding: Float vector
+        codec: 'float16' or 'int8' (symmetric, one scale per vector)
+
+    Returns:
+        Packed bytes
+    """
+    vec = np.asarray(embedding, dtype=np.float32)
+    if codec == 'float16':
+        return bytes([TAG_FLOAT16]) + vec.astype('<f2').tobytes()
+    if codec == 'int8':
+        peak = float(np.abs(vec).max()) if vec.size else 0.0
+        scale = peak / 127.0 if peak > 0 else 1.0
+        quantized = np.clip(np.rint(vec / scale), -127, 127).astype(np.int8)
+        return bytes([TAG_INT8]) + _SCALE.pack(scale) + quantized.tobytes()
+    raise ValueError(f"Unknown embedding codec: {codec}")
+
+
+def decode(value: Embedding) -> np.ndarray:
+    """
+    Read an embedding in any supported form as a float32 vector.
+
+    Accepts packed bytes (Firestore), their base64 string (wire), or a plain
+    list / array of floats (legacy docs and clients). The packed payload is
+    viewed with np.frombuffer, not parsed element by element.
+
+    Raises:
+        ValueError: If the value is not a recognised encoding
+    """
+    if isinstance(value, str):
+        value = base64.b64decode(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        data = memoryview(value)
+        if len(data) == 0:
+            raise ValueError("Empty embedding blob")
+        tag = data[0]
+        if tag == TAG_FLOAT16:
+            return np.frombuffer(data, dtype='<f2', offset=1).astype(np.float32)
+        if tag == TAG_INT8:
+            (scale,) = _SCALE.unpack_from(data, 1)
+            quantized = np.frombuffer(data, dtype=np.int8, offset=1 + _SCALE.size)
+            return quantized.astype(np.float32) * np.float32(scale)
+        raise ValueError(f"Unknown embedding tag: {tag}")
+    return np.asarray(value, dtype=np.float32)
+
+
+def encode_for_storage(embedding: Embedding) -> Union[bytes, list]:
+    """
+    Firestore value for one sample under STORAGE_CODEC.
+
+    Already-packed samples are kept byte for byte, so rewriting an item's
+    map (e.g. when a sample is appended) never re-quantizes existing ones.
+    """
+    if isinstance(embedding, (bytes, bytearray)):
+        return bytes(embedding)
+    if STORAGE_CODEC == 'list':
+        return decode(embedding).astype(float).tolist()
+    return encode(decode(embedding), STORAGE_CODEC)
+
+
+def to_wire(embedding: Embedding, codec: Optional[str] = None) -> Union[str, list]:
+    """
+    JSON value for an embedding sent to a client.
+
+    Args:
+        embedding: Embedding in any form accepted by decode
+        codec: 'float16' or 'int8' for a base64 blob; None for a plain list
+            (what clients that don't ask for an encoding expect)
+    """
+    if codec is None:
+        if isinstance(embedding, list):
+            return embedding
+        return decode(embedding).astype(float).tolist()
+    if codec not in CODECS:
+        raise ValueError(f"Unknown embedding codec: {codec}")
+    return base64.b64encode(encode(decode(embedding), codec)).decode('ascii')
@@ -0,0 +1,607 @@
+import os
+import time
+import threading
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from google.cloud import firestore
+
+from .similarity import ExactMatcher, Matcher, create_matcher, search_matrix
+from .embedding_store import (ITEM_EMBEDDINGS_COLLECTION, stream_type_embeddings,
+                              stream_unmigrated_embeddings)
+from . import embedding_codec
+from . import index_snapshot
+
+
+INDEX_VERSIONS_COLLECTION = 'index_versions'
+INDEX_TOMBSTONES_COLLECTION = 'index_tombstones'
+
+# Replays re-read everything updated within this margin of the last sync, to
+# absorb clock skew between this instance and Firestore commit timestamps.
+REPLAY_MARGIN = timedelta(seconds=60)
+
+# How often a warm index re-reads its version doc; 0 (default) checks on every
+# request, one small read. Writers (confirm-match, add-new-item) are separate
+# functions, so with N > 0 a process-outfit instance can miss an item added in
+# the last N seconds and offer a duplicate "new item" for a repeated photo.
+VERSION_CHECK_SECONDS = float(os.getenv('EMBEDDING_INDEX_CHECK_SECONDS', '0'))
+
+# 'versioned' (default) re-validates against index_versions; 'listener' keeps
+# the indexes current from an on_snapshot listener on item_embeddings instead.
+INDEX_MODE = os.getenv('EMBEDDING_INDEX_MODE', 'versioned')
+
+# How long a cold request waits for the listener's initial snapshot before
+# falling back to a one-off versioned build.
+LISTENER_READY_SECONDS = float(os.getenv('EMBEDDING_INDEX_LISTENER_READY_SECONDS', '10'))
+
+# Nearest-neighbour backend: 'exact', 'ivf' or 'hnsw' (see embeddings/similarity.py)
+MATCHER_BACKEND = os.getenv('MATCHER_BACKEND', 'exact')
+
+# 'centroid' (default) searches one normalized mean vector per item, then
+# reranks the samples of the closest MATCH_RERANK_ITEMS items exactly;
+# 'samples' searches every sample of every item.
+MATCH_STRATEGY = os.getenv('MATCH_STRATEGY', 'centroid')
+MATCH_RERANK_ITEMS = int(os.getenv('MATCH_RERANK_ITEMS', '8'))
+
+# An ANN matcher (ivf / hnsw) is rebuilt in the background once this share of
+# its rows were removed but still occupy it; until then removals are masked.
+REBUILD_STALE_FRACTION = float(os.getenv('MATCHER_REBUILD_STALE_FRACTION', '0.2'))
+
+
+class EmbeddingIndex:
+    """
+    In-memory embedding matrix for one item type.
+
+    Holds every sample of every item as float32 rows, plus each item's
+    centroid (normalized mean of its samples, kept current as samples are
+    upserted). With the 'centroid' strategy the Matcher backend indexes one
+    centroid per item and only the top items' samples are scored exactly;
+    with 'samples' it indexes every sample. Changes are applied to the built
+    matcher in place (rows added, or removed and re-added). ANN matchers are
+    (re)built on a background thread, never inside search(): until the new
+    one is ready, search keeps using the old one, or an exact scan if there
+    is none yet.
+    ``version`` mirrors the counter in ``index_versions/{item_type}``;
+    writers bump it so other instances know to replay recent changes.
+    """
+
+    def __init__(self, item_type: str, backend: Optional[str] = None,
+                 strategy: Optional[str] = None):
+        self.item_type = item_type
+        self.backend = backend or MATCHER_BACKEND
+        self.strategy = strategy or MATCH_STRATEGY
+        self.version = None
+        self.checked_at = 0.0
+        self.synced_at: Optional[datetime] = None
+        self._samples: Dict[str, np.ndarray] = {}
+        self._centroids: Dict[str, np.ndarray] = {}
+        self._image_urls: Dict[str, str] = {}
+        self._matcher: Optional[Matcher] = None
+        self._generation = 0
+        self._rebuild_thread: Optional[threading.Thread] = None
+        self._pending: List[tuple] = []
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def load(self, docs, version: int) -> None:
+        """
+        Replace the index contents from item_embeddings document snapshots.
+
+        Args:
+            docs: Iterable of Firestore document snapshots for this type
+            version: Version counter the snapshots correspond to
+        """
+        self.load_items(((doc.id, *_doc_samples(doc.to_dict())) for doc in docs), version)
+
+    def load_items(self, items, version: int) -> None:
+        """
+        Replace the index contents from (item_id, embeddings, image_url) tuples.
+
+        Args:
+            items: Iterable as yielded by embedding_store.stream_type_embeddings
+            version: Version counter the items correspond to
+        """
+        samples = {}
+        image_urls = {}
+        for item_id, embeddings, image_url in items:
+            stacked = _stack_samples(embeddings)
+            if stacked is None:
+                continue
+            samples[item_id] = stacked
+            image_urls[item_id] = image_url
+
+        with self._lock:
+            self._samples = samples
+            self._centroids = {item_id: _centroid(block) for item_id, block in samples.items()}
+            self._image_urls = image_urls
+            self._invalidate()
+            self.version = version
+
+    def load_blocks(self, blocks: Dict[str, np.ndarray], image_urls: Dict[str, str],
+                    version: int) -> None:
+        """
+        Replace the index contents from pre-stacked per-item sample blocks.
+
+        Args:
+            blocks: item_id -> (n_samples, D) array, e.g. views into a snapshot memmap
+            image_urls: item_id -> first image URL
+            version: Version counter the blocks correspond to
+        """
+        with self._lock:
+            self._samples = dict(blocks)
+            self._centroids = {item_id: _centroid(block) for item_id, block in blocks.items()}
+            self._image_urls = dict(image_urls)
+            self._invalidate()
+            self.version = version
+
+    def upsert_item(self, item_id: str, embeddings: Dict[str, List[float]],
+                    image_url: Optional[str] = None) -> None:
+        """Add or replace all samples of one item."""
+        stacked = _stack_samples(embeddings)
+        with self._lock:
+            if stacked is None:
+                self._remove(item_id)
+                return
+            if image_url is not None:
+                self._image_urls[item_id] = image_url
+
+            existing = self._samples.get(item_id)
+            self._samples[item_id] = stacked
+            self._centroids[item_id] = _centroid(stacked)
+            if existing is None:
+                self._update_matcher(add=self._rows([item_id]))
+            elif len(existing) <= len(stacked) and np.array_equal(existing, stacked[:len(existing)]):
+                # Unchanged samples (e.g. a wear_count update) or new samples appended
+                if len(stacked) > len(existing):
+                    if self.strategy == 'centroid':
+                        # The item's centroid row moved: swap it in place
+                        self._update_matcher(remove=[item_id], add=self._rows([item_id]))
+                    else:
+                        self._update_matcher(add=[(item_id, stacked[len(existing):])])
+            else:
+                self._update_matcher(remove=[item_id], add=self._rows([item_id]))
+
+    def remove_item(self, item_id: str) -> None:
+        """Drop an item and all its samples."""
+        with self._lock:
+            self._remove(item_id)
+
+    def _remove(self, item_id: str) -> None:
+        if self._samples.pop(item_id, None) is not None:
+            self._update_matcher(remove=[item_id])
+        self._centroids.pop(item_id, None)
+        self._image_urls.pop(item_id, None)
+
+    def _rows(self, item_ids=None) -> List[Tuple[str, np.ndarray]]:
+        """Matcher rows per item: its centroid or all its samples, by strategy."""
+        item_ids = self._samples.keys() if item_ids is None else item_ids
+        if self.strategy == 'centroid':
+            return [(item_id, self._centroids[item_id][None, :]) for item_id in item_ids]
+        return [(item_id, self._samples[item_id]) for item_id in item_ids]
+
+    def _update_matcher(self, remove=(), add=()) -> None:
+        """Apply row changes to the serving matcher and to one being rebuilt."""
+        change = (list(remove), list(add))
+        if self._matcher is not None:
+            _apply_change(self._matcher, change)
+        if self._rebuild_thread is not None:
+            self._pending.append(change)
+
+    def _invalidate(self) -> None:
+        """Drop the matcher; the next search starts a rebuild."""
+        self._matcher = None
+        self._generation += 1
+        self._pending = []
+
+    def _serving_matcher(self) -> Optional[Matcher]:
+        """The matcher to search now, starting a background rebuild if one is due."""
+        if self.backend == 'exact':
+            # Building an exact matcher is just stacking rows; removals unlink rows
+            if self._matcher is None:
+                self._matcher = create_matcher(self.backend)
+                self._matcher.build(*_stack_blocks(self._rows()))
+            return self._matcher
+        if self._matcher is None or self._matcher.stale_fraction > REBUILD_STALE_FRACTION:
+            self._start_rebuild()
+        return self._matcher
+
+    def _start_rebuild(self) -> None:
+        if self._rebuild_thread is not None:
+            return
+        self._pending = []
+        self._rebuild_thread = threading.Thread(
+            target=self._rebuild, args=(self._rows(), self._generation), daemon=True)
+        self._rebuild_thread.start()
+
+    def _rebuild(self, rows: List[Tuple[str, np.ndarray]], generation: int) -> None:
+        """Build a fresh matcher off the request path, then swap it in."""
+        matcher = None
+        try:
+            matcher = create_matcher(self.backend)
+            matcher.build(*_stack_blocks(rows))
+        except Exception as e:
+            print(f"Matcher rebuild failed for {self.item_type}: {e}")
+            matcher = None
+        with self._lock:
+            # A full reload since the snapshot makes this build obsolete
+            if matcher is not None and generation == self._generation:
+                for change in self._pending:
+                    _apply_change(matcher, change)
+                self._matcher = matcher
+            self._rebuild_thread = None
+            self._pending = []
+
+    def wait_for_rebuild(self, timeout: Optional[float] = None) -> None:
+        """Block until a background matcher rebuild (if any) has finished."""
+        thread = self._rebuild_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def image_url(self, item_id: str) -> Optional[str]:
+        """First stored image URL of an indexed item."""
+        return self._image_urls.get(item_id)
+
+    def search(self, query_embedding, threshold: float = 0.85) -> Optional[Tuple[str, float]]:
+        """
+        Find the best-matching item across all indexed samples.
+
+        Args:
+            query_embedding: Normalized query embedding
+            threshold: Minimum similarity score (exclusive)
+
+        Returns:
+            (item_id, similarity_score) or None if no match above threshold
+        """
+        by_centroid = self.strategy == 'centroid'
+        with self._lock:
+            matcher = self._serving_matcher()
+            if matcher is None:
+                # First ANN build still running: exact scan meanwhile
+                matcher = ExactMatcher()
+                matcher.build(*_stack_blocks(self._rows()))
+
+            if not by_centroid:
+                matches = matcher.search(query_embedding, k=1,
+                                         threshold=threshold, strict=True)
+                return matches[0] if matches else None
+
+            # Coarse: closest centroids, unthresholded (an item's best sample
+            # can clear the threshold while its mean does not)
+            candidates = matcher.search(query_embedding, k=MATCH_RERANK_ITEMS)
+            blocks = [(item_id, self._samples[item_id]) for item_id, _ in candidates]
+
+        # Rerank: exact scores over the candidates' samples only
+        matches = search_matrix(query_embedding, *_stack_blocks(blocks), k=1,
+                                threshold=threshold, strict=True)
+        return matches[0] if matches else None
+
+
+def _stack_blocks(blocks: List[Tuple[str, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatenate per-item sample blocks into a candidate matrix and id array."""
+    if not blocks:
+        return np.empty((0, 0), dtype=np.float32), np.empty(0, dtype=object)
+    matrix = np.concatenate([samples for _, samples in blocks])
+    ids = np.array(
+        [item_id for item_id, samples in blocks for _ in range(len(samples))],
+        dtype=object
+    )
+    return matrix, ids
+
+
+def _apply_change(matcher: Matcher, change: tuple) -> None:
+    """Apply one (removed item ids, added (item_id, rows) blocks) change."""
+    remove, add = change
+    if remove:
+        matcher.remove(remove)
+    if add:
+        matcher.add(*_stack_blocks(add))
+
+
+def _centroid(samples: np.ndarray) -> np.ndarray:
+    """Normalized mean of an item's (n_samples, D) sample block, as float32."""
+    mean = np.asarray(samples, dtype=np.float32).mean(axis=0)
+    norm = np.linalg.norm(mean)
+    return mean / norm if norm > 0 else mean
+
+
+def _doc_samples(data: dict) -> Tuple[Dict[str, List[float]], Optional[str]]:
+    """(embeddings, first image URL) of an item_embeddings or legacy clothing_items doc."""
+    image_url = data.get('image_url') or (data.get('image_urls') or [None])[0]
+    return data.get('embeddings', {}), image_url
+
+
+def _stack_samples(embeddings: Dict[str, List[float]]) -> Optional[np.ndarray]:
+    """Stack an item's ``embeddings`` map (packed or list samples) into a float32 (n_samples, D) array."""
+    if not embeddings:
+        return None
+    keys = sorted(embeddings.keys(), key=lambda k: int(k))
+    return np.stack([embedding_codec.decode(embeddings[k]) for k in keys])
+
+
+_indexes: Dict[str, EmbeddingIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _version_ref(db: firestore.Client, item_type: str):
+    return db.collection(INDEX_VERSIONS_COLLECTION).document(item_type)
+
+
+def _read_version(db: firestore.Client, item_type: str) -> int:
+    snapshot = _version_ref(db, item_type).get()
+    if not snapshot.exists:
+        return 0
+    return snapshot.to_dict().get('version', 0)
+
+
+def _cached_index(item_type: str) -> EmbeddingIndex:
+    with _indexes_lock:
+        index = _indexes.get(item_type)
+        if index is None:
+            index = _indexes[item_type] = EmbeddingIndex(item_type)
+        return index
+
+
+class IndexListener:
+    """
+    Keeps every type's EmbeddingIndex current from an on_snapshot listener.
+
+    The initial snapshot loads each index in full; after that only the
+    added, modified and removed documents are applied, so upkeep is
+    O(changed docs) and the match path never re-reads the collection.
+    Items not yet migrated to item_embeddings are read once from
+    clothing_items at start; writers move them over on their next change,
+    and deleting one leaves only a tombstone, so tombstones are watched too.
+    """
+
+    def __init__(self, db: firestore.Client):
+        self._db = db
+        self._watch = None
+        self._tombstone_watch = None
+        self._ready = threading.Event()
+        self._tombstones_ready = False
+
+    def start(self) -> None:
+        """Attach the listeners to item_embeddings and index_tombstones."""
+        self._ready.clear()
+        self._tombstones_ready = False
+        self._watch = self._db.collection(ITEM_EMBEDDINGS_COLLECTION).on_snapshot(self._on_snapshot)
+        self._tombstone_watch = self._db.collection(INDEX_TOMBSTONES_COLLECTION)\
+            .on_snapshot(self._on_tombstones)
+
+    def stop(self) -> None:
+        """Detach the listeners."""
+        for watch in (self._watch, self._tombstone_watch):
+            if watch is not None:
+                watch.unsubscribe()
+        self._watch = None
+        self._tombstone_watch = None
+        self._ready.clear()
+
+    @property
+    def is_active(self) -> bool:
+        return self._watch is not None and self._watch.is_active
+
+    def wait_ready(self, timeout: float) -> bool:
+        """Block until the initial snapshot has been applied, up to timeout."""
+        return self._ready.wait(timeout)
+
+    def _on_snapshot(self, docs, changes, read_time) -> None:
+        if not self._ready.is_set():
+            self.apply_initial(docs, self._db)
+            self._ready.set()
+        else:
+            self.apply_changes(changes)
+
+    def _on_tombstones(self, docs, changes, read_time) -> None:
+        # The initial snapshot is every past deletion; only new ones matter
+        if not self._tombstones_ready:
+            self._tombstones_ready = True
+            return
+        for change in changes:
+            if change.type.name == 'REMOVED':
+                continue
+            with _indexes_lock:
+                indexes = list(_indexes.values())
+            for index in indexes:
+                index.remove_item(change.document.id)
+
+    @staticmethod
+    def apply_initial(docs, db: Optional[firestore.Client] = None) -> None:
+        """
+        Replace every index with the full contents of a snapshot.
+
+        Args:
+            docs: item_embeddings document snapshots
+            db: Firestore client to read not-yet-migrated items with (optional)
+        """
+        by_type: Dict[str, list] = {'shirt': [], 'pants': []}
+        for doc in docs:
+            data = doc.to_dict()
+            by_type.setdefault(data.get('type'), []).append((doc.id, *_doc_samples(data)))
+
+        if db is not None:
+            for item_type, items in by_type.items():
+                if item_type is not None:
+                    migrated = {item_id for item_id, _, _ in items}
+                    items.extend(stream_unmigrated_embeddings(db, item_type, migrated))
+
+        with _indexes_lock:
+            item_types = set(_indexes) | set(by_type)
+        for item_type in item_types:
+            _cached_index(item_type).load_items(by_type.get(item_type, []), version=None)
+
+    @staticmethod
+    def apply_changes(changes) -> None:
+        """Apply document adds, modifications and removals as index deltas."""
+        for change in changes:
+            item_id = change.document.id
+            data = change.document.to_dict() or {}
+            item_type = data.get('type')
+
+            with _indexes_lock:
+                indexes = list(_indexes.values())
+            for index in indexes:
+                if change.type.name == 'REMOVED' or index.item_type != item_type:
+                    index.remove_item(item_id)
+
+            if change.type.name != 'REMOVED' and item_type is not None:
+                _cached_index(item_type).upsert_item(item_id, *_doc_samples(data))
+
+
+_listener: Optional[IndexListener] = None
+_listener_lock = threading.Lock()
+
+
+def _ensure_listener(db: firestore.Client) -> IndexListener:
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            _listener = IndexListener(db)
+        if not _listener.is_active:
+            _listener.start()
+        return _listener
+
+
+def _cold_load(db: firestore.Client, index: EmbeddingIndex, version: int,
+               storage=None) -> None:
+    """
+    First load of an index on this instance.
+
+    Prefers the Cloud Storage snapshot (memory-mapped from /tmp) plus a replay
+    of documents changed since it was taken; falls back to streaming the
+    type's item_embeddings when there is no snapshot.
+    """
+    snapshot = index_snapshot.load_snapshot(storage, index.item_type) if storage else None
+    if snapshot is None:
+        synced_at = datetime.now(timezone.utc)
+        index.load_items(stream_type_embeddings(db, index.item_type), version)
+        index.synced_at = synced_at
+        return
+
+    manifest, matrix = snapshot
+    index.load_blocks(index_snapshot.snapshot_blocks(manifest, matrix),
+                      manifest['image_urls'], manifest['generation'])
+    index.synced_at = index_snapshot.parse_snapshot_time(manifest)
+
+
+def _replay(db: firestore.Client, index: EmbeddingIndex) -> None:
+    """Apply documents updated or deleted since the index was last synced."""
+    synced_at = datetime.now(timezone.utc)
+    since = index.synced_at - REPLAY_MARGIN
+
+    changed = db.collection(ITEM_EMBEDDINGS_COLLECTION)\
+        .where('type', '==', index.item_type)\
+        .where('updated_at', '>', since)\
+        .stream()
+    for doc in changed:
+        index.upsert_item(doc.id, *_doc_samples(doc.to_dict()))
+
+    deleted = db.collection(INDEX_TOMBSTONES_COLLECTION)\
+        .where('type', '==', index.item_type)\
+        .where('deleted_at', '>', since)\
+        .stream()
+    for doc in deleted:
+        index.remove_item(doc.id)
+
+    index.synced_at = synced_at
+
+
+def get_index(db: firestore.Client, item_type: str, storage=None) -> EmbeddingIndex:
+    """
+    Return the warm embedding index for ``item_type``, rebuilding if stale.
+
+    In 'listener' mode the index is fed by IndexListener and returned as-is
+    once the initial snapshot is in. Otherwise the first call per instance
+    loads the Cloud Storage snapshot (or streams the type's item_embeddings
+    when there is none). After that the version doc is re-read at most every
+    VERSION_CHECK_SECONDS, and only documents changed since the last sync are
+    replayed when the version has moved.
+
+    Args:
+        db: Firestore client
+        item_type: 'shirt' or 'pants'
+        storage: StorageClient used to fetch the snapshot on cold start (optional)
+
+    Returns:
+        EmbeddingIndex for the type
+    """
+    if INDEX_MODE == 'listener':
+        listener = _ensure_listener(db)
+        if listener.wait_ready(LISTENER_READY_SECONDS):
+            return _cached_index(item_type)
+
+    index = _cached_index(item_type)
+
+    with index._lock:
+        now = time.monotonic()
+        if index.version is not None and now - index.checked_at < VERSION_CHECK_SECONDS:
+            return index
+
+        version = _read_version(db, item_type)
+        if index.synced_at is None:
+            _cold_load(db, index, version, storage)
+        if version != index.version:
+            _replay(db, index)
+            index.version = version
+        index.checked_at = now
+
+    return index
+
+
+@firestore.transactional
+def _bump_version(transaction, version_ref) -> int:
+    snapshot = version_ref.get(transaction=transaction)
+    version = (snapshot.to_dict().get('version', 0) if snapshot.exists else 0) + 1
+    transaction.set(version_ref, {
+        'version': version,
+        'updated_at': firestore.SERVER_TIMESTAMP,
+    })
+    return version
+
+
+def record_item_change(db: firestore.Client, item_type: str, item_id: str,
+                       embeddings: Optional[Dict[str, List[float]]] = None,
+                       image_url: Optional[str] = None) -> int:
+    """
+    Publish a change to an item's embeddings after it has been written.
+
+    Bumps ``index_versions/{item_type}`` so other warm instances replay it, and
+    applies the change to this instance's index in place when it was current
+    up to this write.
+
+    Args:
+        db: Firestore client
+        item_type: 'shirt' or 'pants'
+        item_id: Clothing item ID
+        embeddings: The item's full embeddings map, or None if it was deleted
+        image_url: The item's first image URL (optional)
+
+    Returns:
+        New index version
+    """
+    version = _bump_version(db.transaction(), _version_ref(db, item_type))
+
+    if embeddings is None:
+        # Deleted docs can't be found by an updated_at query; leave a marker
+        # so snapshot replays drop the item too.
+        db.collection(INDEX_TOMBSTONES_COLLECTION).document(item_id).set({
+            'type': item_type,
+            'deleted_at': firestore.SERVER_TIMESTAMP,
+        })
+
+    with _indexes_lock:
+        index = _indexes.get(item_type)
+    if index is None:
+        return version
+
+    with index._lock:
+        if index.version == version - 1:
+            if embeddings is None:
+                index.remove_item(item_id)
+            else:
+                index.upsert_item(item_id, embeddings, image_url)
+            index.version = version
+
+    return version
@@ -0,0 +1,126 @@
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from google.cloud import firestore
+
+from .embedding_codec import encode_for_storage
+
+
+# Embedding samples live in their own documents (one per item, same ID as the
+# clothing_items doc) so that item metadata reads and writes stay small:
+#   item_embeddings/{item_id} = {type, image_url, embeddings: {"0": <sample>, ...}, updated_at}
+# image_url mirrors clothing_items.image_urls[0], so the matching index can be
+# built from this collection alone. Samples are packed bytes (see
+# embedding_codec.py); docs written before that hold plain float arrays, and
+# readers decode both.
+ITEM_EMBEDDINGS_COLLECTION = 'item_embeddings'
+
+
+def embeddings_ref(db: firestore.Client, item_id: str):
+    return db.collection(ITEM_EMBEDDINGS_COLLECTION).document(item_id)
+
+
+def get_embeddings(db: firestore.Client, item_id: str,
+                   item_data: Optional[dict] = None) -> Dict[str, List[float]]:
+    """
+    Read one item's embedding samples.
+
+    Args:
+        db: Firestore client
+        item_id: Clothing item ID
+        item_data: The item's clothing_items data, if already read. Items not
+            yet migrated (scripts/migrate_embeddings.py) still carry their
+            samples there and are served from it.
+
+    Returns:
+        Sample key -> stored sample, packed or list ({} if the item has none)
+    """
+    snapshot = embeddings_ref(db, item_id).get()
+    if snapshot.exists:
+        return snapshot.to_dict().get('embeddings', {})
+    return dict((item_data or {}).get('embeddings', {}))
+
+
+def set_embeddings(db: firestore.Client, item_id: str, item_type: str,
+                   embeddings: Dict[str, List[float]], image_url: Optional[str],
+                   batch=None) -> None:
+    """
+    Write (replace) one item's embedding samples.
+
+    Args:
+        db: Firestore client
+        item_id: Clothing item ID
+        item_type: 'shirt' or 'pants'
+        embeddings: The item's full sample map, in any form embedding_codec
+            decodes; stored under EMBEDDING_STORAGE_CODEC
+        image_url: The item's first image URL
+        batch: WriteBatch to add the write to, so it commits together with
+            the clothing_items update (optional; written immediately if None)
+    """
+    data = {
+        'type': item_type,
+        'image_url': image_url,
+        'embeddings': {key: encode_for_storage(value) for key, value in embeddings.items()},
+        'updated_at': firestore.SERVER_TIMESTAMP,
+    }
+    ref = embeddings_ref(db, item_id)
+    if batch is not None:
+        batch.set(ref, data)
+    else:
+        ref.set(data)
+
+
+def delete_embeddings(db: firestore.Client, item_id: str, batch=None) -> None:
+    """Delete one item's embedding samples (in ``batch`` when given)."""
+    ref = embeddings_ref(db, item_id)
+    if batch is not None:
+        batch.delete(ref)
+    else:
+        ref.delete()
+
+
+def stream_type_embeddings(db: firestore.Client, item_type: str
+                           ) -> Iterator[Tuple[str, Dict[str, List[float]], Optional[str]]]:
+    """
+    Every item of one type with its samples.
+
+    Items not yet migrated (scripts/migrate_embeddings.py) are yielded from
+    their inline clothing_items copy, so a partly migrated type is served whole.
+
+    Yields:
+        (item_id, embeddings, first image URL)
+    """
+    seen = set()
+    docs = db.collection(ITEM_EMBEDDINGS_COLLECTION).where('type', '==', item_type).stream()
+    for doc in docs:
+        seen.add(doc.id)
+        data = doc.to_dict()
+        yield doc.id, data.get('embeddings', {}), data.get('image_url')
+
+    yield from stream_unmigrated_embeddings(db, item_type, seen)
+
+
+def stream_unmigrated_embeddings(db: firestore.Client, item_type: str, migrated: Set[str] = frozenset()
+                                 ) -> Iterator[Tuple[str, Dict[str, List[float]], Optional[str]]]:
+    """
+    Items of one type that still carry an inline embeddings map on clothing_items.
+
+    Migrated items have that field deleted, so the read stays cheap once the
+    migration has run.
+
+    Args:
+        db: Firestore client
+        item_type: 'shirt' or 'pants'
+        migrated: Item IDs already read from item_embeddings; their inline
+            copy (if the migration was interrupted mid-batch) is skipped
+
+    Yields:
+        (item_id, embeddings, first image URL)
+    """
+    docs = (db.collection('clothing_items')
+            .where('type', '==', item_type)
+            .select(['embeddings', 'image_urls'])
+            .stream())
+    for doc in docs:
+        data = doc.to_dict()
+        if doc.id in migrated or not data.get('embeddings'):
+            continue
+        yield doc.id, data['embeddings'], (data.get('image_urls') or [None])[0]
@@ -0,0 +1,132 @@
+import io
+import os
+import json
+import numpy as np
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+from google.cloud import firestore
+
+from storage.storage_client import StorageClient
+
+
+# Local directory for downloaded snapshot matrices (Cloud Run: in-memory /tmp)
+SNAPSHOT_DIR = os.getenv('EMBEDDING_SNAPSHOT_DIR', '/tmp')
+
+
+def _manifest_name(item_type: str) -> str:
+    return f"{item_type}.json"
+
+
+def write_snapshot(db: firestore.Client, storage: StorageClient,
+                   item_type: str, dtype: str = 'float32') -> dict:
+    """
+    Write a compact snapshot of every embedding of one type to the bucket.
+
+    The matrix is stored as a .npy file (rows grouped by item, in sample key
+    order) named after its generation, and a small JSON manifest points at it,
+    so readers never see a manifest and matrix from different runs.
+
+    Args:
+        db: Firestore client
+        storage: StorageClient instance
+        item_type: 'shirt' or 'pants'
+        dtype: 'float32' or 'float16'
+
+    Returns:
+        The manifest dict that was written
+    """
+    from .embedding_index import _read_version, _stack_samples
+    from .embedding_store import stream_type_embeddings
+
+    # Capture generation and time before scanning: anything written during the
+    # scan is replayed again on load, which is idempotent.
+    generation = _read_version(db, item_type)
+    snapshot_at = datetime.now(timezone.utc)
+
+    blocks = []
+    item_ids = []
+    sample_keys = []
+    image_urls = {}
+    for item_id, embeddings, image_url in stream_type_embeddings(db, item_type):
+        stacked = _stack_samples(embeddings)
+        if stacked is None:
+            continue
+        blocks.append(stacked)
+        keys = sorted(embeddings.keys(), key=lambda k: int(k))
+        item_ids.extend([item_id] * len(keys))
+        sample_keys.extend(keys)
+        image_urls[item_id] = image_url
+
+    matrix = np.concatenate(blocks).astype(dtype) if blocks else np.empty((0, 0), dtype=dtype)
+
+    matrix_name = f"{item_type}-{generation}-{int(snapshot_at.timestamp())}.npy"
+    buf = io.BytesIO()
+    np.save(buf, matrix)
+    storage.upload_index_file(buf.getvalue(), matrix_name)
+
+    manifest = {
+        'item_type': item_type,
+        'generation': generation,
+        'snapshot_at': snapshot_at.isoformat(),
+        'matrix': matrix_name,
+        'dtype': dtype,
+        'shape': list(matrix.shape),
+        'item_ids': item_ids,
+        'sample_keys': sample_keys,
+        'image_urls': image_urls,
+    }
+    storage.upload_index_file(json.dumps(manifest).encode('utf-8'),
+                              _manifest_name(item_type), 'application/json')
+    return manifest
+
+
+def load_snapshot(storage: StorageClient,
+                  item_type: str) -> Optional[Tuple[dict, np.ndarray]]:
+    """
+    Download the latest snapshot of one type and memory-map its matrix.
+
+    The matrix file is kept under SNAPSHOT_DIR by name, so a warm instance
+    re-reading the same generation skips the download.
+
+    Args:
+        storage: StorageClient instance
+        item_type: 'shirt' or 'pants'
+
+    Returns:
+        (manifest, read-only memmapped matrix) or None if no snapshot exists
+    """
+    raw = storage.download_index_file(_manifest_name(item_type))
+    if raw is None:
+        return None
+    manifest = json.loads(raw)
+
+    local_path = os.path.join(SNAPSHOT_DIR, manifest['matrix'])
+    if not os.path.exists(local_path):
+        tmp_path = f"{local_path}.part"
+        if storage.download_index_file(manifest['matrix'], tmp_path) is None:
+            return None
+        os.replace(tmp_path, local_path)
+
+    matrix = np.load(local_path, mmap_mode='r')
+    return manifest, matrix
+
+
+def snapshot_blocks(manifest: dict, matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Split a snapshot matrix into per-item sample blocks.
+
+    Rows of one item are contiguous, so each block is a view into the
+    memmap rather than a copy.
+    """
+    blocks = {}
+    item_ids = manifest['item_ids']
+    start = 0
+    for end in range(1, len(item_ids) + 1):
+        if end == len(item_ids) or item_ids[end] != item_ids[start]:
+            blocks[item_ids[start]] = matrix[start:end]
+            start = end
+    return blocks
+
+
+def parse_snapshot_time(manifest: dict) -> datetime:
+    return datetime.fromisoformat(manifest['snapshot_at'])
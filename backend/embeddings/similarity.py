@@ -1,5 +1,7 @@
+import heapq
+from abc import ABC, abstractmethod
 import numpy as np
-from typing import List, Tuple, Optional
+from typing import Iterable, List, Tuple, Optional
 
 
 def cosine_similarity(embedding1: List[float], embedding2: List[float]) -> float:
@@ -21,6 +23,76 @@ def cosine_similarity(embedding1: List[float], embedding2: List[float]) -> float
     return float(np.clip(similarity, 0.0, 1.0))
 
 
+def stack_candidates(
+    candidate_embeddings: List[Tuple[str, List[float]]]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stack (item_id, embedding) tuples into a candidate matrix for batched search
+
+    Args:
+        candidate_embeddings: List of (item_id, embedding) tuples
+
+    Returns:
+        (matrix, ids): float32 array of shape (N, D) and object array of N item ids
+    """
+    if not candidate_embeddings:
+        return np.empty((0, 0), dtype=np.float32), np.empty(0, dtype=object)
+
+    ids = np.array([item_id for item_id, _ in candidate_embeddings], dtype=object)
+    matrix = np.array([emb for _, emb in candidate_embeddings], dtype=np.float32)
+
+    return matrix, ids
+
+
+def search_matrix(
+    query_embedding,
+    matrix: np.ndarray,
+    ids: np.ndarray,
+    k: int = 1,
+    threshold: float = 0.0,
+    strict: bool = False
+) -> List[Tuple[str, float]]:
+    """
+    Score every candidate with one matrix-vector product and return the top K
+
+    Embeddings are L2-normalized, so the dot product is the cosine similarity.
+    Scores are clipped to [0.0, 1.0] to match cosine_similarity().
+
+    Args:
+        query_embedding: Embedding to compare against (list or array)
+        matrix: Pre-stacked float32 candidate matrix of shape (N, D)
+        ids: Item id for each row of matrix
+        k: Number of results to return
+        threshold: Minimum similarity score
+        strict: Require score > threshold instead of score >= threshold
+
+    Returns:
+        List of (item_id, similarity_score) sorted by score descending
+    """
+    if k <= 0 or len(ids) == 0:
+        return []
+
+    query = np.asarray(query_embedding, dtype=np.float32)
+    scores = np.clip(matrix @ query, 0.0, 1.0)
+
+    if k == 1:
+        # argmax keeps the first of any tied candidates
+        top = np.array([int(np.argmax(scores))])
+    elif k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    top = top[np.argsort(-scores[top], kind='stable')]
+
+    results = []
+    for idx in top:
+        score = float(scores[idx])
+        if score > threshold or (not strict and score == threshold):
+            results.append((ids[idx], score))
+
+    return results
+
+
 def find_most_similar(
     query_embedding: List[float],
     candidate_embeddings: List[Tuple[str, List[float]]],
@@ -37,17 +109,11 @@ def find_most_similar(
     Returns:
         (item_id, similarity_score) or None if no match above threshold
     """
-    best_match = None
-    best_score = threshold
+    matrix, ids = stack_candidates(candidate_embeddings)
+    matches = search_matrix(query_embedding, matrix, ids, k=1,
+                            threshold=threshold, strict=True)
 
-    for item_id, embedding in candidate_embeddings:
-        score = cosine_similarity(query_embedding, embedding)
-
-        if score > best_score:
-            best_score = score
-            best_match = (item_id, score)
-
-    return best_match
+    return matches[0] if matches else None
 
 
 def find_top_k_similar(
@@ -68,17 +134,9 @@ def find_top_k_similar(
     Returns:
         List of (item_id, similarity_score) sorted by score descending
     """
-    scores = []
-
-    for item_id, embedding in candidate_embeddings:
-        score = cosine_similarity(query_embedding, embedding)
+    matrix, ids = stack_candidates(candidate_embeddings)
 
-        if score >= threshold:
-            scores.append((item_id, score))
-
-    scores.sort(key=lambda x: x[1], reverse=True)
-
-    return scores[:k]
+    return search_matrix(query_embedding, matrix, ids, k=k, threshold=threshold)
 
 
 def embedding_distance(embedding1: List[float], embedding2: List[float]) -> float:
@@ -96,3 +154,356 @@ def embedding_distance(embedding1: List[float], embedding2: List[float]) -> floa
     vec2 = np.array(embedding2)
 
     return float(np.linalg.norm(vec1 - vec2))
+
+
+class Matcher(ABC):
+    """
+    Nearest-neighbour search backend over a set of normalized embeddings.
+
+    build() indexes a candidate matrix, add() appends rows and remove()
+    drops an item's rows without a full rebuild, and search() returns the
+    top K (item_id, similarity_score) pairs like search_matrix().
+    Backends that can't unlink rows cheaply leave them in place, excluded
+    from results; stale_fraction tells the owner when a rebuild would pay.
+    """
+
+    @abstractmethod
+    def build(self, matrix: np.ndarray, ids: np.ndarray) -> None:
+        """Index a candidate matrix, replacing any previous contents."""
+
+    @abstractmethod
+    def add(self, matrix: np.ndarray, ids: np.ndarray) -> None:
+        """Index additional rows without a full rebuild."""
+
+    @abstractmethod
+    def remove(self, ids: Iterable[str]) -> None:
+        """Drop every row belonging to the given item ids."""
+
+    @abstractmethod
+    def search(self, query_embedding, k: int = 1, threshold: float = 0.0,
+               strict: bool = False) -> List[Tuple[str, float]]:
+        """Top K (item_id, similarity_score) pairs, score descending."""
+
+    @property
+    def stale_fraction(self) -> float:
+        """Share of indexed rows that were removed but still occupy the index."""
+        return 0.0
+
+    def __len__(self):
+        return len(self._ids)
+
+
+def _row_mask(ids: np.ndarray, removed: Iterable[str]) -> np.ndarray:
+    """Boolean mask of the rows of ``ids`` that belong to ``removed``."""
+    removed = set(removed)
+    return np.fromiter((i in removed for i in ids), dtype=bool, count=len(ids))
+
+
+class ExactMatcher(Matcher):
+    """Brute-force scan: scores every candidate with one matrix-vector product."""
+
+    def __init__(self):
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._ids = np.empty(0, dtype=object)
+
+    def build(self, matrix: np.ndarray, ids: np.ndarray) -> None:
+        self._matrix = np.asarray(matrix, dtype=np.float32)
+        self._ids = np.asarray(ids, dtype=object)
+
+    def add(self, matrix: np.ndarray, ids: np.ndarray) -> None:
+        if len(self._ids) == 0:
+            self.build(matrix, ids)
+            return
+        self._matrix = np.concatenate([self._matrix, np.asarray(matrix, dtype=np.float32)])
+        self._ids = np.concatenate([self._ids, np.asarray(ids, dtype=object)])
+
+    def remove(self, ids: Iterable[str]) -> None:
+        keep = ~_row_mask(self._ids, ids)
+        if not keep.all():
+            self._matrix = self._matrix[keep]
+            self._ids = self._ids[keep]
+
+    def search(self, query_embedding, k: int = 1, threshold: float = 0.0,
+               strict: bool = False) -> List[Tuple[str, float]]:
+        return search_matrix(query_embedding, self._matrix, self._ids, k=k,
+                             threshold=threshold, strict=strict)
+
+
+def _spherical_kmeans(matrix: np.ndarray, n_clusters: int, iterations: int,
+                      rng: np.random.Generator) -> np.ndarray:
+    """K-means on the unit sphere; returns normalized (n_clusters, D) centroids."""
+    centroids = matrix[rng.choice(len(matrix), n_clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = np.argmax(matrix @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, matrix)
+        counts = np.bincount(assign, minlength=n_clusters)
+
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = matrix[rng.choice(len(matrix), len(empty), replace=False)]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+
+    return centroids
+
+
+class IVFFlatMatcher(Matcher):
+    """
+    Inverted-file index: k-means coarse centroids, exact scan of the probed lists.
+
+    Experimental. At a few thousand samples queries are about as fast as
+    ExactMatcher, on top of a k-means build (~0.8s at 3k rows).
+
+    Args:
+        n_lists: Number of coarse centroids (default sqrt(N))
+        n_probe: Number of closest lists scanned per query
+        iterations: K-means iterations at build time
+        seed: Seed for centroid initialisation
+    """
+
+    def __init__(self, n_lists: Optional[int] = None, n_probe: int = 8,
+                 iterations: int = 10, seed: int = 0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.iterations = iterations
+        self.seed = seed
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._ids = np.empty(0, dtype=object)
+        self._centroids = None
+        self._lists: List[np.ndarray] = []
+        self._live = np.empty(0, dtype=bool)
+
+    def build(self, matrix: np.ndarray, ids: np.ndarray) -> None:
+        self._matrix = np.asarray(matrix, dtype=np.float32)
+        self._ids = np.asarray(ids, dtype=object)
+        self._live = np.ones(len(self._ids), dtype=bool)
+        if len(self._ids) == 0:
+            self._centroids = None
+            self._lists = []
+            return
+
+        n_lists = self.n_lists or int(np.sqrt(len(self._ids)))
+        n_lists = max(1, min(n_lists, len(self._ids)))
+        rng = np.random.default_rng(self.seed)
+        self._centroids = _spherical_kmeans(self._matrix, n_lists, self.iterations, rng)
+
+        assign = np.argmax(self._matrix @ self._centroids.T, axis=1)
+        self._lists = [np.flatnonzero(assign == c) for c in range(n_lists)]
+
+    def add(self, matrix: np.ndarray, ids: np.ndarray) -> None:
+        if self._centroids is None:
+            self.build(matrix, ids)
+            return
+        matrix = np.asarray(matrix, dtype=np.float32)
+        start = len(self._ids)
+        self._matrix = np.concatenate([self._matrix, matrix])
+        self._ids = np.concatenate([self._ids, np.asarray(ids, dtype=object)])
+        self._live = np.concatenate([self._live, np.ones(len(matrix), dtype=bool)])
+
+        # New rows join their nearest existing list; centroids stay put
+        assign = np.argmax(matrix @ self._centroids.T, axis=1)
+        for c in np.unique(assign):
+            rows = start + np.flatnonzero(assign == c)
+            self._lists[c] = np.concatenate([self._lists[c], rows])
+
+    def remove(self, ids: Iterable[str]) -> None:
+        self._live &= ~_row_mask(self._ids, ids)
+
+    @property
+    def stale_fraction(self) -> float:
+        return 1.0 - self._live.mean() if len(self._live) else 0.0
+
+    def __len__(self):
+        return int(self._live.sum())
+
+    def search(self, query_embedding, k: int = 1, threshold: float = 0.0,
+               strict: bool = False) -> List[Tuple[str, float]]:
+        if self._centroids is None:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+
+        n_probe = min(self.n_probe, len(self._lists))
+        probe = np.argpartition(-(self._centroids @ query), n_probe - 1)[:n_probe]
+        rows = np.concatenate([self._lists[c] for c in probe])
+        rows = rows[self._live[rows]]
+
+        return search_matrix(query, self._matrix[rows], self._ids[rows], k=k,
+                             threshold=threshold, strict=strict)
+
+
+class HNSWMatcher(Matcher):
+    """
+    Hierarchical navigable small-world graph over the candidate rows.
+
+    Experimental. The graph walk is pure Python, so at current wardrobe sizes
+    it is slower than ExactMatcher: ~7s to build and ~2ms per query at 3k
+    rows, against ~0.8ms for an exact scan. Worth it only well past that.
+
+    Args:
+        m: Neighbours per node on upper layers (2*m on the base layer)
+        ef_construction: Candidate list size while inserting
+        ef_search: Candidate list size while searching
+        seed: Seed for level assignment
+    """
+
+    def __init__(self, m: int = 16, ef_construction: int = 100,
+                 ef_search: int = 64, seed: int = 0):
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self._level_mult = 1.0 / np.log(m)
+        self._rng = np.random.default_rng(seed)
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._ids = np.empty(0, dtype=object)
+        self._graph: List[dict] = []
+        self._entry = None
+        self._live = np.empty(0, dtype=bool)
+
+    def build(self, matrix: np.ndarray, ids: np.ndarray) -> None:
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._ids = np.empty(0, dtype=object)
+        self._live = np.empty(0, dtype=bool)
+        self._graph = []
+        self._entry = None
+        self.add(matrix, ids)
+
+    def add(self, matrix: np.ndarray, ids: np.ndarray) -> None:
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if len(matrix) == 0:
+            return
+        start = len(self._ids)
+        if start == 0:
+            self._matrix = matrix.copy()
+            self._ids = np.asarray(ids, dtype=object)
+        else:
+            self._matrix = np.concatenate([self._matrix, matrix])
+            self._ids = np.concatenate([self._ids, np.asarray(ids, dtype=object)])
+        self._live = np.concatenate([self._live, np.ones(len(matrix), dtype=bool)])
+
+        for node in range(start, len(self._ids)):
+            self._insert(node)
+
+    def remove(self, ids: Iterable[str]) -> None:
+        # Removed nodes stay in the graph as waypoints but are never returned
+        self._live &= ~_row_mask(self._ids, ids)
+
+    @property
+    def stale_fraction(self) -> float:
+        return 1.0 - self._live.mean() if len(self._live) else 0.0
+
+    def __len__(self):
+        return int(self._live.sum())
+
+    def _search_layer(self, query: np.ndarray, entry_points: List[int],
+                      ef: int, level: int) -> List[Tuple[float, int]]:
+        """Best-first search of one layer; returns up to ef (score, node) descending."""
+        neighbours = self._graph[level]
+        visited = set(entry_points)
+        scores = self._matrix[entry_points] @ query
+
+        candidates = [(-float(s), n) for s, n in zip(scores, entry_points)]
+        heapq.heapify(candidates)
+        results = [(float(s), n) for s, n in zip(scores, entry_points)]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            neg_score, node = heapq.heappop(candidates)
+            if len(results) >= ef and -neg_score < results[0][0]:
+                break
+
+            unvisited = [n for n in neighbours.get(node, ()) if n not in visited]
+            if not unvisited:
+                continue
+            visited.update(unvisited)
+
+            for n, s in zip(unvisited, self._matrix[unvisited] @ query):
+                s = float(s)
+                if len(results) < ef or s > results[0][0]:
+                    heapq.heappush(candidates, (-s, n))
+                    heapq.heappush(results, (s, n))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted(results, reverse=True)
+
+    def _insert(self, node: int) -> None:
+        query = self._matrix[node]
+        level = int(-np.log(1.0 - self._rng.random()) * self._level_mult)
+
+        if self._entry is None:
+            self._graph = [{node: []} for _ in range(level + 1)]
+            self._entry = node
+            return
+
+        max_level = len(self._graph) - 1
+        entry_points = [self._entry]
+        for lc in range(max_level, level, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, lc)[0][1]]
+
+        for lc in range(min(level, max_level), -1, -1):
+            found = self._search_layer(query, entry_points, self.ef_construction, lc)
+            max_neighbours = 2 * self.m if lc == 0 else self.m
+            selected = [n for _, n in found[:self.m]]
+            self._graph[lc][node] = selected
+
+            for n in selected:
+                links = self._graph[lc][n]
+                links.append(node)
+                if len(links) > max_neighbours:
+                    link_scores = self._matrix[links] @ self._matrix[n]
+                    keep = np.argsort(-link_scores)[:max_neighbours]
+                    self._graph[lc][n] = [links[i] for i in keep]
+
+            entry_points = [n for _, n in found]
+
+        if level > max_level:
+            for _ in range(max_level + 1, level + 1):
+                self._graph.append({node: []})
+            self._entry = node
+
+    def search(self, query_embedding, k: int = 1, threshold: float = 0.0,
+               strict: bool = False) -> List[Tuple[str, float]]:
+        if self._entry is None or k <= 0:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+
+        entry_points = [self._entry]
+        for lc in range(len(self._graph) - 1, 0, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, lc)[0][1]]
+        found = self._search_layer(query, entry_points, max(self.ef_search, k), 0)
+
+        results = []
+        for score, node in [(s, n) for s, n in found if self._live[n]][:k]:
+            score = float(np.clip(score, 0.0, 1.0))
+            if score > threshold or (not strict and score == threshold):
+                results.append((self._ids[node], score))
+        return results
+
+
+MATCHER_BACKENDS = {
+    'exact': ExactMatcher,
+    'ivf': IVFFlatMatcher,
+    'hnsw': HNSWMatcher,
+}
+
+
+def create_matcher(backend: str = 'exact', **kwargs) -> Matcher:
+    """
+    Create a nearest-neighbour search backend by name
+
+    Args:
+        backend: 'exact', 'ivf' or 'hnsw'
+        **kwargs: Backend-specific tuning parameters
+
+    Returns:
+        Unbuilt Matcher instance
+    """
+    if backend not in MATCHER_BACKENDS:
+        raise ValueError(f"Unknown matcher backend: {backend}")
+    return MATCHER_BACKENDS[backend](**kwargs)
@@ -1,18 +1,95 @@
 from google.cloud import aiplatform
+from google.api_core import exceptions as api_exceptions
 import base64
 import os
+import threading
 import numpy as np
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from google.protobuf import struct_pb2
 
+from .embedding_cache import EmbeddingCache, content_key
 
-class VertexEmbedder:
-    def __init__(self):
+
+# Instances per predict call. multimodalembedding@001 currently accepts one
+# image instance per request; raise this if the endpoint limit grows.
+MAX_INSTANCES_PER_REQUEST = int(os.getenv('VERTEX_MAX_INSTANCES_PER_REQUEST', '1'))
+
+# Concurrent predict calls when a batch spans several requests
+MAX_CONCURRENT_REQUESTS = 4
+
+# Errors that mean the pooled channel is unusable: recreate it and retry once
+_CHANNEL_ERRORS = (api_exceptions.ServiceUnavailable, api_exceptions.Unknown)
+
+_clients: Dict[str, 'aiplatform.gapic.PredictionServiceClient'] = {}
+_clients_lock = threading.Lock()
+_initialized = False
+
+
+def _init_aiplatform() -> None:
+    """Run aiplatform.init once per process."""
+    global _initialized
+    with _clients_lock:
+        if _initialized:
+            return
         aiplatform.init(
             project=os.getenv('GCP_PROJECT_ID'),
             location=os.getenv('GCP_REGION', 'us-central1')
         )
+        _initialized = True
+
+
+def get_prediction_client(region: str):
+    """
+    Return the process-wide PredictionServiceClient for a region.
+
+    Created lazily on first use and shared across requests and threads, so
+    the gRPC channel (TLS handshake, connection setup) is paid for once per
+    warm instance instead of once per embedding.
 
+    Args:
+        region: GCP region of the Vertex AI endpoint
+
+    Returns:
+        PredictionServiceClient bound to {region}-aiplatform.googleapis.com
+    """
+    with _clients_lock:
+        client = _clients.get(region)
+        if client is None:
+            client_options = {"api_endpoint": f"{region}-aiplatform.googleapis.com"}
+            client = aiplatform.gapic.PredictionServiceClient(client_options=client_options)
+            _clients[region] = client
+        return client
+
+
+def reset_prediction_client(region: str, client) -> None:
+    """
+    Drop a pooled client whose channel has failed so the next call recreates it.
+
+    Only removes ``client`` if it is still the pooled one, so concurrent
+    callers that hit the same failure don't discard a fresh replacement.
+    """
+    with _clients_lock:
+        if _clients.get(region) is client:
+            del _clients[region]
+    try:
+        client.transport.close()
+    except Exception:
+        pass
+
+
+class VertexEmbedder:
+    def __init__(self, cache: Optional[EmbeddingCache] = None):
+        """
+        Args:
+            cache: Content-hash embedding cache consulted before calling
+                Vertex AI (optional; every image is embedded if None)
+        """
+        _init_aiplatform()
+
+        self.cache = cache
+
+        self.region = os.getenv('GCP_REGION', 'us-central1')
         self.endpoint_name = (
             f"projects/{os.getenv('GCP_PROJECT_ID')}/locations/"
             f"{os.getenv('GCP_REGION', 'us-central1')}/publishers/google/"
@@ -29,14 +106,12 @@ class VertexEmbedder:
         Returns:
             List of 1408 floats (normalized)
         """
-        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
+        return self.batch_generate_embeddings([image_bytes])[0]
 
-        client_options = {
-            "api_endpoint": f"{os.getenv('GCP_REGION', 'us-central1')}-aiplatform.googleapis.com"
-        }
-        client = aiplatform.gapic.PredictionServiceClient(client_options=client_options)
+    def _build_instance(self, image_bytes: bytes) -> struct_pb2.Value:
+        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
 
-        instance = struct_pb2.Value(
+        return struct_pb2.Value(
             struct_value=struct_pb2.Struct(
                 fields={
                     "image": struct_pb2.Value(
@@ -52,16 +127,30 @@ class VertexEmbedder:
             )
         )
 
-        response = client.predict(
-            endpoint=self.endpoint_name,
-            instances=[instance]
-        )
+    def _predict(self, image_bytes_list: List[bytes]) -> List[List[float]]:
+        """
+        Send one predict request with an instance per image
+
+        Args:
+            image_bytes_list: Images to embed (at most MAX_INSTANCES_PER_REQUEST)
 
-        embedding = list(response.predictions[0]['imageEmbedding'])
+        Returns:
+            Raw embeddings, in input order
+        """
+        instances = [self._build_instance(b) for b in image_bytes_list]
 
-        normalized_embedding = self._normalize_embedding(embedding)
+        client = get_prediction_client(self.region)
+        try:
+            response = client.predict(endpoint=self.endpoint_name, instances=instances)
+        except _CHANNEL_ERRORS + (ValueError,) as e:
+            # ValueError: the channel was closed underneath us
+            if isinstance(e, ValueError) and 'closed channel' not in str(e):
+                raise
+            reset_prediction_client(self.region, client)
+            client = get_prediction_client(self.region)
+            response = client.predict(endpoint=self.endpoint_name, instances=instances)
 
-        return normalized_embedding
+        return [list(prediction['imageEmbedding']) for prediction in response.predictions]
 
     def _normalize_embedding(self, embedding: List[float]) -> List[float]:
         """
@@ -73,28 +162,77 @@ class VertexEmbedder:
         Returns:
             Normalized embedding (L2 norm = 1.0)
         """
-        embedding_array = np.array(embedding)
-        norm = np.linalg.norm(embedding_array)
+        return self._normalize_embeddings([embedding])[0]
 
-        if norm == 0:
-            return embedding
+    def _normalize_embeddings(self, embeddings: List[List[float]]) -> List[List[float]]:
+        """
+        L2-normalize a batch of embeddings in one vectorized operation
+
+        Args:
+            embeddings: Raw embedding vectors
 
-        normalized = embedding_array / norm
-        return normalized.tolist()
+        Returns:
+            Normalized embeddings (zero vectors are returned unchanged)
+        """
+        matrix = np.asarray(embeddings, dtype=np.float64)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+
+        return (matrix / norms).tolist()
 
     def batch_generate_embeddings(self, image_bytes_list: List[bytes]) -> List[List[float]]:
         """
         Generate embeddings for multiple images
 
+        With a cache attached, images whose content hash is cached (including
+        repeats within the batch) are not sent to Vertex AI at all.
+
+        Images are packed into predict calls of up to MAX_INSTANCES_PER_REQUEST
+        instances; when that takes more than one call, the calls run
+        concurrently.
+
         Args:
             image_bytes_list: List of image bytes
 
         Returns:
-            List of embeddings
+            List of normalized embeddings, 1:1 with the inputs
         """
-        embeddings = []
-        for image_bytes in image_bytes_list:
-            embedding = self.generate_embedding(image_bytes)
-            embeddings.append(embedding)
-
-        return embeddings
+        if not image_bytes_list:
+            return []
+
+        if self.cache is None:
+            return self._embed(image_bytes_list)
+
+        keys = [content_key(b) for b in image_bytes_list]
+        found = self.cache.get_many(keys)
+
+        missing = {}
+        for key, image_bytes in zip(keys, image_bytes_list):
+            if key not in found:
+                missing.setdefault(key, image_bytes)
+        stats = self.cache.stats()
+        print(f"Embedding cache: {len(found)}/{len(found) + len(missing)} unique crops hit; "
+              f"instance hit rate {stats['hit_rate']:.0%} "
+              f"(memory {stats['memory_hits']}, persistent {stats['persistent_hits']}, "
+              f"misses {stats['misses']}, size {stats['size']})")
+
+        if missing:
+            fresh = dict(zip(missing, self._embed(list(missing.values()))))
+            self.cache.put_many(fresh)
+            found.update(fresh)
+
+        return [found[key] for key in keys]
+
+    def _embed(self, image_bytes_list: List[bytes]) -> List[List[float]]:
+        """Embed images via Vertex AI, chunked and concurrent (no cache)."""
+        size = max(1, MAX_INSTANCES_PER_REQUEST)
+        chunks = [image_bytes_list[i:i + size] for i in range(0, len(image_bytes_list), size)]
+
+        if len(chunks) == 1:
+            raw = self._predict(chunks[0])
+        else:
+            workers = min(MAX_CONCURRENT_REQUESTS, len(chunks))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                raw = [emb for chunk in executor.map(self._predict, chunks) for emb in chunk]
+
+        return self._normalize_embeddings(raw)
@@ -2,7 +2,12 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from datetime import datetime, timezone
 from google.cloud import firestore
+from storage.storage_client import StorageClient
+from embeddings.embedding_index import record_item_change
+from embeddings.embedding_store import set_embeddings
+from utils import stats_summary, wear_rollups
 
 
 def add_new_item(item_type: str, cropped_image_url: str,
@@ -14,7 +19,8 @@ def add_new_item(item_type: str, cropped_image_url: str,
     Args:
         item_type: 'shirt' or 'pants'
         cropped_image_url: gs:// URL to cropped image
-        embedding: 1408-dimensional embedding vector
+        embedding: 1408-dimensional embedding vector, as a float list or a
+            base64 blob from embedding_codec.to_wire
         original_photo_url: gs:// URL to original photo
         log_wear: Whether to log wear event
 
@@ -22,31 +28,46 @@ def add_new_item(item_type: str, cropped_image_url: str,
         Dict with new item ID
     """
     db = firestore.Client(project=os.getenv('GCP_PROJECT_ID'))
+    storage = StorageClient()
 
     # Create new item
+    thumbnail_url, thumbnail_hash = storage.ensure_thumbnail(cropped_image_url)
     item_data = {
         'type': item_type,
         'image_urls': [cropped_image_url],
-        'embeddings': {'0': embedding},
+        'thumbnail_url': thumbnail_url,
+        'thumbnail_hash': thumbnail_hash,
         'created_at': firestore.SERVER_TIMESTAMP,
+        'updated_at': firestore.SERVER_TIMESTAMP,
         'last_worn': firestore.SERVER_TIMESTAMP if log_wear else None,
         'wear_count': 1 if log_wear else 0
     }
 
-    # Add to Firestore
-    doc_ref = db.collection('clothing_items').add(item_data)
-    item_id = doc_ref[1].id
-
-    # Log wear if requested
-    if log_wear:
-        wear_log_data = {
-            'item_id': item_id,
-            'item_type': item_type,
-            'worn_at': firestore.SERVER_TIMESTAMP,
-            'confidence_score': 1.0,
-            'original_image_url': original_photo_url
-        }
-        db.collection('wear_logs').add(wear_log_data)
+    # Add to Firestore; the embedding sample goes in its own document
+    doc_ref = db.collection('clothing_items').document()
+    item_id = doc_ref.id
+    embeddings = {'0': embedding}
+
+    # Log wear if requested (with its day's rollup, in the same transaction)
+    wear_log_data = {
+        'item_id': item_id,
+        'item_type': item_type,
+        'worn_at': firestore.SERVER_TIMESTAMP,
+        'confidence_score': 1.0,
+        'original_image_url': original_photo_url
+    }
+
+    def write(batch):
+        batch.set(doc_ref, item_data)
+        set_embeddings(db, item_id, item_type, embeddings, cropped_image_url, batch)
+        if log_wear:
+            batch.set(db.collection('wear_logs').document(), wear_log_data)
+            wear_rollups.record_wears(db, item_type, [None], batch=batch)
+
+    # SERVER_TIMESTAMP sentinels can't go into the summary; now is close enough
+    summary_after = {**item_data, 'last_worn': datetime.now(timezone.utc) if log_wear else None}
+    stats_summary.commit(db, write, {item_id: (None, summary_after)})
+    record_item_change(db, item_type, item_id, embeddings, cropped_image_url)
 
     return {
         'success': True,
@@ -2,9 +2,13 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional
 from google.cloud import firestore
+from storage.storage_client import StorageClient
+from embeddings.embedding_index import record_item_change
+from embeddings.embedding_store import get_embeddings, set_embeddings
+from utils import stats_summary, wear_rollups
 
 
 MAX_SAMPLES = 10
@@ -21,7 +25,8 @@ def confirm_match(item_id: str, item_type: str, original_photo_url: str,
         item_type: 'shirt' or 'pants'
         original_photo_url: gs:// URL to original photo (may be empty for manual logs)
         similarity_score: Match confidence (optional)
-        new_embedding: New 1408-dim embedding to add as sample (optional)
+        new_embedding: New 1408-dim embedding to add as sample, as a float
+            list or a base64 blob from embedding_codec.to_wire (optional)
         cropped_url: gs:// URL to new cropped image (optional)
         worn_at: Explicit wear timestamp (optional). When None, uses server time.
 
@@ -35,6 +40,7 @@ def confirm_match(item_id: str, item_type: str, original_photo_url: str,
 
     update_data = {
         'wear_count': firestore.Increment(1),
+        'updated_at': firestore.SERVER_TIMESTAMP,
     }
 
     # last_worn semantics: only advance forward, never regress.
@@ -46,20 +52,25 @@ def confirm_match(item_id: str, item_type: str, original_photo_url: str,
         if existing_last_worn is None or worn_at > existing_last_worn:
             update_data['last_worn'] = worn_at
 
-    # Append new sample if provided and under cap
-    if new_embedding and cropped_url:
-        embeddings = item_data['embeddings']
-        if len(embeddings) < MAX_SAMPLES:
-            next_key = str(len(embeddings))
-            embeddings[next_key] = new_embedding
-            update_data['embeddings'] = embeddings
-            image_urls = item_data['image_urls']
-            image_urls.append(cropped_url)
-            update_data['image_urls'] = image_urls
-
-    item_ref.update(update_data)
-
-    # Create wear log
+    # Items created before thumbnails existed get one on their next wear
+    if not item_data.get('thumbnail_url') and item_data.get('image_urls'):
+        update_data['thumbnail_url'], update_data['thumbnail_hash'] = \
+            StorageClient().ensure_thumbnail(item_data['image_urls'][0])
+
+    # Append new sample if provided and under cap. Samples are aligned with
+    # image_urls, so the (small) item doc tells us whether there is room;
+    # the embeddings doc is only read when one is actually added.
+    embeddings = None
+    image_urls = list(item_data['image_urls'])
+    if new_embedding and cropped_url and len(image_urls) < MAX_SAMPLES:
+        embeddings = get_embeddings(db, item_id, item_data)
+        embeddings[str(len(embeddings))] = new_embedding
+        image_urls.append(cropped_url)
+        update_data['image_urls'] = image_urls
+        # Drop the legacy inline copy if this item hasn't been migrated yet
+        update_data['embeddings'] = firestore.DELETE_FIELD
+
+    # Wear log and its day's rollup commit together with the item update
     wear_log_data = {
         'item_id': item_id,
         'item_type': item_type,
@@ -68,7 +79,26 @@ def confirm_match(item_id: str, item_type: str, original_photo_url: str,
         'original_image_url': original_photo_url
     }
 
-    db.collection('wear_logs').add(wear_log_data)
+    def write(batch):
+        if embeddings is not None:
+            set_embeddings(db, item_id, item_type, embeddings, image_urls[0], batch)
+        batch.set(db.collection('wear_logs').document(), wear_log_data)
+        wear_rollups.record_wears(db, item_type, [worn_at], batch=batch)
+        batch.update(item_ref, update_data)
+
+    # ...and with the stats summary, which needs real values for the sentinels
+    summary_after = {
+        **item_data,
+        'image_urls': image_urls,
+        'thumbnail_url': update_data.get('thumbnail_url', item_data.get('thumbnail_url')),
+        'wear_count': item_data.get('wear_count', 0) + 1,
+        'last_worn': (datetime.now(timezone.utc) if worn_at is None
+                      else update_data.get('last_worn', item_data.get('last_worn'))),
+    }
+    stats_summary.commit(db, write, {item_id: (item_data, summary_after)})
+
+    if embeddings is not None:
+        record_item_change(db, item_type, item_id, embeddings, image_urls[0])
 
     # Get updated item data
     item_data = item_ref.get().to_dict()
@@ -4,6 +4,9 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from google.cloud import firestore
 from storage.storage_client import StorageClient
+from embeddings.embedding_index import record_item_change
+from embeddings.embedding_store import get_embeddings, set_embeddings, delete_embeddings
+from utils import stats_summary, wear_rollups
 
 
 def get_item_images(item_id: str) -> dict:
@@ -30,7 +33,7 @@ def get_item_images(item_id: str) -> dict:
     # Handle legacy items that may have 'image_url' (singular) instead of 'image_urls'
     image_urls = data.get('image_urls') or ([data['image_url']] if 'image_url' in data else [])
 
-    signed_urls = [storage.get_signed_url(url) for url in image_urls]
+    signed_urls = storage.sign_urls(image_urls)
 
     return {
         'success': True,
@@ -67,7 +70,6 @@ def delete_item_image(item_id: str, image_index: int) -> dict:
     data = item_doc.to_dict()
     # Handle legacy items that may have 'image_url' (singular) instead of 'image_urls'
     image_urls = data.get('image_urls') or ([data['image_url']] if 'image_url' in data else [])
-    embeddings = data.get('embeddings', {})
 
     if image_index < 0 or image_index >= len(image_urls):
         return {'success': False, 'error': 'Invalid image index'}
@@ -77,15 +79,26 @@ def delete_item_image(item_id: str, image_index: int) -> dict:
     if len(image_urls) == 1:
         # Last image — delete entire item
         storage.delete_image(gs_url_to_delete)
+        if data.get('thumbnail_url'):
+            storage.delete_image(data['thumbnail_url'])
 
         # Delete all wear logs for this item
         wear_logs = db.collection('wear_logs') \
             .where('item_id', '==', item_id).stream()
+        worn_at = []
         for log in wear_logs:
+            worn_at.append(log.to_dict().get('worn_at'))
             log.reference.delete()
 
-        # Delete the item document
-        item_ref.delete()
+        # Delete the item document and its embeddings; take the logs out of
+        # the rollups and the item out of the stats summary
+        def write(batch):
+            batch.delete(item_ref)
+            delete_embeddings(db, item_id, batch)
+            wear_rollups.record_wears(db, data['type'], worn_at, delta=-1, batch=batch)
+
+        stats_summary.commit(db, write, {item_id: (data, None)})
+        record_item_change(db, data['type'], item_id)
 
         return {
             'success': True,
@@ -97,6 +110,7 @@ def delete_item_image(item_id: str, image_index: int) -> dict:
         storage.delete_image(gs_url_to_delete)
 
         new_image_urls = image_urls[:image_index] + image_urls[image_index + 1:]
+        embeddings = get_embeddings(db, item_id, data)
 
         # Rebuild embeddings with sequential keys
         new_embeddings = {}
@@ -107,10 +121,32 @@ def delete_item_image(item_id: str, image_index: int) -> dict:
             new_embeddings[str(new_key)] = embeddings[str(old_key)]
             new_key += 1
 
-        item_ref.update({
+        update_data = {
             'image_urls': new_image_urls,
-            'embeddings': new_embeddings
-        })
+            # Drop the legacy inline copy if this item hasn't been migrated yet
+            'embeddings': firestore.DELETE_FIELD,
+            'updated_at': firestore.SERVER_TIMESTAMP,
+        }
+
+        # The thumbnail follows the primary image
+        if image_index == 0:
+            if data.get('thumbnail_url'):
+                storage.delete_image(data['thumbnail_url'])
+            update_data['thumbnail_url'], update_data['thumbnail_hash'] = \
+                storage.ensure_thumbnail(new_image_urls[0])
+
+        def write(batch):
+            batch.update(item_ref, update_data)
+            set_embeddings(db, item_id, data['type'], new_embeddings, new_image_urls[0], batch)
+
+        # The summary shows the primary image, so only index 0 changes it
+        if image_index == 0:
+            stats_summary.commit(db, write, {item_id: (data, {**data, **update_data})})
+        else:
+            batch = db.batch()
+            write(batch)
+            batch.commit()
+        record_item_change(db, data['type'], item_id, new_embeddings, new_image_urls[0])
 
         return {
             'success': True,
@@ -2,61 +2,127 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import base64
+import binascii
+import json
 from datetime import datetime, timezone
+from typing import Optional
 from google.cloud import firestore
 from storage.storage_client import StorageClient
 
+# Only the fields a listing needs; skips the (large) embeddings map
+LIST_FIELDS = ['type', 'image_urls', 'thumbnail_url', 'thumbnail_hash', 'wear_count', 'last_worn']
 
-def list_items() -> dict:
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def list_items(item_type: Optional[str] = None,
+               page_size: Optional[int] = None,
+               page_token: Optional[str] = None) -> dict:
     """
-    Return every clothing item, grouped by type, with signed thumbnail URLs.
+    Return clothing items with signed thumbnail URLs.
 
     Used by the manual-wear-logging UI: the user needs to browse all items,
     not just the top-N from /statistics.
 
-    Returns:
+    Without page_size/page_token every item is returned, grouped by type:
         {
-          "shirts": [{ id, image_url, wear_count, last_worn, days_since_worn }, ...],
+          "shirts": [{ id, type, image_url, image_hash, thumbnail_url, thumbnail_hash,
+                       wear_count, last_worn, days_since_worn }, ...],
           "pants":  [...]
         }
+        thumbnail_url/thumbnail_hash are None for items without a thumbnail
+        yet (see scripts/backfill_thumbnails.py); clients fall back to image_url.
         Each list sorted by last_worn desc (None last) so recently-worn items
         — the most likely candidates for "I wore this today" — surface first.
+
+    With page_size or page_token, one page in the same order (ties by id):
+        {
+          "items": [{ id, type, image_url, ... }, ...],   # both types unless item_type
+          "next_page_token": "..." or None on the last page
+        }
+
+    Args:
+        item_type: Only list this type ('shirt' or 'pants')
+        page_size: Items per page (default 50, capped at 200)
+        page_token: next_page_token from the previous page
+
+    Raises:
+        ValueError: If page_token is malformed
     """
     db = firestore.Client(project=os.getenv('GCP_PROJECT_ID'))
     storage = StorageClient()
 
-    # Content hashes for all cropped items in one listing (cheap), so clients
-    # can cache images by hash. Stored image_urls may be gs:// paths or https
-    # signed URLs, so look up by normalized blob path. Signed URLs are still
-    # generated per item (local crypto) and cached so duplicates sign once.
-    hash_by_path = storage.get_hashes_by_path("cropped-items/")
-    seen_urls: dict = {}
-    def sign_url(url: str) -> str:
-        if url not in seen_urls:
-            seen_urls[url] = storage.get_signed_url(url)
-        return seen_urls[url]
+    query = db.collection('clothing_items').select(LIST_FIELDS)
+    if item_type:
+        query = query.where('type', '==', item_type)
 
-    now = datetime.now(timezone.utc)
+    paginated = page_size is not None or page_token is not None
+    if paginated:
+        page_size = max(1, min(page_size or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+        query = (query.order_by('last_worn', direction=firestore.Query.DESCENDING)
+                 .order_by('__name__', direction=firestore.Query.DESCENDING))
+        if page_token:
+            query = query.start_after(_decode_page_token(page_token))
+        # One extra document tells us whether another page exists
+        docs = list(query.limit(page_size + 1).stream())
+        has_more = len(docs) > page_size
+        docs = docs[:page_size]
+    else:
+        docs = list(query.stream())
 
-    shirts = []
-    pants = []
+    now = datetime.now(timezone.utc)
 
-    for doc in db.collection('clothing_items').stream():
+    entries = []
+    for doc in docs:
         data = doc.to_dict()
         last_worn = data.get('last_worn')
-        stored_url = data['image_urls'][0]
-        entry = {
+        thumbnail_url = data.get('thumbnail_url')
+        entries.append({
             'id': doc.id,
-            'image_url': sign_url(stored_url),
-            'image_hash': hash_by_path.get(storage._blob_path(stored_url)),
+            'type': data['type'],
+            'image_url': data['image_urls'][0],
+            'image_hash': None,
+            'thumbnail_url': thumbnail_url,
+            'thumbnail_hash': data.get('thumbnail_hash') if thumbnail_url else None,
             'wear_count': data.get('wear_count', 0),
             'last_worn': last_worn.isoformat() if last_worn else None,
             'days_since_worn': (now - last_worn).days if last_worn else None,
+        })
+
+    # Content hashes so clients can cache images by hash. Stored image_urls
+    # may be gs:// paths or https signed URLs, so look up by normalized blob
+    # path. A page looks up only its own blobs; the full listing reads the
+    # whole cropped-items/ prefix once, which it returns anyway. Thumbnail
+    # hashes are stored on the item (thumbnail_hash); only items written
+    # before that need a lookup. Signed URLs are filled in afterwards with a
+    # single sign_urls batch.
+    lookups = [(entry, 'thumbnail_hash', entry['thumbnail_url']) for entry in entries
+               if entry['thumbnail_url'] and entry['thumbnail_hash'] is None]
+    if paginated:
+        lookups += [(entry, 'image_hash', entry['image_url']) for entry in entries]
+    else:
+        hash_by_path = storage.get_hashes_by_path("cropped-items/")
+        for entry in entries:
+            entry['image_hash'] = hash_by_path.get(storage._blob_path(entry['image_url']))
+    if lookups:
+        hashes = storage.get_hashes([url for _, _, url in lookups])
+        for (entry, key, _), content_hash in zip(lookups, hashes):
+            entry[key] = content_hash
+
+    # Sign every image and thumbnail URL in one batch
+    fields = [(entry, key) for entry in entries
+              for key in ('image_url', 'thumbnail_url') if entry[key]]
+    signed = storage.sign_urls([entry[key] for entry, key in fields])
+    for (entry, key), url in zip(fields, signed):
+        entry[key] = url
+
+    if paginated:
+        return {
+            'items': entries,
+            'next_page_token': _encode_page_token(entries[-1]) if has_more else None,
         }
-        if data['type'] == 'shirt':
-            shirts.append(entry)
-        elif data['type'] == 'pants':
-            pants.append(entry)
 
     def by_recent(items):
         # Recently-worn first; items never worn (last_worn=None) at the end.
@@ -66,6 +132,25 @@ def list_items() -> dict:
         return with_date + without_date
 
     return {
-        'shirts': by_recent(shirts),
-        'pants': by_recent(pants),
+        'shirts': by_recent([e for e in entries if e['type'] == 'shirt']),
+        'pants': by_recent([e for e in entries if e['type'] == 'pants']),
     }
+
+
+def _encode_page_token(entry: dict) -> str:
+    """Opaque cursor for the (last_worn, id) of the last item on a page."""
+    payload = json.dumps({'last_worn': entry['last_worn'], 'id': entry['id']})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _decode_page_token(token: str) -> dict:
+    """Firestore start_after() values for a token from _encode_page_token."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        last_worn = payload['last_worn']
+        return {
+            'last_worn': datetime.fromisoformat(last_worn) if last_worn else None,
+            '__name__': payload['id'],
+        }
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid page_token: {token}") from e
@@ -1,18 +1,23 @@
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from storage.storage_client import StorageClient
 from embeddings.vertex_embedder import VertexEmbedder
-from utils.match_pipeline import embed_and_match
+from embeddings.embedding_cache import get_embedding_cache
+from utils.match_pipeline import embed_and_match_many, upload_original, PIPELINE_WORKERS
+from utils.image_cropper import renditions_from_crop
 from google.cloud import firestore
 
 
 def process_manual_crop(original_image_bytes: bytes,
                         shirt_image_bytes: bytes = None,
-                        pants_image_bytes: bytes = None) -> dict:
+                        pants_image_bytes: bytes = None,
+                        embedding_encoding: Optional[str] = None) -> dict:
     """
     Process manually-cropped outfit images (skip AI detection).
 
@@ -20,32 +25,39 @@ def process_manual_crop(original_image_bytes: bytes,
         original_image_bytes: Full outfit photo bytes
         shirt_image_bytes: User-cropped shirt region (None if skipped)
         pants_image_bytes: User-cropped pants region (None if skipped)
+        embedding_encoding: 'float16'/'int8' to return embeddings as base64
+            blobs instead of float lists (optional)
 
     Returns:
         Dict with match results (same structure as process_outfit_image)
     """
     storage = StorageClient()
-    embedder = VertexEmbedder()
     db = firestore.Client(project=os.getenv('GCP_PROJECT_ID'))
-
-    # Upload original photo
-    original_url = storage.upload_original_photo(original_image_bytes)
-
-    result = {
-        'success': True,
-        'original_photo_url': storage.get_signed_url(original_url),
-        'shirt': None,
-        'pants': None
-    }
-
-    # Process each provided crop
-    items = [('shirt', shirt_image_bytes), ('pants', pants_image_bytes)]
-    for item_type, crop_bytes in items:
-        if crop_bytes is None:
-            continue
-
-        result[item_type] = embed_and_match(
-            crop_bytes, item_type, storage, embedder, db
+    embedder = VertexEmbedder(cache=get_embedding_cache(db))
+
+    with ThreadPoolExecutor(max_workers=PIPELINE_WORKERS) as executor:
+        # Upload original photo alongside the crops
+        original_future = executor.submit(upload_original, storage, original_image_bytes)
+
+        # Archival + embedding renditions of every provided crop
+        items = [('shirt', shirt_image_bytes), ('pants', pants_image_bytes)]
+        renditions = {item_type: executor.submit(renditions_from_crop, crop_bytes)
+                      for item_type, crop_bytes in items if crop_bytes is not None}
+        renditions = {item_type: f.result() for item_type, f in renditions.items()}
+
+        # Embed them in one batch and match each
+        matches = embed_and_match_many(
+            {t: r.archive for t, r in renditions.items()}, storage, embedder, db, executor,
+            embed_crops={t: r.embed for t, r in renditions.items()},
+            embedding_encoding=embedding_encoding
         )
 
+        result = {
+            'success': True,
+            'original_photo_url': original_future.result(),
+            'shirt': None,
+            'pants': None
+        }
+        result.update(matches)
+
     return result
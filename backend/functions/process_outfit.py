@@ -1,70 +1,89 @@
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from storage.storage_client import StorageClient
 from gemini.vision_detector import VisionDetector
-from utils.image_cropper import crop_clothing_item
-from utils.match_pipeline import embed_and_match
+from gemini.detection_cache import get_detection_cache
+from utils.image_cropper import crop_renditions
+from utils.match_pipeline import embed_and_match_many, upload_original, PIPELINE_WORKERS
 from embeddings.vertex_embedder import VertexEmbedder
+from embeddings.embedding_cache import get_embedding_cache
 from google.cloud import firestore
 
 
-def process_outfit_image(image_bytes: bytes) -> dict:
+def process_outfit_image(image_bytes: bytes,
+                         embedding_encoding: Optional[str] = None,
+                         clients: Optional[Tuple] = None) -> dict:
     """
     Main processing pipeline for outfit photo.
 
-    Steps:
-        1. Upload original photo to Cloud Storage
+    Steps run as a small DAG on a bounded thread pool:
+        1. Upload original photo to Cloud Storage and sign it
+           (overlaps step 2)
         2. Detect shirt & pants via Gemini Vision
-        3. Crop each detected item
-        4. Generate embeddings via Vertex AI
-        5. Search Firestore for similar items
-        6. Return match results
+        3. Crop all detected items from one decode of the photo
+        4. Embed all crops in one Vertex AI batch (overlapping the crop uploads)
+        5-6. Search the embedding index per item and build the results
+
+    End-to-end latency is roughly the slowest branch rather than the sum.
 
     Args:
         image_bytes: Image data as bytes
+        embedding_encoding: 'float16'/'int8' to return embeddings as base64
+            blobs instead of float lists (optional)
+        clients: (storage, db, detector, embedder) from pipeline_clients(),
+            shared across photos by batch callers (optional; fresh if None)
 
     Returns:
         Dict with match results for shirt and pants
     """
-    storage = StorageClient()
-    detector = VisionDetector()
-    embedder = VertexEmbedder()
-    db = firestore.Client(project=os.getenv('GCP_PROJECT_ID'))
+    storage, db, detector, embedder = clients or pipeline_clients()
 
-    # 1. Upload original photo
-    original_url = storage.upload_original_photo(image_bytes)
+    with ThreadPoolExecutor(max_workers=PIPELINE_WORKERS) as executor:
+        # 1. Upload + sign original photo while detection runs
+        original_future = executor.submit(upload_original, storage, image_bytes)
 
-    # 2. Detect clothing items
-    detection_result = detector.detect_clothing(image_bytes)
+        # 2. Detect clothing items
+        detection_result = detector.detect_clothing(image_bytes)
 
-    result = {
-        'success': True,
-        'original_photo_url': storage.get_signed_url(original_url),
-        'shirt': None,
-        'pants': None
-    }
+        # 3. Crop every detected item from a single decode: an archival
+        #    rendition for GCS and a small one for Vertex (encoded in parallel)
+        boxes = {}
+        for item_type in ['shirt', 'pants']:
+            detection = detection_result.get(item_type)
 
-    # 3. Process each detected item
-    for item_type in ['shirt', 'pants']:
-        detection = detection_result.get(item_type)
+            if not detection or not detection.get('detected'):
+                continue
 
-        if not detection or not detection.get('detected'):
-            continue
+            boxes[item_type] = detection['bounding_box']
+        renditions = crop_renditions(image_bytes, boxes, executor=executor)
 
-        # Crop item from original image
-        cropped_bytes = crop_clothing_item(
-            image_bytes,
-            detection['bounding_box'],
-            item_type=item_type
+        # 4-6. Batch-embed, match, and build results
+        matches = embed_and_match_many(
+            {t: r.archive for t, r in renditions.items()}, storage, embedder, db, executor,
+            embed_crops={t: r.embed for t, r in renditions.items()},
+            embedding_encoding=embedding_encoding
         )
 
-        # 4-6. Embed, match, and build result
-        result[item_type] = embed_and_match(
-            cropped_bytes, item_type, storage, embedder, db
-        )
+        result = {
+            'success': True,
+            'original_photo_url': original_future.result(),
+            'shirt': None,
+            'pants': None
+        }
+        result.update(matches)
 
     return result
+
+
+def pipeline_clients() -> Tuple[StorageClient, firestore.Client, VisionDetector, VertexEmbedder]:
+    """Clients for process_outfit_image; safe to share across threads."""
+    db = firestore.Client(project=os.getenv('GCP_PROJECT_ID'))
+    return (StorageClient(), db, VisionDetector(cache=get_detection_cache(db)),
+            VertexEmbedder(cache=get_embedding_cache(db)))
+
@@ -0,0 +1,65 @@
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.process_outfit import process_outfit_image, pipeline_clients
+
+
+# Photos in flight at once. Each runs process_outfit_image's own bounded
+# pool (PIPELINE_WORKERS), so this also caps concurrent Gemini / Vertex calls.
+BATCH_WORKERS = int(os.getenv('OUTFIT_BATCH_WORKERS', '3'))
+MAX_BATCH_IMAGES = int(os.getenv('OUTFIT_BATCH_MAX_IMAGES', '100'))
+
+# (name, loader): loader returns the photo bytes, or raises if the entry is bad
+BatchImage = Tuple[Optional[str], Callable[[], bytes]]
+
+
+def process_outfit_batch(images: Iterable[BatchImage],
+                         embedding_encoding: Optional[str] = None) -> Iterator[dict]:
+    """
+    Run process_outfit_image over many photos, yielding results as they finish.
+
+    ``images`` is consumed lazily, so a streamed request body is read as
+    earlier photos are processed, and at most BATCH_WORKERS photos (and their
+    bytes) are held at once. All photos share one set of clients.
+
+    Args:
+        images: (name, loader) per photo; loaders run on the worker threads
+        embedding_encoding: As for process_outfit_image (optional)
+
+    Yields:
+        One dict per photo in completion order: process_outfit_image's result
+        plus 'index' (position in ``images``) and 'name', or
+        {'index', 'name', 'success': False, 'error'} if that photo failed.
+        Photos past MAX_BATCH_IMAGES are reported as failed, not processed.
+    """
+    clients = pipeline_clients()
+
+    def process(index, name, load):
+        try:
+            result = process_outfit_image(load(), embedding_encoding, clients)
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        return {'index': index, 'name': name, **result}
+
+    with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as executor:
+        pending = set()
+        for index, (name, load) in enumerate(images):
+            if index >= MAX_BATCH_IMAGES:
+                yield {'index': index, 'name': name, 'success': False,
+                       'error': f'Batch limit of {MAX_BATCH_IMAGES} images exceeded'}
+                continue
+            if len(pending) >= BATCH_WORKERS:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(executor.submit(process, index, name, load))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
@@ -5,91 +5,92 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 from google.cloud import firestore
 from datetime import datetime, timedelta, timezone
 from storage.storage_client import StorageClient
+from utils import stats_summary, wear_rollups
 
 
-def get_statistics() -> dict:
+def get_statistics(days: int = 30) -> dict:
     """
     Calculate wardrobe statistics
+
+    Totals and most/least worn come from the materialized stats/summary
+    document (one read); until scripts/rebuild_stats.py has created it, from
+    the aggregation and limit queries it is built with. The not-worn list is
+    a last_worn range query. Either way the cost follows the result size,
+    not the wardrobe size.
+
+    Args:
+        days: wear_frequency window (1 .. wear_rollups.MAX_WINDOW_DAYS),
+            read from one daily rollup document per day
+
+    Returns:
+        Dict with most/least/not-worn items, totals and wear_frequency
+
+    Raises:
+        ValueError: If days is out of range
     """
+    if not 1 <= days <= wear_rollups.MAX_WINDOW_DAYS:
+        raise ValueError(f"days must be between 1 and {wear_rollups.MAX_WINDOW_DAYS}")
+
     db = firestore.Client(project=os.getenv('GCP_PROJECT_ID'))
     storage = StorageClient()
 
     thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
 
-    # Single query for all items
-    all_items = []
-    for doc in db.collection('clothing_items').stream():
-        data = doc.to_dict()
-        all_items.append({
-            'id': doc.id,
-            'type': data['type'],
-            'image_url': data['image_urls'][0],
-            'wear_count': data.get('wear_count', 0),
-            'last_worn': data.get('last_worn'),
-        })
-
-    # Sort for most/least worn
-    sorted_by_wear = sorted(all_items, key=lambda x: x['wear_count'], reverse=True)
-    most_worn_raw = sorted_by_wear[:5]
-    least_worn_raw = sorted(all_items, key=lambda x: x['wear_count'])[:5]
-
-    # Items not worn in 30+ days
-    not_worn_30_raw = [
-        item for item in all_items
-        if item['last_worn'] is None or item['last_worn'] < thirty_days_ago
-    ]
-
-    # Sign URLs only for items we need
-    seen_urls = {}
+    snapshot = stats_summary.summary_ref(db).get()
+    summary = snapshot.to_dict() if snapshot.exists else stats_summary.compute_summary(db)
+    most_worn_raw, least_worn_raw = summary['most_worn'], summary['least_worn']
+    not_worn_30_raw = _not_worn_since(db, thirty_days_ago)
+    totals = summary['totals']
+
+    # Sign URLs only for items we need, in one batch
+    needed = most_worn_raw + least_worn_raw + not_worn_30_raw
+    urls = [item[key] for item in needed
+            for key in ('image_url', 'thumbnail_url') if item[key]]
+    signed_by_url = dict(zip(urls, storage.sign_urls(urls)))
+
+    # Thumbnail hashes are stored with each item; look up only the few
+    # thumbnails written before that (no bucket listing)
+    unhashed = list(dict.fromkeys(item['thumbnail_url'] for item in needed
+                                  if item['thumbnail_url'] and not item.get('thumbnail_hash')))
+    hash_by_url = dict(zip(unhashed, storage.get_hashes(unhashed))) if unhashed else {}
+
     def sign_url(url):
-        if url not in seen_urls:
-            seen_urls[url] = storage.get_signed_url(url)
-        return seen_urls[url]
+        return signed_by_url[url]
+
+    def thumbnail_hash(item):
+        if not item['thumbnail_url']:
+            return None
+        return item.get('thumbnail_hash') or hash_by_url.get(item['thumbnail_url'])
 
     def format_item(item):
         return {
             'id': item['id'],
             'type': item['type'],
             'image_url': sign_url(item['image_url']),
+            'thumbnail_url': sign_url(item['thumbnail_url']) if item['thumbnail_url'] else None,
+            'thumbnail_hash': thumbnail_hash(item),
             'wear_count': item['wear_count'],
             'last_worn': item['last_worn'].isoformat() if item['last_worn'] else None,
             'days_since_worn': calculate_days_since(item['last_worn']),
         }
 
-    most_worn = [format_item(i) for i in most_worn_raw]
-    least_worn = [format_item(i) for i in least_worn_raw]
-    not_worn_30_days = [format_item(i) for i in not_worn_30_raw]
-
-    # Totals
-    total_shirts = sum(1 for item in all_items if item['type'] == 'shirt')
-    total_pants = sum(1 for item in all_items if item['type'] == 'pants')
-    total_wears = sum(item['wear_count'] for item in all_items)
-
-    # Wear frequency (last 30 days)
-    wear_logs_query = db.collection('wear_logs')\
-        .where('worn_at', '>=', thirty_days_ago)\
-        .stream()
-
-    wear_frequency = {}
-    for log in wear_logs_query:
-        log_data = log.to_dict()
-        date_str = log_data['worn_at'].date().isoformat()
-        wear_frequency[date_str] = wear_frequency.get(date_str, 0) + 1
-
     return {
-        'most_worn': most_worn,
-        'least_worn': least_worn,
-        'not_worn_30_days': not_worn_30_days,
-        'totals': {
-            'total_shirts': total_shirts,
-            'total_pants': total_pants,
-            'total_items': total_shirts + total_pants,
-            'total_wears': total_wears
-        },
-        'wear_frequency': wear_frequency
+        'most_worn': [format_item(i) for i in most_worn_raw],
+        'least_worn': [format_item(i) for i in least_worn_raw],
+        'not_worn_30_days': [format_item(i) for i in not_worn_30_raw],
+        'totals': totals,
+        'wear_frequency': wear_rollups.get_wear_frequency(db, days)
     }
 
 
+def _not_worn_since(db: firestore.Client, since: datetime) -> list:
+    """Items last worn before ``since`` or never: a range query plus the never-worn ones."""
+    listed = db.collection('clothing_items').select(stats_summary.SUMMARY_FIELDS)
+    docs = list(listed.where('last_worn', '==', None).stream()) + \
+        list(listed.where('last_worn', '<', since).stream())
+    return [{'id': doc.id, **stats_summary.summary_entry(doc.to_dict())} for doc in docs]
+
+
 def calculate_days_since(timestamp):
     """Calculate days since timestamp"""
     if timestamp is None:
@@ -0,0 +1,174 @@
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from PIL import Image
+from google.cloud import firestore
+
+from .prompts import PROMPT_VERSION
+
+
+DETECTION_CACHE_COLLECTION = 'detection_cache'
+
+# Max Hamming distance (of 64 bits) between dHashes treated as the same photo.
+# Re-encoded or recompressed copies typically land within 0-4 bits. Capped at
+# 9 so the band lookup fits one array_contains_any query (<= 10 values).
+DETECTION_CACHE_RADIUS = min(int(os.getenv('DETECTION_CACHE_RADIUS', '6')), 9)
+
+DETECTION_CACHE_TTL_SECONDS = int(os.getenv('DETECTION_CACHE_TTL_SECONDS', str(30 * 24 * 3600)))
+
+# Candidates fetched per lookup before the exact Hamming check
+_CANDIDATE_LIMIT = 20
+
+HASH_BITS = 64
+
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """
+    Difference hash of an image.
+
+    The image is reduced to a (hash_size + 1) x hash_size grayscale
+    thumbnail and each bit records whether a pixel is brighter than its right
+    neighbour, so it survives re-encoding, recompression and resizing.
+
+    Args:
+        image: PIL image (any mode or size)
+        hash_size: Bits per row; 8 gives a 64-bit hash
+
+    Returns:
+        Hash as a non-negative int
+    """
+    small = image.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = small.tobytes()
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def hash_bands(value: int, radius: int = DETECTION_CACHE_RADIUS) -> List[str]:
+    """
+    Split a hash into radius + 1 band tokens for the Firestore lookup.
+
+    By pigeonhole, two hashes within ``radius`` bits share at least one band
+    exactly. Tokens carry the prompt version and band layout, so entries from
+    another prompt version or radius are never even fetched.
+    """
+    n_bands = radius + 1
+    tokens = []
+    start = 0
+    for i in range(n_bands):
+        width = HASH_BITS // n_bands + (1 if i < HASH_BITS % n_bands else 0)
+        band = (value >> (HASH_BITS - start - width)) & ((1 << width) - 1)
+        tokens.append(f"p{PROMPT_VERSION}:{n_bands}:{i}:{band:x}")
+        start += width
+    return tokens
+
+
+class DetectionCache:
+    """
+    Reuses Gemini detections for near-identical photos.
+
+    Entries live in the detection_cache collection with the image's dHash,
+    its band tokens, the prompt version and an expires_at for Firestore TTL.
+    The cache is best-effort: Firestore errors count as a miss.
+    """
+
+    def __init__(self, db: firestore.Client,
+                 radius: int = DETECTION_CACHE_RADIUS,
+                 ttl_seconds: int = DETECTION_CACHE_TTL_SECONDS):
+        self.db = db
+        self.radius = min(radius, 9)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, image: Image.Image) -> Optional[Dict]:
+        """
+        Find the cached detection closest to ``image`` within the radius.
+
+        Args:
+            image: Photo about to be sent for detection
+
+        Returns:
+            Detection result dict, or None on a miss
+        """
+        value = dhash(image)
+        best = None
+        try:
+            docs = (self.db.collection(DETECTION_CACHE_COLLECTION)
+                    .where('bands', 'array_contains_any', hash_bands(value, self.radius))
+                    .limit(_CANDIDATE_LIMIT)
+                    .stream())
+            now = datetime.now(timezone.utc)
+            for doc in docs:
+                data = doc.to_dict()
+                if data.get('prompt_version') != PROMPT_VERSION:
+                    continue
+                expires_at = data.get('expires_at')
+                if expires_at and expires_at <= now:
+                    continue
+                distance = hamming_distance(value, int(data['dhash'], 16))
+                if distance <= self.radius and (best is None or distance < best[0]):
+                    best = (distance, data['result'])
+        except Exception as e:
+            print(f"Detection cache read failed: {e}")
+
+        with self._lock:
+            if best is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return best[1] if best else None
+
+    def store(self, image: Image.Image, result: Dict) -> None:
+        """
+        Record a fresh detection for ``image``.
+
+        Args:
+            image: Photo that was sent for detection
+            result: Validated detection result
+        """
+        value = dhash(image)
+        try:
+            self.db.collection(DETECTION_CACHE_COLLECTION).document(f"{value:016x}").set({
+                'dhash': f"{value:016x}",
+                'bands': hash_bands(value, self.radius),
+                'prompt_version': PROMPT_VERSION,
+                'result': result,
+                'created_at': firestore.SERVER_TIMESTAMP,
+                'expires_at': datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds),
+            })
+        except Exception as e:
+            print(f"Detection cache write failed: {e}")
+
+    def stats(self) -> dict:
+        """Hit/miss counters since this process started."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+_cache: Optional[DetectionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_detection_cache(db: firestore.Client) -> DetectionCache:
+    """Return the process-wide detection cache (counters shared across requests)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DetectionCache(db)
+        return _cache
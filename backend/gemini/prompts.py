@@ -1,3 +1,7 @@
+# Bump whenever DETECTION_PROMPT (or the model it targets) changes: cached
+# detections are only reused when they were produced by the same version.
+PROMPT_VERSION = 1
+
 DETECTION_PROMPT = """
 Analyze this full-body photo and detect the shirt and pants.
 Return ONLY a JSON object with this exact structure (no markdown, no extra text):
@@ -3,13 +3,25 @@ import os
 import json
 from PIL import Image
 import io
-from typing import Dict
+from typing import Dict, Optional
 
+from storage.image_utils import prepare_for_detection, DETECTION_MAX_SIDE
 from .prompts import DETECTION_PROMPT
+from .detection_cache import DetectionCache
 
 
 class VisionDetector:
-    def __init__(self):
+    def __init__(self, cache: Optional[DetectionCache] = None,
+                 max_side: Optional[int] = DETECTION_MAX_SIDE):
+        """
+        Args:
+            cache: Perceptual-hash detection cache (optional; every photo is
+                sent to Gemini if None)
+            max_side: Longest side of the copy sent to Gemini (None sends
+                the photo at full resolution)
+        """
+        self.cache = cache
+        self.max_side = max_side
         genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
         self.model = genai.GenerativeModel('gemini-2.5-flash')
 
@@ -17,21 +29,40 @@ class VisionDetector:
         """
         Detect shirt and pants in full-body photo.
 
+        Gemini sees a copy downscaled to max_side; the normalized boxes it
+        returns apply unchanged to the full-resolution ``image_bytes``.
+        Near-identical photos (within the cache's Hamming radius) reuse a
+        cached result instead of calling Gemini.
+
         Args:
             image_bytes: Image data as bytes
 
         Returns:
             Dict with 'shirt' and 'pants' detection results
         """
+        if self.max_side:
+            image_bytes = prepare_for_detection(image_bytes, self.max_side)
         image = Image.open(io.BytesIO(image_bytes))
 
+        if self.cache is not None:
+            cached = self.cache.lookup(image)
+            stats = self.cache.stats()
+            print(f"Detection cache: {'hit' if cached is not None else 'miss'}; "
+                  f"instance hit rate {stats['hit_rate']:.0%} "
+                  f"(hits {stats['hits']}, misses {stats['misses']})")
+            if cached is not None:
+                return cached
+
         try:
             response = self.model.generate_content([DETECTION_PROMPT, image])
             result = self._parse_response(response.text)
-            return result
         except Exception as e:
             raise ValueError(f"Failed to detect clothing: {e}")
 
+        if self.cache is not None and self.validate_detection(result):
+            self.cache.store(image, result)
+        return result
+
     def _parse_response(self, response_text: str) -> Dict:
         """
         Parse Gemini response and extract JSON.
@@ -1,6 +1,7 @@
 import functions_framework
-from flask import jsonify
+from flask import Response, jsonify, stream_with_context
 import base64
+import json
 from datetime import datetime
 from auth import require_api_key
 
@@ -12,7 +13,11 @@ def process_outfit(request):
     HTTP Cloud Function: Process outfit photo
 
     POST /process-outfit
-    Body: { "image": "base64_encoded_image" }
+    Body: { "image": "base64_encoded_image", "embedding_encoding": "float16" (optional) }
+
+    With embedding_encoding ('float16' or 'int8') each returned embedding is a
+    base64 blob instead of a list of 1408 floats; /confirm-match and
+    /add-new-item accept either form back.
     """
     # CORS headers
     if request.method == 'OPTIONS':
@@ -30,11 +35,15 @@ def process_outfit(request):
         if not request_json or 'image' not in request_json:
             return jsonify({'success': False, 'error': 'Missing image data'}), 400, headers
 
+        embedding_encoding = request_json.get('embedding_encoding')
+        if embedding_encoding not in (None, 'float16', 'int8'):
+            return jsonify({'success': False, 'error': 'embedding_encoding must be float16 or int8'}), 400, headers
+
         image_base64 = request_json['image']
         image_bytes = base64.b64decode(image_base64)
 
         from functions.process_outfit import process_outfit_image
-        result = process_outfit_image(image_bytes)
+        result = process_outfit_image(image_bytes, embedding_encoding)
 
         return jsonify(result), 200, headers
 
@@ -45,6 +54,86 @@ def process_outfit(request):
         }), 500, headers
 
 
+@functions_framework.http
+@require_api_key
+def process_outfit_batch_handler(request):
+    """
+    HTTP Cloud Function: Process many outfit photos, streaming results
+
+    POST /process-outfit-batch?embedding_encoding=float16 (optional)
+    Body, either:
+      multipart/form-data with one or more "images" file parts, or
+      application/x-ndjson, one { "image": "base64...", "name": "..." } per line
+
+    Responds with application/x-ndjson: one /process-outfit result per photo
+    as it completes (with "index" and "name" to pair it with its input, and
+    "success": false plus "error" if that photo failed), then a final
+    { "done": true, "processed": n, "failed": k } line. If the batch itself
+    fails part way, the last line is { "success": false, "error": "..." }
+    instead.
+    """
+    if request.method == 'OPTIONS':
+        headers = {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'POST',
+            'Access-Control-Allow-Headers': 'Content-Type, X-API-Key',
+        }
+        return ('', 204, headers)
+
+    headers = {'Access-Control-Allow-Origin': '*'}
+
+    try:
+        embedding_encoding = request.args.get('embedding_encoding')
+        if embedding_encoding not in (None, 'float16', 'int8'):
+            return jsonify({'success': False, 'error': 'embedding_encoding must be float16 or int8'}), 400, headers
+
+        if request.mimetype == 'multipart/form-data':
+            files = request.files.getlist('images')
+            if not files:
+                return jsonify({'success': False, 'error': 'Missing images'}), 400, headers
+            images = ((f.filename, f.read) for f in files)
+        elif request.mimetype == 'application/x-ndjson':
+            images = _ndjson_images(request.stream)
+        else:
+            return jsonify({'success': False, 'error': 'Send multipart/form-data or application/x-ndjson'}), 415, headers
+
+        from functions.process_outfit_batch import process_outfit_batch
+
+        def generate():
+            processed = failed = 0
+            try:
+                for result in process_outfit_batch(images, embedding_encoding):
+                    processed += 1
+                    failed += 0 if result.get('success') else 1
+                    yield json.dumps(result) + '\n'
+            except Exception as e:
+                # Headers are already sent, so the failure goes in the stream
+                yield json.dumps({'success': False, 'error': str(e)}) + '\n'
+                return
+            yield json.dumps({'done': True, 'processed': processed, 'failed': failed}) + '\n'
+
+        return Response(stream_with_context(generate()), 200, headers, mimetype='application/x-ndjson')
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500, headers
+
+
+def _ndjson_images(stream):
+    """(name, loader) per non-blank line of an NDJSON upload, read lazily."""
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+            name, image_base64 = entry.get('name'), entry['image']
+        except (ValueError, KeyError, AttributeError):
+            def bad_line():
+                raise ValueError('Each line must be a JSON object with an "image" field')
+            yield None, bad_line
+            continue
+        yield name, lambda data=image_base64: base64.b64decode(data)
+
+
 @functions_framework.http
 @require_api_key
 def confirm_match_handler(request):
@@ -96,7 +185,7 @@ def add_new_item_handler(request):
     HTTP Cloud Function: Add new clothing item
 
     POST /add-new-item
-    Body: { "item_type": "pants", "cropped_image_url": "gs://...", "embedding": [...], "original_photo_url": "gs://...", "log_wear": true }
+    Body: { "item_type": "pants", "cropped_image_url": "gs://...", "embedding": [...] or "base64...", "original_photo_url": "gs://...", "log_wear": true }
     """
     if request.method == 'OPTIONS':
         headers = {
@@ -136,6 +225,7 @@ def statistics_handler(request):
     HTTP Cloud Function: Get wardrobe statistics
 
     GET /statistics
+    GET /statistics?days=90    (wear_frequency window, 1-365; default 30)
     """
     if request.method == 'OPTIONS':
         headers = {
@@ -148,8 +238,17 @@ def statistics_handler(request):
     headers = {'Access-Control-Allow-Origin': '*'}
 
     try:
+        days = request.args.get('days', '30')
+        try:
+            days = int(days)
+        except ValueError:
+            return jsonify({'error': 'days must be an integer'}), 400, headers
+
         from functions.statistics import get_statistics
-        result = get_statistics()
+        try:
+            result = get_statistics(days)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400, headers
         return jsonify(result), 200, headers
 
     except Exception as e:
@@ -230,7 +329,8 @@ def process_manual_crop_handler(request):
     Body: {
         "original_image": "base64...",
         "shirt_image": "base64..." (optional),
-        "pants_image": "base64..." (optional)
+        "pants_image": "base64..." (optional),
+        "embedding_encoding": "float16" (optional, see /process-outfit)
     }
     """
     if request.method == 'OPTIONS':
@@ -251,12 +351,16 @@ def process_manual_crop_handler(request):
         if not data.get('shirt_image') and not data.get('pants_image'):
             return jsonify({'success': False, 'error': 'At least one crop (shirt_image or pants_image) is required'}), 400, headers
 
+        embedding_encoding = data.get('embedding_encoding')
+        if embedding_encoding not in (None, 'float16', 'int8'):
+            return jsonify({'success': False, 'error': 'embedding_encoding must be float16 or int8'}), 400, headers
+
         original_bytes = base64.b64decode(data['original_image'])
         shirt_bytes = base64.b64decode(data['shirt_image']) if data.get('shirt_image') else None
         pants_bytes = base64.b64decode(data['pants_image']) if data.get('pants_image') else None
 
         from functions.process_manual_crop import process_manual_crop
-        result = process_manual_crop(original_bytes, shirt_bytes, pants_bytes)
+        result = process_manual_crop(original_bytes, shirt_bytes, pants_bytes, embedding_encoding)
 
         return jsonify(result), 200, headers
 
@@ -271,9 +375,10 @@ def process_manual_crop_handler(request):
 @require_api_key
 def list_items_handler(request):
     """
-    HTTP Cloud Function: Return all clothing items grouped by type.
+    HTTP Cloud Function: Return clothing items, all grouped by type or one page at a time.
 
     GET /list-items
+    GET /list-items?type=shirt&page_size=50&page_token=...
     """
     if request.method == 'OPTIONS':
         headers = {
@@ -286,8 +391,20 @@ def list_items_handler(request):
     headers = {'Access-Control-Allow-Origin': '*'}
 
     try:
+        item_type = request.args.get('type')
+        if item_type not in (None, 'shirt', 'pants'):
+            return jsonify({'error': 'type must be shirt or pants'}), 400, headers
+        page_size = request.args.get('page_size')
+        try:
+            page_size = int(page_size) if page_size is not None else None
+        except ValueError:
+            return jsonify({'error': 'page_size must be an integer'}), 400, headers
+
         from functions.list_items import list_items
-        result = list_items()
+        try:
+            result = list_items(item_type, page_size, request.args.get('page_token'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400, headers
         return jsonify(result), 200, headers
 
     except Exception as e:
@@ -11,11 +11,16 @@ MAX_SAMPLES = 10
 class ClothingItem:
     type: str  # "shirt" or "pants"
     image_urls: List[str]
-    embeddings: Dict[str, List[float]]  # {"0": [1408 floats], "1": [1408 floats], ...}
+    # {"0": [1408 floats], "1": [1408 floats], ...}; stored in item_embeddings/{id},
+    # not on the clothing_items doc (see embeddings/embedding_store.py)
+    embeddings: Dict[str, List[float]] = field(default_factory=dict)
     created_at: datetime = SERVER_TIMESTAMP
+    updated_at: datetime = SERVER_TIMESTAMP
     last_worn: Optional[datetime] = None
     wear_count: int = 0
     thumbnail_url: Optional[str] = None
+    # Base64 MD5 of the thumbnail blob; a client cache key that survives URL re-signing
+    thumbnail_hash: Optional[str] = None
     id: Optional[str] = None
 
     def to_dict(self):
@@ -23,11 +28,12 @@ class ClothingItem:
         return {
             'type': self.type,
             'image_urls': self.image_urls,
-            'embeddings': self.embeddings,
             'created_at': self.created_at,
+            'updated_at': self.updated_at,
             'last_worn': self.last_worn,
             'wear_count': self.wear_count,
-            'thumbnail_url': self.thumbnail_url
+            'thumbnail_url': self.thumbnail_url,
+            'thumbnail_hash': self.thumbnail_hash
         }
 
     @staticmethod
@@ -36,11 +42,13 @@ class ClothingItem:
         item = ClothingItem(
             type=data['type'],
             image_urls=data['image_urls'],
-            embeddings=data['embeddings'],
+            embeddings=data.get('embeddings', {}),
             created_at=data.get('created_at'),
+            updated_at=data.get('updated_at'),
             last_worn=data.get('last_worn'),
             wear_count=data.get('wear_count', 0),
-            thumbnail_url=data.get('thumbnail_url')
+            thumbnail_url=data.get('thumbnail_url'),
+            thumbnail_hash=data.get('thumbnail_hash')
         )
         item.id = doc_id
         return item
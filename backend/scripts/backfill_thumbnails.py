@@ -0,0 +1,93 @@
+"""
+Generate thumbnails for clothing items that don't have one yet.
+
+Each thumbnail is made from the item's primary image (image_urls[0]) and
+stored at its deterministic thumbnails/ path; the item's thumbnail_url is
+then set so /list-items and /statistics serve it instead of the full crop.
+Items that have a thumbnail but no thumbnail_hash (written before it was
+recorded) get the hash filled in from the existing blob.
+
+Usage:
+    python backend/scripts/backfill_thumbnails.py              # all items
+    python backend/scripts/backfill_thumbnails.py shirt        # one type
+    python backend/scripts/backfill_thumbnails.py --force      # regenerate all
+    python backend/scripts/backfill_thumbnails.py --dry-run    # list, don't write
+
+Run from the project root with backend/.env loaded.
+"""
+
+import sys
+import os
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.cloud import firestore
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+from storage.storage_client import StorageClient
+from utils.stats_summary import rebuild_summary
+
+WORKERS = 8
+
+
+def backfill_thumbnails(item_type: str = None, force: bool = False,
+                        dry_run: bool = False) -> None:
+    db = firestore.Client(project=os.getenv('GCP_PROJECT_ID'))
+    storage = StorageClient()
+
+    query = db.collection('clothing_items')
+    if item_type:
+        query = query.where('type', '==', item_type)
+
+    pending = []
+    for doc in query.stream():
+        data = doc.to_dict()
+        urls = data.get('image_urls') or []
+        if not urls or (data.get('thumbnail_url') and data.get('thumbnail_hash') and not force):
+            continue
+        pending.append((doc, urls[0]))
+
+    def backfill(entry):
+        doc, image_url = entry
+        if force:
+            thumbnail_url, thumbnail_hash = storage.upload_thumbnail(
+                storage.download_image(image_url), image_url)
+        else:
+            thumbnail_url, thumbnail_hash = storage.ensure_thumbnail(image_url)
+        doc.reference.update({'thumbnail_url': thumbnail_url, 'thumbnail_hash': thumbnail_hash})
+        return doc.id, thumbnail_url
+
+    if dry_run:
+        for doc, image_url in pending:
+            print(f"  {doc.id:<24} {storage.thumbnail_path(image_url)}")
+    else:
+        with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+            for item_id, thumbnail_url in executor.map(backfill, pending):
+                print(f"  {item_id:<24} {thumbnail_url}")
+
+    verb = 'Would update' if dry_run else 'Updated'
+    print(f"\n{verb} {len(pending)} thumbnail(s).\n")
+
+    # The stats summary keeps its own copy of each thumbnail_url
+    if pending and not dry_run:
+        rebuild_summary(db)
+        print("Rebuilt stats/summary.\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('type', nargs='?', choices=['shirt', 'pants'])
+    parser.add_argument('--force', action='store_true',
+                        help='regenerate thumbnails for items that already have one')
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    backfill_thumbnails(args.type, args.force, args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
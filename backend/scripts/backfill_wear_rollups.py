@@ -0,0 +1,79 @@
+"""
+Build wear_daily_rollups from the existing wear_logs.
+
+Every rollup document is rewritten from a full scan of wear_logs, so it is
+safe to re-run. Wears logged while it runs may be counted twice or not at
+all; run it while the app is idle, or run it again afterwards.
+
+Usage:
+    python backend/scripts/backfill_wear_rollups.py              # rebuild all days
+    python backend/scripts/backfill_wear_rollups.py --dry-run    # print, don't write
+
+Run from the project root with backend/.env loaded.
+"""
+
+import sys
+import os
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.cloud import firestore
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+from utils.wear_rollups import ROLLUPS_COLLECTION, day_key, rollup_ref
+
+BATCH_LIMIT = 400
+
+
+def backfill_wear_rollups(dry_run: bool = False) -> None:
+    db = firestore.Client(project=os.getenv('GCP_PROJECT_ID'))
+
+    rollups = {}
+    logs = 0
+    for log in db.collection('wear_logs').select(['worn_at', 'item_type']).stream():
+        data = log.to_dict()
+        if data.get('worn_at') is None:
+            continue
+        day = rollups.setdefault(day_key(data['worn_at']), {'total': 0, 'by_type': {}})
+        day['total'] += 1
+        item_type = data.get('item_type', 'unknown')
+        day['by_type'][item_type] = day['by_type'].get(item_type, 0) + 1
+        logs += 1
+
+    # Days that no longer have any logs (e.g. items deleted since) go to zero
+    stale = [doc.id for doc in db.collection(ROLLUPS_COLLECTION).select([]).stream()
+             if doc.id not in rollups]
+
+    if dry_run:
+        for date_str in sorted(rollups):
+            print(f"  {date_str}  {rollups[date_str]['total']:>4}  {rollups[date_str]['by_type']}")
+    else:
+        batch = db.batch()
+        pending = 0
+        for date_str, day in [*rollups.items(), *((d, {'total': 0, 'by_type': {}}) for d in stale)]:
+            batch.set(rollup_ref(db, date_str), {
+                'date': date_str, **day, 'updated_at': firestore.SERVER_TIMESTAMP,
+            })
+            pending += 1
+            if pending % BATCH_LIMIT == 0:
+                batch.commit()
+                batch = db.batch()
+        batch.commit()
+
+    verb = 'Would write' if dry_run else 'Wrote'
+    print(f"\n{verb} {len(rollups)} day(s) from {logs} wear log(s); {len(stale)} stale day(s) zeroed.\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    backfill_wear_rollups(args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
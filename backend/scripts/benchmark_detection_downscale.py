@@ -0,0 +1,113 @@
+"""
+Compare Gemini detection on full-resolution photos vs. the downscaled copy.
+
+For each photo, detection runs twice: once on the original bytes and once
+on the prepare_for_detection() copy. The script reports upload size, latency
+and the IoU between the two sets of bounding boxes, so you can check that
+downscaling leaves box accuracy unchanged.
+
+Usage:
+    python backend/scripts/benchmark_detection_downscale.py photo1.jpg photo2.jpg
+    python backend/scripts/benchmark_detection_downscale.py photos/ --max-side 768
+
+Run from the project root with backend/.env loaded.
+"""
+
+import sys
+import os
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+from gemini.vision_detector import VisionDetector
+from storage.image_utils import prepare_for_detection, DETECTION_MAX_SIDE
+
+
+def box_iou(a: dict, b: dict) -> float:
+    """Intersection over union of two normalized bounding boxes."""
+    ix = max(0.0, min(a['x_max'], b['x_max']) - max(a['x_min'], b['x_min']))
+    iy = max(0.0, min(a['y_max'], b['y_max']) - max(a['y_min'], b['y_min']))
+    inter = ix * iy
+    area_a = (a['x_max'] - a['x_min']) * (a['y_max'] - a['y_min'])
+    area_b = (b['x_max'] - b['x_min']) * (b['y_max'] - b['y_min'])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _timed_detect(detector: VisionDetector, image_bytes: bytes):
+    start = time.perf_counter()
+    result = detector.detect_clothing(image_bytes)
+    return result, time.perf_counter() - start
+
+
+def _collect_paths(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(('.jpg', '.jpeg', '.png')):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', nargs='+', help='Photos or directories of photos')
+    parser.add_argument('--max-side', type=int, default=DETECTION_MAX_SIDE)
+    args = parser.parse_args()
+
+    full_detector = VisionDetector(max_side=None)
+    small_detector = VisionDetector(max_side=args.max_side)
+
+    ious = []
+    totals = {'full_bytes': 0, 'small_bytes': 0, 'full_s': 0.0, 'small_s': 0.0}
+    disagreements = 0
+
+    print(f"{'photo':<32} {'full KB':>8} {'small KB':>8} {'full s':>7} {'small s':>7}  IoU shirt / pants")
+    for path in _collect_paths(args.paths):
+        with open(path, 'rb') as f:
+            image_bytes = f.read()
+        small_bytes = prepare_for_detection(image_bytes, args.max_side)
+
+        full, full_s = _timed_detect(full_detector, image_bytes)
+        small, small_s = _timed_detect(small_detector, image_bytes)
+
+        totals['full_bytes'] += len(image_bytes)
+        totals['small_bytes'] += len(small_bytes)
+        totals['full_s'] += full_s
+        totals['small_s'] += small_s
+
+        cells = []
+        for item_type in ['shirt', 'pants']:
+            a, b = full.get(item_type, {}), small.get(item_type, {})
+            if a.get('detected') != b.get('detected'):
+                disagreements += 1
+                cells.append('mismatch')
+            elif a.get('detected'):
+                iou = box_iou(a['bounding_box'], b['bounding_box'])
+                ious.append(iou)
+                cells.append(f"{iou:.3f}")
+            else:
+                cells.append('-')
+
+        print(f"{os.path.basename(path):<32} {len(image_bytes) / 1024:>8.0f} "
+              f"{len(small_bytes) / 1024:>8.0f} {full_s:>7.2f} {small_s:>7.2f}  {' / '.join(cells)}")
+
+    if ious:
+        ious.sort()
+        print(f"\nBox IoU full vs {args.max_side}px: mean {sum(ious) / len(ious):.3f}, "
+              f"min {ious[0]:.3f}, median {ious[len(ious) // 2]:.3f} over {len(ious)} boxes")
+    print(f"Detected/not-detected disagreements: {disagreements}")
+    if totals['full_bytes']:
+        print(f"Upload size: {totals['small_bytes'] / totals['full_bytes']:.1%} of original")
+    if totals['full_s']:
+        print(f"Detection time: {totals['small_s']:.1f}s vs {totals['full_s']:.1f}s full-resolution")
+
+
+if __name__ == '__main__':
+    main()
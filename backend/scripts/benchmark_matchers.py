@@ -0,0 +1,102 @@
+"""
+Benchmark the nearest-neighbour matcher backends against exact search.
+
+Builds a synthetic wardrobe of noisy samples around random item directions
+(1408-d like the Vertex embeddings), then reports build time, mean query
+latency and recall@1 (same top item as the exact backend) per backend.
+
+Usage:
+    cd backend
+    python scripts/benchmark_matchers.py                          # 20k samples, all backends
+    python scripts/benchmark_matchers.py --samples 50000 --backends exact ivf
+    python scripts/benchmark_matchers.py --ivf-probe 16 --hnsw-ef 128
+"""
+import sys
+import os
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from embeddings.similarity import create_matcher
+
+DIM = 1408
+
+
+def make_wardrobe(n_samples: int, samples_per_item: int, noise: float, seed: int):
+    rng = np.random.default_rng(seed)
+    n_items = max(1, n_samples // samples_per_item)
+    centers = rng.normal(size=(n_items, DIM)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+
+    rows = np.repeat(centers, samples_per_item, axis=0)[:n_samples]
+    rows += noise * rng.normal(size=rows.shape).astype(np.float32) / np.sqrt(DIM)
+    rows /= np.linalg.norm(rows, axis=1, keepdims=True)
+
+    ids = np.array([f'item{i // samples_per_item}' for i in range(len(rows))], dtype=object)
+    return rows, ids
+
+
+def make_queries(matrix: np.ndarray, n: int, noise: float, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picks = matrix[rng.choice(len(matrix), n, replace=False)]
+    queries = picks + noise * rng.normal(size=picks.shape).astype(np.float32) / np.sqrt(DIM)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def run(backend: str, matrix, ids, queries, expected, **kwargs) -> dict:
+    matcher = create_matcher(backend, **kwargs)
+
+    start = time.perf_counter()
+    matcher.build(matrix, ids)
+    build_s = time.perf_counter() - start
+
+    hits = 0
+    start = time.perf_counter()
+    for query, want in zip(queries, expected):
+        found = matcher.search(query, k=1)
+        hits += bool(found) and found[0][0] == want
+    query_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    return {'build_s': build_s, 'query_ms': query_ms, 'recall': hits / len(queries)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--samples', type=int, default=20000)
+    parser.add_argument('--samples-per-item', type=int, default=5)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--noise', type=float, default=0.6,
+                        help='per-sample noise relative to the unit item direction')
+    parser.add_argument('--backends', nargs='+', default=['exact', 'ivf', 'hnsw'],
+                        choices=['exact', 'ivf', 'hnsw'])
+    parser.add_argument('--ivf-probe', type=int, default=8)
+    parser.add_argument('--hnsw-ef', type=int, default=64)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"Generating {args.samples} samples ({args.samples_per_item}/item, {DIM}-d)...")
+    matrix, ids = make_wardrobe(args.samples, args.samples_per_item, args.noise, args.seed)
+    queries = make_queries(matrix, args.queries, args.noise, args.seed + 1)
+
+    exact = create_matcher('exact')
+    exact.build(matrix, ids)
+    expected = [exact.search(q, k=1)[0][0] for q in queries]
+
+    tuning = {
+        'exact': {},
+        'ivf': {'n_probe': args.ivf_probe},
+        'hnsw': {'ef_search': args.hnsw_ef},
+    }
+
+    print(f"\n{'BACKEND':<8} {'BUILD (s)':>10} {'QUERY (ms)':>11} {'RECALL@1':>9}")
+    print('-' * 42)
+    for backend in args.backends:
+        r = run(backend, matrix, ids, queries, expected, **tuning[backend])
+        print(f"{backend:<8} {r['build_s']:>10.2f} {r['query_ms']:>11.3f} {r['recall']:>9.3f}")
+    print()
+
+
+if __name__ == '__main__':
+    main()
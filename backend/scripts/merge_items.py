@@ -17,6 +17,9 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from google.cloud import firestore
 from dotenv import load_dotenv
+from embeddings.embedding_index import record_item_change
+from embeddings.embedding_store import get_embeddings, set_embeddings, delete_embeddings
+from utils import stats_summary
 
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
@@ -91,8 +94,8 @@ def merge_items(keep_id: str, drop_id: str) -> None:
 
     keep_urls = list(keep_data.get('image_urls', []))
     drop_urls = list(drop_data.get('image_urls', []))
-    keep_embeddings = dict(keep_data.get('embeddings', {}))
-    drop_embeddings = dict(drop_data.get('embeddings', {}))
+    keep_embeddings = get_embeddings(db, keep_id, keep_data)
+    drop_embeddings = get_embeddings(db, drop_id, drop_data)
 
     capacity = MAX_SAMPLES - len(keep_urls)
     if capacity <= 0:
@@ -138,16 +141,28 @@ def merge_items(keep_id: str, drop_id: str) -> None:
     batch.commit()
     print(f"  reassigned {reassigned} wear_log(s) from drop to keep")
 
-    # Apply update + delete in a final batch
-    final = db.batch()
-    final.update(keep_ref, {
-        'image_urls': new_urls,
-        'embeddings': new_embeddings,
-        'wear_count': new_wear_count,
-        'last_worn': new_last_worn,
+    # Apply update + delete (and the stats summary change) in one final transaction
+    def write(final):
+        final.update(keep_ref, {
+            'image_urls': new_urls,
+            'embeddings': firestore.DELETE_FIELD,
+            'wear_count': new_wear_count,
+            'last_worn': new_last_worn,
+            'updated_at': firestore.SERVER_TIMESTAMP,
+        })
+        final.delete(drop_ref)
+        set_embeddings(db, keep_id, keep_data['type'], new_embeddings, new_urls[0], final)
+        delete_embeddings(db, drop_id, final)
+
+    stats_summary.commit(db, write, {
+        keep_id: (keep_data, {**keep_data, 'image_urls': new_urls,
+                              'wear_count': new_wear_count, 'last_worn': new_last_worn}),
+        drop_id: (drop_data, None),
     })
-    final.delete(drop_ref)
-    final.commit()
+
+    # Tell warm serving instances to rebuild their embedding index
+    record_item_change(db, keep_data['type'], keep_id, new_embeddings, new_urls[0])
+    record_item_change(db, keep_data['type'], drop_id)
 
     print(f"\nDone. Keep item {keep_id} now has wears={new_wear_count}, imgs={len(new_urls)}, last_worn={new_last_worn}.\n")
 
@@ -0,0 +1,99 @@
+"""
+Move embedding samples off clothing_items docs into item_embeddings.
+
+Each item's `embeddings` map is copied to item_embeddings/{item_id} (with
+its type and first image URL) and removed from the item doc in the same
+batch, so metadata reads (/confirm-match, /get-item-images, /statistics,
+/list-items) no longer pull up to ~14k floats per item. Samples are packed
+with EMBEDDING_STORAGE_CODEC on the way (see embeddings/embedding_codec.py).
+Items already migrated are skipped, so the script can be re-run safely.
+
+Deploy the functions first: they read item_embeddings and fall back to the
+inline map item by item, so matching sees every item before, during and
+after a run (including an interrupted one). An item found in both places
+(--keep, or a batch cut short) is served from item_embeddings. Warm indexes
+already hold the same samples and need no rebuild.
+
+Usage:
+    python backend/scripts/migrate_embeddings.py              # all items
+    python backend/scripts/migrate_embeddings.py shirt        # one type
+    python backend/scripts/migrate_embeddings.py --keep       # copy, leave inline map
+    python backend/scripts/migrate_embeddings.py --dry-run    # list, don't write
+
+Run from the project root with backend/.env loaded.
+"""
+
+import sys
+import os
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.cloud import firestore
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+from embeddings.embedding_store import set_embeddings
+
+# Items per batch; each embeddings doc is up to ~120 KB, well under the
+# 10 MiB request limit at this size
+BATCH_ITEMS = 40
+
+
+def migrate_embeddings(item_type: str = None, keep: bool = False,
+                       dry_run: bool = False) -> None:
+    db = firestore.Client(project=os.getenv('GCP_PROJECT_ID'))
+
+    query = db.collection('clothing_items')
+    if item_type:
+        query = query.where('type', '==', item_type)
+
+    migrated = 0
+    samples = 0
+    batch = db.batch()
+    pending = 0
+
+    for doc in query.stream():
+        data = doc.to_dict()
+        embeddings = data.get('embeddings')
+        if embeddings is None:
+            continue
+
+        print(f"  {doc.id:<24} {data['type']:<6} {len(embeddings)} sample(s)")
+        migrated += 1
+        samples += len(embeddings)
+        if dry_run:
+            continue
+
+        image_url = (data.get('image_urls') or [None])[0]
+        set_embeddings(db, doc.id, data['type'], embeddings, image_url, batch)
+        if not keep:
+            # updated_at is left alone: the samples themselves didn't change
+            batch.update(doc.reference, {'embeddings': firestore.DELETE_FIELD})
+        pending += 1
+        if pending >= BATCH_ITEMS:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+
+    if pending:
+        batch.commit()
+
+    verb = 'Would migrate' if dry_run else 'Migrated'
+    print(f"\n{verb} {samples} sample(s) across {migrated} item(s).\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('type', nargs='?', choices=['shirt', 'pants'])
+    parser.add_argument('--keep', action='store_true',
+                        help='copy samples but leave the inline embeddings map in place')
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    migrate_embeddings(args.type, args.keep, args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
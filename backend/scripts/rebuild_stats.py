@@ -0,0 +1,47 @@
+"""
+Recompute the materialized stats/summary document from scratch.
+
+/statistics serves this document; writers update it in the same transaction
+as their item writes. Run this once to create it, after bulk edits made
+outside the app, or periodically (e.g. nightly) as a safety net.
+
+Usage:
+    python backend/scripts/rebuild_stats.py              # rebuild and write
+    python backend/scripts/rebuild_stats.py --dry-run    # compute and print only
+
+Run from the project root with backend/.env loaded.
+"""
+
+import sys
+import os
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.cloud import firestore
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+from utils.stats_summary import compute_summary, rebuild_summary
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    db = firestore.Client(project=os.getenv('GCP_PROJECT_ID'))
+    summary = compute_summary(db) if args.dry_run else rebuild_summary(db)
+
+    totals = summary['totals']
+    print(f"items={totals['total_items']}  shirts={totals['total_shirts']}  "
+          f"pants={totals['total_pants']}  wears={totals['total_wears']}")
+    print(f"most_worn:  {', '.join(e['id'] for e in summary['most_worn'])}")
+    print(f"least_worn: {', '.join(e['id'] for e in summary['least_worn'])}")
+    verb = 'Computed (not written)' if args.dry_run else 'Wrote'
+    print(f"\n{verb} stats/summary.\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Re-generate every stored embedding sample from its image in Cloud Storage.
+
+Useful after changing how crops are prepared for the embedding model.
+Stored crops are downscaled to the embedding rendition (EMBED_MAX_SIDE)
+first, exactly as live requests are.
+Images are embedded through VertexEmbedder.batch_generate_embeddings, so
+each batch is split by the endpoint's instance limit and sent concurrently.
+
+Usage:
+    python backend/scripts/reembed_items.py                 # all items
+    python backend/scripts/reembed_items.py shirt           # one type
+    python backend/scripts/reembed_items.py --dry-run       # embed, don't write
+
+Run from the project root with backend/.env loaded.
+"""
+
+import sys
+import os
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.cloud import firestore
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+from storage.storage_client import StorageClient
+from embeddings.vertex_embedder import VertexEmbedder
+from embeddings.embedding_index import record_item_change
+from embeddings.embedding_store import set_embeddings
+from utils.image_cropper import embedding_rendition
+
+BATCH_SIZE = 16
+
+
+def reembed_items(item_type: str = None, dry_run: bool = False) -> None:
+    db = firestore.Client(project=os.getenv('GCP_PROJECT_ID'))
+    storage = StorageClient()
+    embedder = VertexEmbedder()
+
+    query = db.collection('clothing_items').select(['type', 'image_urls'])
+    if item_type:
+        query = query.where('type', '==', item_type)
+
+    items = 0
+    samples = 0
+    pending = []  # (doc, image_urls)
+
+    def flush():
+        nonlocal items, samples
+        images = [embedding_rendition(storage.download_image(url))
+                  for _, urls in pending for url in urls]
+        embeddings = iter(embedder.batch_generate_embeddings(images))
+
+        for doc, urls in pending:
+            new_embeddings = {str(i): next(embeddings) for i in range(len(urls))}
+            data = doc.to_dict()
+            if not dry_run:
+                batch = db.batch()
+                batch.update(doc.reference, {
+                    'embeddings': firestore.DELETE_FIELD,
+                    'updated_at': firestore.SERVER_TIMESTAMP,
+                })
+                set_embeddings(db, doc.id, data['type'], new_embeddings, urls[0], batch)
+                batch.commit()
+                record_item_change(db, data['type'], doc.id, new_embeddings, urls[0])
+            items += 1
+            samples += len(urls)
+            print(f"  {doc.id:<24} {data['type']:<6} {len(urls)} sample(s)")
+        pending.clear()
+
+    for doc in query.stream():
+        urls = doc.to_dict().get('image_urls', [])
+        if not urls:
+            continue
+        pending.append((doc, urls))
+        if sum(len(u) for _, u in pending) >= BATCH_SIZE:
+            flush()
+    if pending:
+        flush()
+
+    verb = 'Would re-embed' if dry_run else 'Re-embedded'
+    print(f"\n{verb} {samples} sample(s) across {items} item(s).\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('type', nargs='?', choices=['shirt', 'pants'])
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    reembed_items(args.type, args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
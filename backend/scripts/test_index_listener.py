@@ -0,0 +1,78 @@
+"""
+Exercise the snapshot-listener embedding index against the Firestore emulator.
+
+Adds, modifies and deletes item_embeddings documents and checks that the
+in-memory index follows each change without re-reading the collection.
+
+Usage:
+    gcloud emulators firestore start --host-port=localhost:8080
+    cd backend
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python scripts/test_index_listener.py
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from google.cloud import firestore
+from embeddings import embedding_index
+from embeddings.embedding_index import IndexListener
+from embeddings.embedding_store import ITEM_EMBEDDINGS_COLLECTION
+
+
+def unit(seed: int) -> list:
+    vec = np.random.default_rng(seed).normal(size=1408)
+    return (vec / np.linalg.norm(vec)).tolist()
+
+
+def wait_for(predicate, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def main():
+    if not os.getenv('FIRESTORE_EMULATOR_HOST'):
+        print("ERROR: FIRESTORE_EMULATOR_HOST is not set; refusing to run against a real project")
+        sys.exit(1)
+
+    db = firestore.Client(project=os.getenv('GCP_PROJECT_ID', 'demo-uniform-dist'))
+    for doc in db.collection(ITEM_EMBEDDINGS_COLLECTION).stream():
+        doc.reference.delete()
+
+    listener = IndexListener(db)
+    listener.start()
+    assert listener.wait_ready(10), "initial snapshot never arrived"
+    shirts = embedding_index._cached_index('shirt')
+    print(f"Initial snapshot applied ({len(shirts)} shirts)")
+
+    # Add
+    _, ref = db.collection(ITEM_EMBEDDINGS_COLLECTION).add({
+        'type': 'shirt',
+        'image_url': 'gs://emulator/a.jpg',
+        'embeddings': {'0': unit(1)},
+    })
+    assert wait_for(lambda: shirts.search(unit(1)) is not None), "add not applied"
+    print(f"ADDED    {ref.id} -> matched")
+
+    # Modify: append a second sample
+    ref.update({'embeddings': {'0': unit(1), '1': unit(2)}})
+    assert wait_for(lambda: shirts.search(unit(2)) is not None), "modify not applied"
+    print(f"MODIFIED {ref.id} -> new sample matched")
+
+    # Remove
+    ref.delete()
+    assert wait_for(lambda: len(shirts) == 0), "remove not applied"
+    print(f"REMOVED  {ref.id} -> dropped from index")
+
+    listener.stop()
+    print("\nAll listener checks passed!")
+
+
+if __name__ == '__main__':
+    main()
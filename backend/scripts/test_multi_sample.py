@@ -24,6 +24,7 @@ from google.cloud import firestore
 from functions.process_outfit import process_outfit_image
 from functions.add_new_item import add_new_item
 from functions.confirm_match import confirm_match
+from embeddings.embedding_store import get_embeddings, delete_embeddings, ITEM_EMBEDDINGS_COLLECTION
 
 ASSETS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'assets'))
 
@@ -32,11 +33,13 @@ created_item_ids = []
 
 
 def clear_database():
-    """Delete all existing clothing_items and wear_logs (old schema data)."""
+    """Delete all existing clothing_items, item_embeddings and wear_logs (old schema data)."""
     db = firestore.Client(project=os.getenv('GCP_PROJECT_ID'))
-    print("--- Clearing clothing_items and wear_logs collections ---")
+    print("--- Clearing clothing_items, item_embeddings and wear_logs collections ---")
     for doc in db.collection('clothing_items').stream():
         doc.reference.delete()
+    for doc in db.collection(ITEM_EMBEDDINGS_COLLECTION).stream():
+        doc.reference.delete()
     for doc in db.collection('wear_logs').stream():
         doc.reference.delete()
     print("Database cleared.")
@@ -59,6 +62,7 @@ def cleanup():
     print(f"\n--- Cleanup: deleting {len(created_item_ids)} test items ---")
     for item_id in created_item_ids:
         db.collection('clothing_items').document(item_id).delete()
+        delete_embeddings(db, item_id)
         # Also delete any wear logs for this item
         logs = db.collection('wear_logs').where('item_id', '==', item_id).stream()
         for log in logs:
@@ -129,9 +133,11 @@ def test_multi_sample():
     # Verify initial state: each item has exactly 1 embedding
     for item_type, item_id in added_items.items():
         doc = db.collection('clothing_items').document(item_id).get().to_dict()
-        check(f"{item_type} has 1 embedding initially", len(doc['embeddings']) == 1)
+        embeddings = get_embeddings(db, item_id)
+        check(f"{item_type} has no inline embeddings", 'embeddings' not in doc)
+        check(f"{item_type} has 1 embedding initially", len(embeddings) == 1)
         check(f"{item_type} has 1 image_url initially", len(doc['image_urls']) == 1)
-        check(f"{item_type} embedding is 1408-dim", len(doc['embeddings']['0']) == 1408)
+        check(f"{item_type} embedding is 1408-dim", len(embeddings['0']) == 1408)
 
     # -------------------------------------------------------
     # Step 2: Process image 1.1.png (same clothes, different angle)
@@ -185,14 +191,15 @@ def test_multi_sample():
     print("\n=== Step 4: Verify Firestore has 2 samples per item ===")
     for item_type, item_id in added_items.items():
         doc = db.collection('clothing_items').document(item_id).get().to_dict()
-        num_embeddings = len(doc['embeddings'])
+        embeddings = get_embeddings(db, item_id)
+        num_embeddings = len(embeddings)
         num_urls = len(doc['image_urls'])
         check(f"{item_type} has 2 embeddings after confirm", num_embeddings == 2)
         check(f"{item_type} has 2 image_urls after confirm", num_urls == 2)
         check(f"{item_type} both embeddings are 1408-dim",
-              all(len(e) == 1408 for e in doc['embeddings'].values()))
+              all(len(e) == 1408 for e in embeddings.values()))
         check(f"{item_type} embeddings are different",
-              doc['embeddings']['0'] != doc['embeddings']['1'])
+              embeddings['0'] != embeddings['1'])
         print(f"  {item_type}: {num_embeddings} embeddings, {num_urls} image_urls")
 
     # -------------------------------------------------------
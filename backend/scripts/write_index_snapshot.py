@@ -0,0 +1,48 @@
+"""
+Write the embedding index snapshot to Cloud Storage.
+
+Serving instances memory-map this snapshot on cold start and replay only
+the clothing_items changed since it was taken, instead of scanning the
+whole collection. Run it periodically (e.g. nightly) to keep replays short.
+
+Usage:
+    python backend/scripts/write_index_snapshot.py                  # both types, float32
+    python backend/scripts/write_index_snapshot.py shirt            # one type
+    python backend/scripts/write_index_snapshot.py --dtype float16  # half-size matrix
+
+Run from the project root with backend/.env loaded.
+"""
+
+import sys
+import os
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.cloud import firestore
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+from storage.storage_client import StorageClient
+from embeddings.index_snapshot import write_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('type', nargs='?', choices=['shirt', 'pants'])
+    parser.add_argument('--dtype', choices=['float32', 'float16'], default='float32')
+    args = parser.parse_args()
+
+    db = firestore.Client(project=os.getenv('GCP_PROJECT_ID'))
+    storage = StorageClient()
+
+    for item_type in [args.type] if args.type else ['shirt', 'pants']:
+        manifest = write_snapshot(db, storage, item_type, dtype=args.dtype)
+        rows, dim = (manifest['shape'] + [0, 0])[:2]
+        print(f"{item_type:<6} generation={manifest['generation']}  rows={rows}  dim={dim}  "
+              f"items={len(manifest['image_urls'])}  -> embedding-index/{manifest['matrix']}")
+
+
+if __name__ == '__main__':
+    main()
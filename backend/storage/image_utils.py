@@ -1,26 +1,68 @@
 from PIL import Image
 import io
+import os
 
 
-def resize_image(image_bytes: bytes, max_size: tuple = (1024, 1024)) -> bytes:
+# Longest side of the copy sent to Gemini for detection. Bounding boxes are
+# normalized, so they apply unchanged to the full-resolution original.
+DETECTION_MAX_SIDE = int(os.getenv('DETECTION_MAX_SIDE', '1024'))
+DETECTION_JPEG_QUALITY = 85
+
+# Square thumbnails served to list/statistics views (~3x a 72-96dp tile)
+THUMBNAIL_SIZE = (256, 256)
+
+
+def resize_image(image_bytes: bytes, max_size: tuple = (1024, 1024),
+                 quality: int = 90) -> bytes:
     """
     Resize image to maximum dimensions while maintaining aspect ratio.
 
     Args:
         image_bytes: Original image bytes
         max_size: Maximum (width, height)
+        quality: JPEG quality of the output
 
     Returns:
         Resized image bytes
     """
     image = Image.open(io.BytesIO(image_bytes))
+    # JPEG: let the decoder downscale by a power of two first (much faster
+    # than decoding all 12MP); thumbnail() then finishes with LANCZOS
+    image.draft('RGB', max_size)
     image.thumbnail(max_size, Image.Resampling.LANCZOS)
 
+    # Convert RGBA/P to RGB for JPEG compatibility
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
     output = io.BytesIO()
-    image.save(output, format='JPEG', quality=90)
+    image.save(output, format='JPEG', quality=quality)
     return output.getvalue()
 
 
+def prepare_for_detection(image_bytes: bytes,
+                          max_side: int = DETECTION_MAX_SIDE) -> bytes:
+    """
+    Bounded-size JPEG copy of a photo for Gemini detection.
+
+    Keeps the pixel orientation of the original (EXIF rotation is not
+    applied), so normalized boxes map straight back onto it for cropping.
+
+    Args:
+        image_bytes: Original (full-resolution) image bytes
+        max_side: Longest side of the returned image
+
+    Returns:
+        Re-encoded JPEG bytes, or the original bytes if it is already a
+        JPEG within the bound
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.format == 'JPEG' and max(image.size) <= max_side:
+        return image_bytes
+
+    return resize_image(image_bytes, (max_side, max_side), quality=DETECTION_JPEG_QUALITY)
+
+
 def create_thumbnail(image_bytes: bytes, size: tuple = (200, 200)) -> bytes:
     """
     Create square thumbnail.
@@ -1,10 +1,90 @@
 from google.cloud import storage
+from google.api_core.exceptions import NotFound
 import google.auth
 from google.auth import iam
 from google.auth.transport import requests as google_auth_requests
 from google.oauth2 import service_account
 import os
+import json
+import time
+import base64
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from typing import List, Optional, Tuple
+
+
+# Process-wide signed URL cache: (bucket, blob path, expiration_minutes) ->
+# (url, expires_at). A URL is reused while at least SIGNED_URL_MIN_REMAINING
+# seconds of its lifetime are left, so clients always get a usable URL.
+SIGNED_URL_CACHE_SIZE = int(os.getenv('SIGNED_URL_CACHE_SIZE', '5000'))
+SIGNED_URL_MIN_REMAINING = int(os.getenv('SIGNED_URL_MIN_REMAINING_SECONDS', str(20 * 60)))
+
+_signed_urls: 'OrderedDict[tuple, tuple]' = OrderedDict()
+_signed_urls_lock = threading.Lock()
+
+# Concurrent signing calls in sign_urls (each is an IAM round trip without
+# local key material)
+SIGN_URLS_WORKERS = int(os.getenv('SIGN_URLS_WORKERS', '16'))
+
+# Service-account key used to sign URLs locally instead of one IAM signBlob
+# call per URL: a mounted JSON key file, or a Secret Manager secret holding
+# one (short name or full projects/.../secrets/.../versions/... path).
+SIGNING_KEY_FILE = os.getenv('SIGNING_KEY_FILE')
+SIGNING_KEY_SECRET = os.getenv('SIGNING_KEY_SECRET')
+
+_signing_credentials = None
+_signing_credentials_lock = threading.Lock()
+
+
+def _load_signing_key() -> Optional[dict]:
+    """Service-account key info from SIGNING_KEY_FILE or SIGNING_KEY_SECRET, if configured."""
+    if SIGNING_KEY_FILE and os.path.exists(SIGNING_KEY_FILE):
+        with open(SIGNING_KEY_FILE) as f:
+            return json.load(f)
+
+    if SIGNING_KEY_SECRET:
+        name = SIGNING_KEY_SECRET
+        if '/' not in name:
+            name = f"projects/{os.getenv('GCP_PROJECT_ID')}/secrets/{name}/versions/latest"
+        credentials, _ = google.auth.default(
+            scopes=['https://www.googleapis.com/auth/cloud-platform'])
+        session = google_auth_requests.AuthorizedSession(credentials)
+        response = session.get(f"https://secretmanager.googleapis.com/v1/{name}:access")
+        response.raise_for_status()
+        payload = response.json()['payload']['data']
+        return json.loads(base64.b64decode(payload))
+
+    return None
+
+
+def _resolve_signing_credentials():
+    key_info = _load_signing_key()
+    if key_info is not None:
+        return service_account.Credentials.from_service_account_info(key_info)
+
+    credentials, project = google.auth.default()
+
+    # Local with service account key - can sign directly
+    if hasattr(credentials, 'sign_bytes'):
+        return credentials
+
+    # Cloud Run/Functions - use IAM API for signing
+    auth_request = google_auth_requests.Request()
+    credentials.refresh(auth_request)
+
+    signer = iam.Signer(
+        request=auth_request,
+        credentials=credentials,
+        service_account_email=credentials.service_account_email,
+    )
+
+    return service_account.Credentials(
+        signer=signer,
+        service_account_email=credentials.service_account_email,
+        token_uri="https://oauth2.googleapis.com/token",
+    )
 
 
 class StorageClient:
@@ -55,6 +135,60 @@ class StorageClient:
 
         return f"gs://{self.bucket_name}/{blob_name}"
 
+    def thumbnail_path(self, url: str) -> str:
+        """
+        Deterministic thumbnail blob path for an image.
+
+        cropped-items/shirts/x.jpg -> thumbnails/shirts/x.jpg, so a thumbnail
+        can be found (or regenerated) from the image URL alone.
+        """
+        path = self._blob_path(url)
+        if path.startswith("cropped-items/"):
+            path = path[len("cropped-items/"):]
+        return f"thumbnails/{path}"
+
+    def upload_thumbnail(self, image_bytes: bytes, source_url: str) -> Tuple[str, Optional[str]]:
+        """
+        Create and upload the thumbnail of an image.
+
+        Args:
+            image_bytes: Full image bytes (JPEG)
+            source_url: gs:// or https:// URL of that image
+
+        Returns:
+            (gs:// URL to uploaded thumbnail, its base64 MD5 content hash)
+        """
+        from .image_utils import create_thumbnail, THUMBNAIL_SIZE
+
+        blob_name = self.thumbnail_path(source_url)
+        blob = self.bucket.blob(blob_name)
+        blob.upload_from_string(create_thumbnail(image_bytes, THUMBNAIL_SIZE),
+                                content_type='image/jpeg')
+
+        # The upload response carries the object's metadata, md5_hash included
+        return f"gs://{self.bucket_name}/{blob_name}", blob.md5_hash
+
+    def ensure_thumbnail(self, source_url: str) -> Tuple[str, Optional[str]]:
+        """
+        Return the thumbnail of an image, generating it if it doesn't exist yet.
+
+        Writers store both values on the item (thumbnail_url, thumbnail_hash),
+        so readers can hand clients a cache key without a bucket lookup.
+
+        Args:
+            source_url: gs:// or https:// URL of the image
+
+        Returns:
+            (gs:// URL to the thumbnail, its base64 MD5 content hash)
+        """
+        blob_name = self.thumbnail_path(source_url)
+        existing = self.bucket.get_blob(blob_name)
+        if existing is not None:
+            return f"gs://{self.bucket_name}/{blob_name}", existing.md5_hash
+
+        source = self.bucket.blob(self._blob_path(source_url))
+        return self.upload_thumbnail(source.download_as_bytes(), source_url)
+
     def download_image(self, gs_url: str) -> bytes:
         """
         Download image from Cloud Storage.
@@ -69,33 +203,63 @@ class StorageClient:
         blob = self.bucket.blob(path)
         return blob.download_as_bytes()
 
-    def _get_signing_credentials(self):
-        """Get credentials capable of signing, works on both local and Cloud Run."""
-        if self._signing_credentials is not None:
-            return self._signing_credentials
+    def upload_index_file(self, data: bytes, filename: str,
+                          content_type: str = 'application/octet-stream') -> str:
+        """
+        Upload an embedding index snapshot file.
+
+        Args:
+            data: File contents
+            filename: Name under the embedding-index/ prefix
+            content_type: MIME type of the file
+
+        Returns:
+            gs:// URL to uploaded file
+        """
+        blob_name = f"embedding-index/{filename}"
 
-        credentials, project = google.auth.default()
+        blob = self.bucket.blob(blob_name)
+        blob.upload_from_string(data, content_type=content_type)
 
-        # Local with service account key - can sign directly
-        if hasattr(credentials, 'sign_bytes'):
-            self._signing_credentials = credentials
-            return self._signing_credentials
+        return f"gs://{self.bucket_name}/{blob_name}"
 
-        # Cloud Run/Functions - use IAM API for signing
-        auth_request = google_auth_requests.Request()
-        credentials.refresh(auth_request)
+    def download_index_file(self, filename: str, local_path: str = None):
+        """
+        Download an embedding index snapshot file.
 
-        signer = iam.Signer(
-            request=auth_request,
-            credentials=credentials,
-            service_account_email=credentials.service_account_email,
-        )
+        Args:
+            filename: Name under the embedding-index/ prefix
+            local_path: Write to this path instead of returning bytes (optional)
 
-        self._signing_credentials = service_account.Credentials(
-            signer=signer,
-            service_account_email=credentials.service_account_email,
-            token_uri="https://oauth2.googleapis.com/token",
-        )
+        Returns:
+            File bytes (or local_path when given), None if the file does not exist
+        """
+        blob = self.bucket.blob(f"embedding-index/{filename}")
+        try:
+            if local_path:
+                blob.download_to_filename(local_path)
+                return local_path
+            return blob.download_as_bytes()
+        except NotFound:
+            return None
+
+    def _get_signing_credentials(self):
+        """
+        Get credentials capable of signing, works on both local and Cloud Run.
+
+        Resolved once per process, in order of preference:
+          1. SIGNING_KEY_FILE / SIGNING_KEY_SECRET key material: signs locally
+          2. Default credentials that can sign (local service account key)
+          3. IAM signBlob via iam.Signer (one network call per signature)
+        """
+        global _signing_credentials
+        if self._signing_credentials is not None:
+            return self._signing_credentials
+
+        with _signing_credentials_lock:
+            if _signing_credentials is None:
+                _signing_credentials = _resolve_signing_credentials()
+            self._signing_credentials = _signing_credentials
         return self._signing_credentials
 
     def _blob_path(self, url: str) -> str:
@@ -108,6 +272,10 @@ class StorageClient:
         """
         Generate signed URL for image access.
 
+        Signed URLs are cached per process by blob path and reused while
+        more than SIGNED_URL_MIN_REMAINING seconds of validity remain, so
+        warm instances skip the signing call (an IAM round trip on Cloud Run).
+
         Args:
             url: gs://bucket/path or https://storage.googleapis.com/bucket/path URL
             expiration_minutes: URL validity period (default: 60 minutes)
@@ -115,15 +283,80 @@ class StorageClient:
         Returns:
             HTTPS signed URL for temporary access
         """
-        blob = self.bucket.blob(self._blob_path(url))
+        path = self._blob_path(url)
+        cached = self._cached_signed_url(path, expiration_minutes)
+        if cached is not None:
+            return cached
+        return self._sign(path, expiration_minutes)
 
-        url = blob.generate_signed_url(
+    def sign_urls(self, urls: List[str], expiration_minutes: int = 60) -> List[str]:
+        """
+        Sign a batch of URLs.
+
+        URLs are deduped by blob path and checked against the signed URL
+        cache; the remaining signatures fan out over a bounded thread pool
+        (IAM signBlob is network-bound, so latency drops roughly with pool
+        width). With local key material (SIGNING_KEY_FILE /
+        SIGNING_KEY_SECRET) signing needs no network at all.
+
+        Args:
+            urls: gs:// or https:// URLs (duplicates allowed)
+            expiration_minutes: URL validity period (default: 60 minutes)
+
+        Returns:
+            Signed URLs, in input order
+        """
+        paths = [self._blob_path(url) for url in urls]
+
+        signed = {}
+        missing = []
+        for path in dict.fromkeys(paths):
+            cached = self._cached_signed_url(path, expiration_minutes)
+            if cached is not None:
+                signed[path] = cached
+            else:
+                missing.append(path)
+
+        if len(missing) == 1:
+            signed[missing[0]] = self._sign(missing[0], expiration_minutes)
+        elif missing:
+            # Resolve credentials once before fanning out
+            self._get_signing_credentials()
+            workers = min(SIGN_URLS_WORKERS, len(missing))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(lambda p: self._sign(p, expiration_minutes), missing)
+                signed.update(zip(missing, results))
+
+        return [signed[path] for path in paths]
+
+    def _cached_signed_url(self, path: str, expiration_minutes: int) -> Optional[str]:
+        """Cached signed URL for a blob if it still has enough validity left."""
+        key = (self.bucket_name, path, expiration_minutes)
+        with _signed_urls_lock:
+            cached = _signed_urls.get(key)
+            if cached is not None and cached[1] - time.time() > SIGNED_URL_MIN_REMAINING:
+                _signed_urls.move_to_end(key)
+                return cached[0]
+        return None
+
+    def _sign(self, path: str, expiration_minutes: int) -> str:
+        """Sign one blob path and store it in the signed URL cache."""
+        now = time.time()
+        blob = self.bucket.blob(path)
+        signed = blob.generate_signed_url(
             version="v4",
             expiration=timedelta(minutes=expiration_minutes),
             method="GET",
             credentials=self._get_signing_credentials()
         )
-        return url
+
+        key = (self.bucket_name, path, expiration_minutes)
+        with _signed_urls_lock:
+            _signed_urls[key] = (signed, now + expiration_minutes * 60)
+            _signed_urls.move_to_end(key)
+            while len(_signed_urls) > SIGNED_URL_CACHE_SIZE:
+                _signed_urls.popitem(last=False)
+        return signed
 
     def get_hashes_by_path(self, prefix: str) -> dict:
         """
@@ -142,6 +375,36 @@ class StorageClient:
             for blob in self.bucket.list_blobs(prefix=prefix)
         }
 
+    def get_hashes(self, urls: List[str]) -> List[Optional[str]]:
+        """
+        Content hash (base64 MD5) of each URL's blob, None if it doesn't exist.
+
+        One metadata GET per distinct blob, fanned out over the same bounded
+        pool width as sign_urls. For a page of items this costs the page size,
+        where get_hashes_by_path costs the size of the whole prefix.
+
+        Args:
+            urls: gs:// or https:// URLs (duplicates allowed)
+
+        Returns:
+            Hashes, in input order
+        """
+        paths = [self._blob_path(url) for url in urls]
+        unique = list(dict.fromkeys(paths))
+
+        def md5(path):
+            blob = self.bucket.get_blob(path)
+            return blob.md5_hash if blob is not None else None
+
+        if len(unique) <= 1:
+            hashes = [md5(path) for path in unique]
+        else:
+            with ThreadPoolExecutor(max_workers=min(SIGN_URLS_WORKERS, len(unique))) as executor:
+                hashes = list(executor.map(md5, unique))
+
+        by_path = dict(zip(unique, hashes))
+        return [by_path[path] for path in paths]
+
     def delete_image(self, gs_url: str) -> bool:
         """
         Delete image from Cloud Storage.
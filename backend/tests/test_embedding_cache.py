@@ -0,0 +1,140 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from datetime import datetime, timedelta, timezone
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from embeddings import vertex_embedder
+from embeddings.vertex_embedder import VertexEmbedder
+from embeddings.embedding_cache import EmbeddingCache, CACHE_MODEL, content_key
+
+
+def _fake_db(stored=None):
+    """Firestore mock whose get_all serves snapshots from ``stored``."""
+    stored = dict(stored or {})
+    db = MagicMock()
+
+    def document(key):
+        ref = MagicMock()
+        ref.id = key
+        return ref
+    db.collection.return_value.document.side_effect = document
+
+    def get_all(refs):
+        for ref in refs:
+            snap = MagicMock()
+            snap.id = ref.id
+            snap.exists = ref.id in stored
+            snap.to_dict.return_value = stored.get(ref.id)
+            yield snap
+    db.get_all.side_effect = get_all
+    return db
+
+
+class TestEmbeddingCache(unittest.TestCase):
+
+    def test_memory_lru_evicts_oldest(self):
+        cache = EmbeddingCache(max_entries=2)
+        cache.put_many({'a': [1.0], 'b': [2.0]})
+        cache.get_many(['a'])            # a is now most recent
+        cache.put_many({'c': [3.0]})
+
+        self.assertEqual(cache.get_many(['a', 'b', 'c']), {'a': [1.0], 'c': [3.0]})
+        self.assertEqual(cache.stats()['size'], 2)
+
+    def test_memory_entries_expire(self):
+        cache = EmbeddingCache(ttl_seconds=10)
+        with patch('embeddings.embedding_cache.time.time', return_value=1000.0):
+            cache.put_many({'a': [1.0]})
+        with patch('embeddings.embedding_cache.time.time', return_value=1011.0):
+            self.assertEqual(cache.get_many(['a']), {})
+
+    def test_persistent_hit_promoted_to_memory(self):
+        future = datetime.now(timezone.utc) + timedelta(days=1)
+        db = _fake_db({'k': {'embedding': [0.5], 'model': CACHE_MODEL, 'expires_at': future}})
+        cache = EmbeddingCache(db)
+
+        self.assertEqual(cache.get_many(['k']), {'k': [0.5]})
+        self.assertEqual(cache.get_many(['k']), {'k': [0.5]})
+        self.assertEqual(db.get_all.call_count, 1)
+
+        stats = cache.stats()
+        self.assertEqual((stats['persistent_hits'], stats['memory_hits'], stats['misses']), (1, 1, 0))
+
+    def test_persistent_expired_or_other_model_ignored(self):
+        past = datetime.now(timezone.utc) - timedelta(seconds=1)
+        future = datetime.now(timezone.utc) + timedelta(days=1)
+        db = _fake_db({
+            'old': {'embedding': [0.5], 'model': CACHE_MODEL, 'expires_at': past},
+            'other': {'embedding': [0.5], 'model': 'some-other-model', 'expires_at': future},
+        })
+        cache = EmbeddingCache(db)
+
+        self.assertEqual(cache.get_many(['old', 'other', 'none']), {})
+        self.assertEqual(cache.stats()['misses'], 3)
+
+    def test_persistent_errors_degrade_to_memory(self):
+        db = MagicMock()
+        db.get_all.side_effect = RuntimeError('unavailable')
+        db.batch.return_value.commit.side_effect = RuntimeError('unavailable')
+        cache = EmbeddingCache(db)
+
+        cache.put_many({'a': [1.0]})
+        self.assertEqual(cache.get_many(['a', 'b']), {'a': [1.0]})
+
+
+class TestEmbedderWithCache(unittest.TestCase):
+
+    def setUp(self):
+        self.client = MagicMock()
+
+        def predict(endpoint, instances):
+            response = MagicMock()
+            response.predictions = [{'imageEmbedding': [3.0, 4.0]} for _ in instances]
+            return response
+        self.client.predict.side_effect = predict
+
+        p = patch.object(vertex_embedder, 'get_prediction_client', return_value=self.client)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def test_repeat_submission_skips_vertex(self):
+        embedder = VertexEmbedder(cache=EmbeddingCache())
+
+        first = embedder.generate_embedding(b'crop')
+        second = embedder.generate_embedding(b'crop')
+
+        self.assertEqual(first, [0.6, 0.8])
+        self.assertEqual(second, first)
+        self.assertEqual(self.client.predict.call_count, 1)
+
+    def test_batch_embeds_only_unique_misses(self):
+        cache = EmbeddingCache()
+        cache.put_many({content_key(b'known'): [1.0, 0.0]})
+        embedder = VertexEmbedder(cache=cache)
+
+        embeddings = embedder.batch_generate_embeddings([b'new', b'known', b'new'])
+
+        self.assertEqual(embeddings, [[0.6, 0.8], [1.0, 0.0], [0.6, 0.8]])
+        self.assertEqual(self.client.predict.call_count, 1)
+        self.assertEqual(len(self.client.predict.call_args.kwargs['instances']), 1)
+
+    def test_logs_cache_stats_per_batch(self):
+        cache = EmbeddingCache()
+        cache.put_many({content_key(b'known'): [1.0, 0.0]})
+        embedder = VertexEmbedder(cache=cache)
+
+        with patch('builtins.print') as log:
+            embedder.batch_generate_embeddings([b'new', b'known', b'new'])
+
+        self.assertEqual(cache.stats()['memory_hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+        line = log.call_args[0][0]
+        self.assertIn('1/2 unique crops hit', line)
+        self.assertIn('hit rate 50%', line)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import patch
+import base64
+import numpy as np
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from embeddings import embedding_codec
+from embeddings.embedding_index import _stack_samples
+
+
+def _unit(seed, dim=1408):
+    vec = np.random.default_rng(seed).normal(size=dim)
+    return (vec / np.linalg.norm(vec)).tolist()
+
+
+class TestEmbeddingCodec(unittest.TestCase):
+
+    def test_float16_round_trip(self):
+        vec = _unit(0)
+        packed = embedding_codec.encode(vec, 'float16')
+
+        self.assertEqual(len(packed), 1 + 2 * 1408)
+        decoded = embedding_codec.decode(packed)
+        self.assertEqual(decoded.dtype, np.float32)
+        self.assertGreater(float(np.dot(decoded, vec)), 0.9999)
+
+    def test_int8_round_trip(self):
+        vec = _unit(1)
+        packed = embedding_codec.encode(vec, 'int8')
+
+        self.assertEqual(len(packed), 1 + 4 + 1408)
+        decoded = embedding_codec.decode(packed)
+        self.assertGreater(float(np.dot(decoded, vec)) / np.linalg.norm(decoded), 0.999)
+
+    def test_decode_accepts_legacy_list_and_wire_string(self):
+        vec = _unit(2)
+        np.testing.assert_array_equal(embedding_codec.decode(vec), np.asarray(vec, dtype=np.float32))
+
+        wire = embedding_codec.to_wire(vec, 'float16')
+        self.assertIsInstance(wire, str)
+        self.assertEqual(base64.b64decode(wire), embedding_codec.encode(vec, 'float16'))
+        np.testing.assert_array_equal(embedding_codec.decode(wire),
+                                      embedding_codec.decode(base64.b64decode(wire)))
+
+    def test_plain_list_on_wire_without_codec(self):
+        vec = _unit(3)
+        self.assertIs(embedding_codec.to_wire(vec), vec)
+        self.assertEqual(len(embedding_codec.to_wire(embedding_codec.encode(vec))), 1408)
+
+    def test_storage_keeps_packed_samples_verbatim(self):
+        packed = embedding_codec.encode(_unit(4), 'int8')
+        self.assertEqual(embedding_codec.encode_for_storage(packed), packed)
+
+        with patch.object(embedding_codec, 'STORAGE_CODEC', 'list'):
+            self.assertIsInstance(embedding_codec.encode_for_storage(_unit(4)), list)
+
+    def test_unknown_tag_rejected(self):
+        with self.assertRaises(ValueError):
+            embedding_codec.decode(b'\x09abc')
+
+    def test_index_stacks_mixed_sample_forms(self):
+        a, b = _unit(5), _unit(6)
+        stacked = _stack_samples({'1': embedding_codec.encode(b), '0': a})
+        self.assertEqual(stacked.shape, (2, 1408))
+        np.testing.assert_allclose(stacked[0], a, atol=1e-7)
+        np.testing.assert_allclose(stacked[1], b, atol=1e-3)
+
+
+if __name__ == '__main__':
+    unittest.main()
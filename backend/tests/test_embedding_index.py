@@ -0,0 +1,392 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import numpy as np
+import sys
+import tempfile
+import os
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from embeddings import embedding_index, index_snapshot
+from embeddings.embedding_index import EmbeddingIndex, IndexListener, get_index
+
+
+def _unit(vec):
+    vec = np.asarray(vec, dtype=np.float64)
+    return (vec / np.linalg.norm(vec)).tolist()
+
+
+def _doc(doc_id, embeddings, image_url=None, item_type='shirt'):
+    """An item_embeddings document snapshot."""
+    doc = MagicMock()
+    doc.id = doc_id
+    doc.to_dict.return_value = {
+        'type': item_type,
+        'embeddings': embeddings,
+        'image_url': image_url or f'gs://bucket/{doc_id}.jpg',
+    }
+    return doc
+
+
+def _fake_db(version, docs):
+    db = MagicMock()
+    version_snapshot = MagicMock()
+    version_snapshot.exists = True
+    version_snapshot.to_dict.return_value = {'version': version}
+    db.collection.return_value.document.return_value.get.return_value = version_snapshot
+    db.collection.return_value.where.return_value.stream.side_effect = lambda: iter(docs)
+    return db
+
+
+class TestEmbeddingIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = EmbeddingIndex('shirt')
+        self.index.load([
+            _doc('a', {'0': _unit([1, 0, 0]), '1': _unit([1, 1, 0])}),
+            _doc('b', {'0': _unit([0, 0, 1])}),
+        ], version=3)
+
+    def test_load_and_search(self):
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(self.index.version, 3)
+
+        match = self.index.search(_unit([1, 0.9, 0]), threshold=0.85)
+        self.assertEqual(match[0], 'a')
+        self.assertEqual(self.index.image_url('a'), 'gs://bucket/a.jpg')
+
+        self.assertIsNone(self.index.search(_unit([0, 1, 0]), threshold=0.85))
+
+    def test_upsert_and_remove(self):
+        self.index.upsert_item('c', {'0': _unit([0, 1, 0])}, 'gs://bucket/c.jpg')
+        self.assertEqual(self.index.search(_unit([0, 1, 0]))[0], 'c')
+
+        self.index.remove_item('c')
+        self.assertIsNone(self.index.search(_unit([0, 1, 0])))
+        self.assertIsNone(self.index.image_url('c'))
+
+    def test_empty_index(self):
+        index = EmbeddingIndex('pants')
+        index.load([], version=0)
+        self.assertIsNone(index.search(_unit([1, 0, 0])))
+
+
+class TestCentroidSearch(unittest.TestCase):
+
+    def _wardrobe(self, n_items=60, samples=10, dim=32, seed=0):
+        rng = np.random.default_rng(seed)
+        docs = []
+        for i in range(n_items):
+            center = rng.normal(size=dim)
+            docs.append(_doc(f'item{i}', {
+                str(j): _unit(center + 0.3 * rng.normal(size=dim)) for j in range(samples)
+            }))
+        return docs
+
+    def test_agrees_with_full_sample_scan(self):
+        docs = self._wardrobe()
+        by_centroid = EmbeddingIndex('shirt', strategy='centroid')
+        by_sample = EmbeddingIndex('shirt', strategy='samples')
+        by_centroid.load(docs, version=1)
+        by_sample.load(docs, version=1)
+
+        rng = np.random.default_rng(1)
+        for doc in docs[:20]:
+            sample = doc.to_dict()['embeddings']['3']
+            query = _unit(np.asarray(sample) + 0.05 * rng.normal(size=len(sample)))
+            self.assertEqual(by_centroid.search(query, threshold=0.5),
+                             by_sample.search(query, threshold=0.5))
+
+        # Coarse stage indexes one row per item, not one per sample
+        self.assertEqual(len(by_centroid._matcher), 60)
+        self.assertEqual(len(by_sample._matcher), 600)
+
+    def test_centroid_follows_appended_samples(self):
+        index = EmbeddingIndex('shirt', strategy='centroid')
+        index.load([_doc('a', {'0': _unit([1, 0, 0])})], version=1)
+        index.search(_unit([1, 0, 0]))
+
+        index.upsert_item('a', {'0': _unit([1, 0, 0]), '1': _unit([0, 1, 0])})
+
+        np.testing.assert_allclose(index._centroids['a'], _unit([1, 1, 0]), atol=1e-6)
+        self.assertEqual(index.search(_unit([0, 1, 0]))[0], 'a')
+
+    def test_centroid_move_keeps_the_built_matcher(self):
+        index = EmbeddingIndex('shirt', backend='hnsw', strategy='centroid')
+        index.load([_doc(f'i{n}', {'0': _unit(np.eye(8)[n])}) for n in range(8)], version=1)
+        index.search(_unit(np.eye(8)[0]))
+        index.wait_for_rebuild(5)
+        matcher = index._matcher
+
+        index.upsert_item('i0', {'0': _unit(np.eye(8)[0]), '1': _unit(np.eye(8)[7])})
+
+        self.assertIs(index._matcher, matcher)
+        self.assertEqual(len(matcher), 8)
+        self.assertGreater(matcher.stale_fraction, 0.0)  # old row masked, new one added
+        self.assertEqual(index.search(_unit(np.eye(8)[0]))[0], 'i0')
+        self.assertIsNone(index._rebuild_thread)
+
+class TestMatcherRebuild(unittest.TestCase):
+    """ANN matchers are maintained in place and rebuilt off the request path."""
+
+    def _index(self):
+        index = EmbeddingIndex('shirt', backend='ivf', strategy='samples')
+        index.load([_doc('a', {'0': _unit([1, 0, 0])}), _doc('b', {'0': _unit([0, 1, 0])})],
+                   version=1)
+        return index
+
+    def test_search_never_waits_for_build(self):
+        index = self._index()
+        release = threading.Event()
+        real_create = embedding_index.create_matcher
+
+        def slow_matcher(backend):
+            matcher = real_create(backend)
+            build = matcher.build
+            matcher.build = lambda *args: (release.wait(5), build(*args))
+            return matcher
+
+        with patch.object(embedding_index, 'create_matcher', side_effect=slow_matcher):
+            # Served by an exact scan while the IVF build is blocked
+            self.assertEqual(index.search(_unit([0, 1, 0]))[0], 'b')
+            self.assertIsNone(index._matcher)
+
+            # Changes made mid-build reach the new matcher
+            index.upsert_item('c', {'0': _unit([0, 0, 1])})
+            index.remove_item('a')
+            release.set()
+            index.wait_for_rebuild(5)
+
+        self.assertEqual(len(index._matcher), 2)
+        self.assertEqual(index.search(_unit([0, 0, 1]))[0], 'c')
+        self.assertIsNone(index.search(_unit([1, 0, 0])))
+
+    def test_updates_keep_the_built_matcher(self):
+        index = self._index()
+        index.search(_unit([1, 0, 0]))
+        index.wait_for_rebuild(5)
+        matcher = index._matcher
+
+        index.upsert_item('b', {'0': _unit([0, 0, 1])})
+        self.assertEqual(index.search(_unit([0, 0, 1]))[0], 'b')
+        self.assertIsNone(index.search(_unit([0, 1, 0]), threshold=0.5))
+        self.assertIs(index._matcher, matcher)
+
+    def test_rebuilds_once_too_many_rows_are_stale(self):
+        index = self._index()
+        index.search(_unit([1, 0, 0]))
+        index.wait_for_rebuild(5)
+        matcher = index._matcher
+
+        index.remove_item('a')
+        self.assertGreater(matcher.stale_fraction, embedding_index.REBUILD_STALE_FRACTION)
+        self.assertEqual(index.search(_unit([0, 1, 0]))[0], 'b')
+        index.wait_for_rebuild(5)
+
+        self.assertIsNot(index._matcher, matcher)
+        self.assertEqual(index._matcher.stale_fraction, 0.0)
+
+
+class TestGetIndex(unittest.TestCase):
+
+    def setUp(self):
+        embedding_index._indexes.clear()
+
+    def tearDown(self):
+        embedding_index._indexes.clear()
+
+    def test_warm_index_skips_firestore(self):
+        db = _fake_db(1, [_doc('a', {'0': _unit([1, 0, 0])})])
+
+        with patch.object(embedding_index, 'VERSION_CHECK_SECONDS', 60):
+            first = get_index(db, 'shirt')
+            second = get_index(db, 'shirt')
+
+        self.assertIs(first, second)
+        self.assertEqual(db.collection.return_value.where.return_value.stream.call_count, 1)
+        self.assertEqual(db.collection.return_value.document.return_value.get.call_count, 1)
+
+    @unittest.skipIf('EMBEDDING_INDEX_CHECK_SECONDS' in os.environ, 'default overridden')
+    def test_default_checks_version_every_request(self):
+        db = _fake_db(1, [_doc('a', {'0': _unit([1, 0, 0])})])
+
+        get_index(db, 'shirt')
+        get_index(db, 'shirt')
+
+        # Another function's write is seen on the very next request
+        self.assertEqual(db.collection.return_value.document.return_value.get.call_count, 2)
+
+    def test_version_change_replays_changed_docs(self):
+        db = _fake_db(1, [_doc('a', {'0': _unit([1, 0, 0])})])
+        replay = db.collection.return_value.where.return_value.where.return_value.stream
+
+        with patch.object(embedding_index, 'VERSION_CHECK_SECONDS', 0):
+            get_index(db, 'shirt')
+            get_index(db, 'shirt')
+            replay.assert_not_called()
+
+            # One new item and one tombstone since the last sync
+            replay.side_effect = [
+                iter([_doc('b', {'0': _unit([0, 1, 0])})]),
+                iter([_doc('a', {})]),
+            ]
+            db.collection.return_value.document.return_value.get.return_value.to_dict.return_value = {'version': 2}
+            index = get_index(db, 'shirt')
+
+        self.assertEqual(db.collection.return_value.where.return_value.stream.call_count, 1)
+        self.assertEqual(replay.call_count, 2)
+        self.assertEqual(index.version, 2)
+        self.assertEqual(index.search(_unit([0, 1, 0]))[0], 'b')
+        self.assertIsNone(index.search(_unit([1, 0, 0])))
+
+
+class _MemoryStorage:
+    """Stand-in for StorageClient's index file methods."""
+
+    def __init__(self):
+        self.files = {}
+
+    def upload_index_file(self, data, filename, content_type='application/octet-stream'):
+        self.files[filename] = data
+        return f'gs://bucket/embedding-index/{filename}'
+
+    def download_index_file(self, filename, local_path=None):
+        if filename not in self.files:
+            return None
+        if local_path:
+            with open(local_path, 'wb') as f:
+                f.write(self.files[filename])
+            return local_path
+        return self.files[filename]
+
+
+class TestIndexSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        embedding_index._indexes.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patch_dir = patch.object(index_snapshot, 'SNAPSHOT_DIR', self.tmp.name)
+        self.patch_dir.start()
+
+    def tearDown(self):
+        self.patch_dir.stop()
+        self.tmp.cleanup()
+        embedding_index._indexes.clear()
+
+    def test_snapshot_round_trip(self):
+        db = _fake_db(4, [
+            _doc('a', {'1': _unit([1, 1, 0]), '0': _unit([1, 0, 0])}),
+            _doc('b', {'0': _unit([0, 0, 1])}),
+        ])
+        storage = _MemoryStorage()
+
+        manifest = index_snapshot.write_snapshot(db, storage, 'shirt', dtype='float16')
+        self.assertEqual(manifest['generation'], 4)
+        self.assertEqual(manifest['item_ids'], ['a', 'a', 'b'])
+        self.assertEqual(manifest['sample_keys'], ['0', '1', '0'])
+
+        loaded, matrix = index_snapshot.load_snapshot(storage, 'shirt')
+        self.assertIsInstance(matrix, np.memmap)
+        self.assertEqual(matrix.dtype, np.float16)
+        blocks = index_snapshot.snapshot_blocks(loaded, matrix)
+        self.assertEqual(sorted(blocks), ['a', 'b'])
+        self.assertEqual(blocks['a'].shape, (2, 3))
+
+    def test_cold_start_from_snapshot_skips_scan(self):
+        storage = _MemoryStorage()
+        index_snapshot.write_snapshot(
+            _fake_db(4, [_doc('a', {'0': _unit([1, 0, 0])})]), storage, 'shirt')
+
+        db = _fake_db(4, [])
+        index = get_index(db, 'shirt', storage)
+
+        db.collection.return_value.where.return_value.stream.assert_not_called()
+        self.assertEqual(index.version, 4)
+        self.assertEqual(index.search(_unit([1, 0, 0]))[0], 'a')
+        self.assertEqual(index.image_url('a'), 'gs://bucket/a.jpg')
+
+
+class TestIndexListener(unittest.TestCase):
+
+    def setUp(self):
+        embedding_index._indexes.clear()
+
+    def tearDown(self):
+        embedding_index._indexes.clear()
+
+    def _change(self, change_type, doc):
+        change = MagicMock()
+        change.type.name = change_type
+        change.document = doc
+        return change
+
+    def test_initial_snapshot_then_deltas(self):
+        listener = IndexListener(MagicMock())
+        listener._on_snapshot([
+            _doc('a', {'0': _unit([1, 0, 0])}),
+            _doc('p', {'0': _unit([0, 0, 1])}, item_type='pants'),
+        ], [], None)
+        self.assertTrue(listener.wait_ready(0))
+
+        shirts = embedding_index._indexes['shirt']
+        pants = embedding_index._indexes['pants']
+        self.assertEqual(len(shirts), 1)
+        self.assertEqual(len(pants), 1)
+
+        listener._on_snapshot([], [
+            self._change('ADDED', _doc('b', {'0': _unit([0, 1, 0])})),
+            self._change('MODIFIED', _doc('a', {'0': _unit([1, 0, 0]), '1': _unit([1, 0, 1])})),
+            self._change('REMOVED', _doc('p', {'0': _unit([0, 0, 1])}, item_type='pants')),
+        ], None)
+
+        self.assertEqual(shirts.search(_unit([0, 1, 0]))[0], 'b')
+        self.assertEqual(shirts.search(_unit([1, 0, 0.9]))[0], 'a')
+        self.assertEqual(len(pants), 0)
+
+    def test_unmigrated_items_loaded_and_tombstones_applied(self):
+        db = MagicMock()
+        legacy = MagicMock()
+        legacy.id = 'old'
+        legacy.to_dict.return_value = {'embeddings': {'0': _unit([0, 1, 0])},
+                                       'image_urls': ['gs://bucket/old.jpg']}
+        db.collection.return_value.where.side_effect = lambda field, op, item_type: MagicMock(**{
+            'select.return_value.stream.return_value': [legacy] if item_type == 'shirt' else []})
+        listener = IndexListener(db)
+
+        listener._on_snapshot([_doc('a', {'0': _unit([1, 0, 0])})], [], None)
+        shirts = embedding_index._indexes['shirt']
+        self.assertEqual(len(shirts), 2)
+        self.assertEqual(shirts.search(_unit([0, 1, 0]))[0], 'old')
+        self.assertEqual(len(embedding_index._indexes['pants']), 0)
+
+        listener._on_tombstones([MagicMock(id='gone')], [], None)  # past deletions
+        self.assertEqual(len(shirts), 2)
+        tombstone = MagicMock()
+        tombstone.id = 'old'
+        listener._on_tombstones([], [self._change('ADDED', tombstone)], None)
+        self.assertEqual(len(shirts), 1)
+
+    def test_get_index_uses_listener_when_ready(self):
+        db = _fake_db(1, [])
+        watch = MagicMock()
+        watch.is_active = True
+
+        def on_snapshot(callback):
+            callback([_doc('a', {'0': _unit([1, 0, 0])})], [], None)
+            return watch
+        db.collection.return_value.on_snapshot.side_effect = on_snapshot
+
+        with patch.object(embedding_index, 'INDEX_MODE', 'listener'), \
+                patch.object(embedding_index, '_listener', None):
+            index = get_index(db, 'shirt')
+            get_index(db, 'shirt')
+
+        self.assertEqual(index.search(_unit([1, 0, 0]))[0], 'a')
+        # item_embeddings + index_tombstones, attached once
+        self.assertEqual(db.collection.return_value.on_snapshot.call_count, 2)
+        db.collection.return_value.where.return_value.stream.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from embeddings import embedding_store, embedding_codec
+from functions import confirm_match
+
+
+def _snapshot(data, exists=True, doc_id='item'):
+    snapshot = MagicMock()
+    snapshot.id = doc_id
+    snapshot.exists = exists
+    snapshot.to_dict.return_value = data
+    return snapshot
+
+
+def _fake_db(item_data, embeddings_doc=None):
+    """Firestore mock with one clothing_items doc and its item_embeddings doc."""
+    db = MagicMock()
+    collections = {
+        'clothing_items': MagicMock(),
+        embedding_store.ITEM_EMBEDDINGS_COLLECTION: MagicMock(),
+    }
+    collections['clothing_items'].document.return_value.get.return_value = _snapshot(item_data)
+    collections[embedding_store.ITEM_EMBEDDINGS_COLLECTION].document.return_value.get.return_value = \
+        _snapshot(embeddings_doc, exists=embeddings_doc is not None)
+    db.collection.side_effect = lambda name: collections.setdefault(name, MagicMock())
+    return db, collections
+
+
+class TestEmbeddingStore(unittest.TestCase):
+
+    def test_reads_item_embeddings_doc(self):
+        db, _ = _fake_db({}, {'embeddings': {'0': [1.0]}})
+        self.assertEqual(embedding_store.get_embeddings(db, 'item', {'embeddings': {'0': [9.0]}}),
+                         {'0': [1.0]})
+
+    def test_falls_back_to_legacy_inline_map(self):
+        db, _ = _fake_db({})
+        self.assertEqual(embedding_store.get_embeddings(db, 'item', {'embeddings': {'0': [9.0]}}),
+                         {'0': [9.0]})
+        self.assertEqual(embedding_store.get_embeddings(db, 'item'), {})
+
+    def test_stream_falls_back_per_unmigrated_item(self):
+        db, collections = _fake_db({})
+        collections[embedding_store.ITEM_EMBEDDINGS_COLLECTION].where.return_value.stream.return_value = [
+            _snapshot({'embeddings': {'0': [2.0]}, 'image_url': 'gs://b/b.jpg'}, doc_id='b')]
+        collections['clothing_items'].where.return_value.select.return_value.stream.return_value = [
+            _snapshot({'embeddings': {'0': [1.0]}, 'image_urls': ['gs://b/a.jpg']}, doc_id='a'),
+            # Migrated mid-copy: both docs still hold samples, the new one wins
+            _snapshot({'embeddings': {'0': [9.0]}, 'image_urls': ['gs://b/b.jpg']}, doc_id='b'),
+            # Migrated: inline field already deleted
+            _snapshot({'image_urls': ['gs://b/c.jpg']}, doc_id='c'),
+        ]
+
+        self.assertEqual(list(embedding_store.stream_type_embeddings(db, 'shirt')), [
+            ('b', {'0': [2.0]}, 'gs://b/b.jpg'),
+            ('a', {'0': [1.0]}, 'gs://b/a.jpg'),
+        ])
+
+
+class TestConfirmMatchSamples(unittest.TestCase):
+
+    def _confirm(self, db, **kwargs):
+        # The transaction stands in for a batch: same set/update calls
+        def commit(db, write, changes):
+            write(db.batch.return_value)
+            self.changes = changes
+
+        with patch.object(confirm_match.firestore, 'Client', return_value=db), \
+                patch.object(confirm_match.stats_summary, 'commit', side_effect=commit), \
+                patch.object(confirm_match, 'record_item_change') as record:
+            confirm_match.confirm_match('item', 'shirt', 'gs://b/photo.jpg', **kwargs)
+        return record
+
+    def test_new_sample_written_to_embeddings_doc(self):
+        db, collections = _fake_db({
+            'type': 'shirt', 'image_urls': ['gs://b/0.jpg'], 'thumbnail_url': 'gs://b/t.jpg',
+            'wear_count': 1, 'last_worn': None,
+        }, {'embeddings': {'0': [1.0]}})
+
+        record = self._confirm(db, new_embedding=[2.0], cropped_url='gs://b/1.jpg')
+
+        batch = db.batch.return_value
+        item_update = batch.update.call_args[0][1]
+        self.assertEqual(item_update['image_urls'], ['gs://b/0.jpg', 'gs://b/1.jpg'])
+        self.assertIs(item_update['embeddings'], confirm_match.firestore.DELETE_FIELD)
+        embeddings_doc = collections[embedding_store.ITEM_EMBEDDINGS_COLLECTION].document.return_value
+        [written] = [c[0][1] for c in batch.set.call_args_list if c[0][0] is embeddings_doc]
+        self.assertEqual({k: embedding_codec.decode(v).tolist() for k, v in written['embeddings'].items()},
+                         {'0': [1.0], '1': [2.0]})
+        self.assertIsInstance(written['embeddings']['1'], bytes)
+        self.assertEqual(written['image_url'], 'gs://b/0.jpg')
+        before, after = self.changes['item']
+        self.assertEqual(after['wear_count'], before['wear_count'] + 1)
+        self.assertEqual(after['image_urls'], ['gs://b/0.jpg', 'gs://b/1.jpg'])
+        record.assert_called_once_with(db, 'shirt', 'item', {'0': [1.0], '1': [2.0]}, 'gs://b/0.jpg')
+
+    def test_plain_wear_never_reads_embeddings(self):
+        db, collections = _fake_db({
+            'type': 'shirt', 'image_urls': ['gs://b/0.jpg'], 'thumbnail_url': 'gs://b/t.jpg',
+            'wear_count': 1, 'last_worn': None,
+        }, {'embeddings': {'0': [1.0]}})
+
+        record = self._confirm(db)
+
+        collections[embedding_store.ITEM_EMBEDDINGS_COLLECTION].document.assert_not_called()
+        record.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,11 @@
 import unittest
+from unittest.mock import patch, MagicMock
+from embeddings import vertex_embedder
 from embeddings.vertex_embedder import VertexEmbedder
-from embeddings.similarity import cosine_similarity, find_most_similar
+from embeddings.similarity import (
+    cosine_similarity, find_most_similar, find_top_k_similar,
+    search_matrix, stack_candidates
+)
 from PIL import Image
 import io
 import numpy as np
@@ -30,6 +35,69 @@ class TestEmbeddings(unittest.TestCase):
         norm = np.linalg.norm(embedding)
         self.assertAlmostEqual(norm, 1.0, places=5)
 
+    def test_batch_generate_embeddings_chunks_in_order(self):
+        """Test batches are split by the instance limit and keep input order"""
+        def predict(endpoint, instances):
+            response = MagicMock()
+            response.predictions = [
+                {'imageEmbedding': [float(len(inst.struct_value.fields['image']
+                                              .struct_value.fields['bytesBase64Encoded']
+                                              .string_value)), 0.0, 0.0]}
+                for inst in instances
+            ]
+            return response
+
+        client = MagicMock()
+        client.predict.side_effect = predict
+        images = [b'a' * n for n in (3, 30, 300, 3000, 30000)]
+
+        with patch.object(vertex_embedder, 'MAX_INSTANCES_PER_REQUEST', 2), \
+                patch.object(vertex_embedder, 'get_prediction_client', return_value=client):
+            embeddings = self.embedder.batch_generate_embeddings(images)
+
+        self.assertEqual(client.predict.call_count, 3)
+        self.assertEqual(
+            sorted(len(call.kwargs['instances']) for call in client.predict.call_args_list),
+            [1, 2, 2]
+        )
+        self.assertEqual(len(embeddings), len(images))
+        for embedding in embeddings:
+            self.assertAlmostEqual(np.linalg.norm(embedding), 1.0, places=6)
+        self.assertEqual(self.embedder.batch_generate_embeddings([]), [])
+
+    def test_prediction_client_reused_across_calls(self):
+        """Test one client per region is created and shared by every predict"""
+        client = MagicMock()
+        client.predict.return_value.predictions = [{'imageEmbedding': [1.0, 0.0, 0.0]}]
+
+        with patch.dict(vertex_embedder._clients, clear=True), \
+                patch('google.cloud.aiplatform.gapic.PredictionServiceClient',
+                      return_value=client) as factory:
+            self.embedder.generate_embedding(b'a')
+            self.embedder.generate_embedding(b'b')
+            VertexEmbedder().generate_embedding(b'c')
+
+        self.assertEqual(factory.call_count, 1)
+        self.assertEqual(client.predict.call_count, 3)
+
+    def test_prediction_client_recreated_after_unavailable(self):
+        """Test a failed channel is dropped and the call retried on a new client"""
+        from google.api_core.exceptions import ServiceUnavailable
+
+        broken = MagicMock()
+        broken.predict.side_effect = ServiceUnavailable('connection reset')
+        healthy = MagicMock()
+        healthy.predict.return_value.predictions = [{'imageEmbedding': [0.0, 2.0, 0.0]}]
+
+        with patch.dict(vertex_embedder._clients, clear=True), \
+                patch('google.cloud.aiplatform.gapic.PredictionServiceClient',
+                      side_effect=[broken, healthy]):
+            embedding = self.embedder.generate_embedding(b'a')
+            self.assertIs(vertex_embedder._clients[self.embedder.region], healthy)
+
+        self.assertEqual(embedding, [0.0, 1.0, 0.0])
+        broken.transport.close.assert_called_once()
+
     def test_embedding_consistency(self):
         """Test that same image produces same embedding"""
         image_bytes = self.create_test_image('green')
@@ -76,6 +144,55 @@ class TestEmbeddings(unittest.TestCase):
         self.assertEqual(match[0], 'item1')
         self.assertGreater(match[1], 0.99)
 
+    def test_find_most_similar_below_threshold(self):
+        """Test that no match is returned when nothing clears the threshold"""
+        rng = np.random.default_rng(0)
+        query = rng.normal(size=1408)
+        query /= np.linalg.norm(query)
+        other = rng.normal(size=1408)
+        other /= np.linalg.norm(other)
+
+        self.assertIsNone(find_most_similar(query.tolist(), [('item1', other.tolist())]))
+        self.assertIsNone(find_most_similar(query.tolist(), []))
+
+    def test_find_top_k_similar(self):
+        """Test top K ordering matches per-candidate cosine similarity"""
+        rng = np.random.default_rng(1)
+        vectors = rng.normal(size=(20, 1408))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        query = vectors[3] + 0.1 * vectors[7]
+        query /= np.linalg.norm(query)
+        candidates = [(f'item{i}', v.tolist()) for i, v in enumerate(vectors)]
+
+        top = find_top_k_similar(query.tolist(), candidates, k=3)
+
+        expected = sorted(
+            ((item_id, cosine_similarity(query.tolist(), emb)) for item_id, emb in candidates),
+            key=lambda x: x[1], reverse=True
+        )[:3]
+        self.assertEqual([item_id for item_id, _ in top], [item_id for item_id, _ in expected])
+        for (_, score), (_, expected_score) in zip(top, expected):
+            self.assertAlmostEqual(score, expected_score, places=5)
+
+    def test_search_matrix(self):
+        """Test batched search over a pre-stacked candidate matrix"""
+        matrix, ids = stack_candidates([
+            ('a', [1.0, 0.0]),
+            ('b', [0.5, 0.5]),
+            ('c', [0.0, 1.0]),
+        ])
+        self.assertEqual(matrix.dtype, np.float32)
+        self.assertEqual(matrix.shape, (3, 2))
+
+        results = search_matrix([0.0, 1.0], matrix, ids, k=2)
+        self.assertEqual([item_id for item_id, _ in results], ['c', 'b'])
+
+        # Threshold filters, strict excludes exact ties with the threshold
+        results = search_matrix([0.0, 1.0], matrix, ids, k=3, threshold=0.5)
+        self.assertEqual([item_id for item_id, _ in results], ['c', 'b'])
+        results = search_matrix([0.0, 1.0], matrix, ids, k=3, threshold=0.5, strict=True)
+        self.assertEqual([item_id for item_id, _ in results], ['c'])
+
     def test_similar_images_high_similarity(self):
         """Test that similar images have high similarity"""
         image1 = self.create_test_image('red')
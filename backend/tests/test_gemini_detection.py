@@ -1,14 +1,23 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from PIL import Image
+from PIL import Image, JpegImagePlugin
 import io
+import json
 import sys
 import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from gemini import detection_cache
 from gemini.vision_detector import VisionDetector
-from utils.image_cropper import crop_clothing_item
+from gemini.detection_cache import DetectionCache, dhash, hamming_distance, hash_bands
+from concurrent.futures import ThreadPoolExecutor
+from utils import image_cropper
+from utils.image_cropper import (
+    crop_clothing_item, crop_clothing_items, crop_renditions, renditions_from_crop,
+    EMBED_MAX_SIDE, ARCHIVE_MAX_SIDE
+)
+from storage.image_utils import prepare_for_detection
 
 
 def _make_test_image(width=640, height=480, color='blue'):
@@ -152,6 +161,61 @@ class TestImageCropper(unittest.TestCase):
         # Pants should be taller due to 25% bottom padding vs 10% default
         self.assertGreater(pants_crop.height, default_crop.height)
 
+    def test_multi_crop_matches_single_crops(self):
+        image_data = _make_test_image(1000, 1000)
+        boxes = {
+            'shirt': {'x_min': 0.3, 'y_min': 0.1, 'x_max': 0.7, 'y_max': 0.5},
+            'pants': {'x_min': 0.3, 'y_min': 0.4, 'x_max': 0.7, 'y_max': 0.7},
+        }
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            crops = crop_clothing_items(image_data, boxes, executor=executor)
+
+        for item_type, bbox in boxes.items():
+            single = Image.open(io.BytesIO(crop_clothing_item(image_data, bbox, item_type=item_type)))
+            multi = Image.open(io.BytesIO(crops[item_type]))
+            self.assertEqual(multi.size, single.size)
+
+    def test_multi_crop_decodes_once(self):
+        image_data = _make_test_image(1000, 1000)
+        boxes = {
+            'shirt': {'x_min': 0.3, 'y_min': 0.1, 'x_max': 0.7, 'y_max': 0.5},
+            'pants': {'x_min': 0.3, 'y_min': 0.4, 'x_max': 0.7, 'y_max': 0.7},
+        }
+        with patch.object(image_cropper.Image, 'open', wraps=Image.open) as opened:
+            crop_clothing_items(image_data, boxes)
+        self.assertEqual(opened.call_count, 1)
+
+    def test_multi_crop_max_side_uses_draft(self):
+        image_data = _make_test_image(4000, 3000)
+        boxes = {'shirt': {'x_min': 0.3, 'y_min': 0.1, 'x_max': 0.7, 'y_max': 0.5}}
+
+        with patch.object(JpegImagePlugin.JpegImageFile, 'draft', autospec=True,
+                          side_effect=JpegImagePlugin.JpegImageFile.draft) as draft:
+            crops = crop_clothing_items(image_data, boxes, max_side=256)
+
+        draft.assert_called_once()
+        self.assertEqual(max(Image.open(io.BytesIO(crops['shirt'])).size), 256)
+
+    def test_crop_renditions_sizes(self):
+        image_data = _make_test_image(4000, 6000)
+        boxes = {
+            'shirt': {'x_min': 0.1, 'y_min': 0.05, 'x_max': 0.9, 'y_max': 0.5},
+            'pants': {'x_min': 0.2, 'y_min': 0.45, 'x_max': 0.8, 'y_max': 0.98},
+        }
+        renditions = crop_renditions(image_data, boxes)
+
+        for item_type in boxes:
+            archive = Image.open(io.BytesIO(renditions[item_type].archive))
+            embed = Image.open(io.BytesIO(renditions[item_type].embed))
+            self.assertEqual(max(archive.size), ARCHIVE_MAX_SIDE)
+            self.assertEqual(max(embed.size), EMBED_MAX_SIDE)
+            self.assertLess(len(renditions[item_type].embed), len(renditions[item_type].archive))
+
+    def test_renditions_from_small_crop_not_upscaled(self):
+        renditions = renditions_from_crop(_make_test_image(300, 400))
+        self.assertEqual(Image.open(io.BytesIO(renditions.archive)).size, (300, 400))
+        self.assertEqual(Image.open(io.BytesIO(renditions.embed)).size, (300, 400))
+
 
 class TestDetectClothingIntegration(unittest.TestCase):
     """Test detect_clothing with mocked Gemini API."""
@@ -174,5 +238,151 @@ class TestDetectClothingIntegration(unittest.TestCase):
         self.assertAlmostEqual(result['shirt']['bounding_box']['x_min'], 0.2)
 
 
+class TestPrepareForDetection(unittest.TestCase):
+
+    def test_large_photo_downscaled_keeping_aspect(self):
+        prepared = prepare_for_detection(_make_test_image(4000, 3000), max_side=1024)
+        img = Image.open(io.BytesIO(prepared))
+
+        self.assertEqual(img.format, 'JPEG')
+        self.assertEqual(img.size, (1024, 768))
+
+    def test_small_jpeg_passed_through(self):
+        image_data = _make_test_image(640, 480)
+        self.assertIs(prepare_for_detection(image_data, max_side=1024), image_data)
+
+    def test_rgba_png_reencoded_as_jpeg(self):
+        buf = io.BytesIO()
+        Image.new('RGBA', (300, 200), (255, 0, 0, 128)).save(buf, format='PNG')
+        img = Image.open(io.BytesIO(prepare_for_detection(buf.getvalue())))
+
+        self.assertEqual(img.format, 'JPEG')
+        self.assertEqual(img.size, (300, 200))
+
+    @patch('google.generativeai.configure')
+    @patch('google.generativeai.GenerativeModel')
+    def test_detector_sends_downscaled_copy(self, mock_model_cls, mock_configure):
+        mock_response = MagicMock()
+        mock_response.text = '{"shirt": {"detected": false}, "pants": {"detected": false}}'
+        generate = mock_model_cls.return_value.generate_content
+        generate.return_value = mock_response
+
+        VisionDetector(max_side=512).detect_clothing(_make_test_image(4000, 3000))
+        self.assertEqual(generate.call_args[0][0][1].size, (512, 384))
+
+        VisionDetector(max_side=None).detect_clothing(_make_test_image(4000, 3000))
+        self.assertEqual(generate.call_args[0][0][1].size, (4000, 3000))
+
+
+DETECTION = {
+    'shirt': {'detected': True, 'bounding_box': {'x_min': 0.2, 'y_min': 0.1, 'x_max': 0.8, 'y_max': 0.5}},
+    'pants': {'detected': False},
+}
+
+
+def _make_photo(quality=95, mirror=False):
+    """A structured (non-uniform) JPEG so the perceptual hash has signal."""
+    img = Image.new('RGB', (800, 600))
+    img.putdata([((x * 7) % 256, (y * 3) % 256, ((x * y) // 500) % 256)
+                 for y in range(600) for x in range(800)])
+    if mirror:
+        img = img.transpose(Image.FLIP_LEFT_RIGHT)
+    buf = io.BytesIO()
+    img.save(buf, format='JPEG', quality=quality)
+    return buf.getvalue()
+
+
+class _FakeCacheDb:
+    """In-memory stand-in for the detection_cache collection."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def collection(self, name):
+        return self
+
+    def document(self, doc_id):
+        ref = MagicMock()
+        ref.set.side_effect = lambda data: self.docs.__setitem__(doc_id, data)
+        return ref
+
+    def where(self, field, op, values):
+        self._values = set(values)
+        return self
+
+    def limit(self, n):
+        return self
+
+    def stream(self):
+        for data in list(self.docs.values()):
+            if self._values & set(data['bands']):
+                doc = MagicMock()
+                doc.to_dict.return_value = data
+                yield doc
+
+
+class TestDetectionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.db = _FakeCacheDb()
+        self.cache = DetectionCache(self.db, radius=6)
+
+    def test_recompressed_photo_within_radius(self):
+        original = Image.open(io.BytesIO(_make_photo(95)))
+        recompressed = Image.open(io.BytesIO(_make_photo(40)))
+        mirrored = Image.open(io.BytesIO(_make_photo(95, mirror=True)))
+
+        self.assertLessEqual(hamming_distance(dhash(original), dhash(recompressed)), 6)
+        self.assertGreater(hamming_distance(dhash(original), dhash(mirrored)), 6)
+
+    def test_hash_bands_cover_radius(self):
+        a = dhash(Image.open(io.BytesIO(_make_photo())))
+        b = a ^ 0b1000001001000100100010001  # 6 bits flipped
+        self.assertTrue(set(hash_bands(a, 6)) & set(hash_bands(b, 6)))
+        self.assertEqual(len(hash_bands(a, 6)), 7)
+
+    def test_lookup_hits_near_duplicate_and_misses_other(self):
+        self.cache.store(Image.open(io.BytesIO(_make_photo(95))), DETECTION)
+
+        self.assertEqual(self.cache.lookup(Image.open(io.BytesIO(_make_photo(40)))), DETECTION)
+        self.assertIsNone(self.cache.lookup(Image.open(io.BytesIO(_make_photo(95, mirror=True)))))
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_prompt_version_change_invalidates(self):
+        image = Image.open(io.BytesIO(_make_photo()))
+        self.cache.store(image, DETECTION)
+
+        with patch.object(detection_cache, 'PROMPT_VERSION', detection_cache.PROMPT_VERSION + 1):
+            self.assertIsNone(self.cache.lookup(image))
+
+    @patch('google.generativeai.configure')
+    @patch('google.generativeai.GenerativeModel')
+    def test_detector_skips_gemini_on_hit(self, mock_model_cls, mock_configure):
+        mock_response = MagicMock()
+        mock_response.text = json.dumps(DETECTION)
+        generate = mock_model_cls.return_value.generate_content
+        generate.return_value = mock_response
+
+        detector = VisionDetector(cache=self.cache)
+        first = detector.detect_clothing(_make_photo(95))
+        second = detector.detect_clothing(_make_photo(60))
+
+        self.assertEqual(first, DETECTION)
+        self.assertEqual(second, DETECTION)
+        self.assertEqual(generate.call_count, 1)
+
+    @patch('google.generativeai.configure')
+    @patch('google.generativeai.GenerativeModel')
+    def test_detector_logs_cache_stats(self, mock_model_cls, mock_configure):
+        self.cache.store(Image.open(io.BytesIO(_make_photo(95))), DETECTION)
+        detector = VisionDetector(cache=self.cache)
+
+        with patch('builtins.print') as log:
+            detector.detect_clothing(_make_photo(60))
+
+        self.assertIn('hit; instance hit rate 100% (hits 1, misses 0)', log.call_args[0][0])
+
+
 if __name__ == '__main__':
     unittest.main()
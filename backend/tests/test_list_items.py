@@ -0,0 +1,98 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from datetime import datetime, timezone
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from functions import list_items
+
+
+def _doc(doc_id, item_type='shirt', last_worn=None):
+    doc = MagicMock()
+    doc.id = doc_id
+    doc.to_dict.return_value = {
+        'type': item_type,
+        'image_urls': [f'gs://bucket/cropped-items/{item_type}/{doc_id}.jpg'],
+        'thumbnail_url': None,
+        'wear_count': 1,
+        'last_worn': last_worn,
+    }
+    return doc
+
+
+class TestListItemsPagination(unittest.TestCase):
+
+    def setUp(self):
+        self.storage = MagicMock()
+        self.storage.sign_urls.side_effect = lambda urls: [f'https://signed/{u}' for u in urls]
+        self.storage.get_hashes_by_path.return_value = {}
+
+        # Every chained query call returns the same mock so the chain can be inspected
+        self.query = MagicMock()
+        for method in ('select', 'where', 'order_by', 'start_after', 'limit'):
+            getattr(self.query, method).return_value = self.query
+        db = MagicMock()
+        db.collection.return_value = self.query
+
+        patches = [
+            patch.object(list_items, 'StorageClient', return_value=self.storage),
+            patch.object(list_items.firestore, 'Client', return_value=db),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_projection_excludes_embeddings(self):
+        self.query.stream.return_value = [_doc('a'), _doc('b', 'pants')]
+
+        result = list_items.list_items()
+
+        fields = self.query.select.call_args[0][0]
+        self.assertNotIn('embeddings', fields)
+        self.assertEqual([e['id'] for e in result['shirts']], ['a'])
+        self.assertEqual([e['id'] for e in result['pants']], ['b'])
+        self.query.limit.assert_not_called()
+
+    def test_page_token_round_trip(self):
+        worn = datetime(2026, 5, 1, 12, 0, tzinfo=timezone.utc)
+        self.query.stream.return_value = [_doc('c', last_worn=worn), _doc('b', last_worn=worn),
+                                          _doc('a')]
+
+        page = list_items.list_items('shirt', page_size=2)
+
+        self.assertEqual([e['id'] for e in page['items']], ['c', 'b'])
+        self.query.where.assert_called_once_with('type', '==', 'shirt')
+        self.query.limit.assert_called_once_with(3)
+        self.assertIsNotNone(page['next_page_token'])
+
+        self.query.stream.return_value = [_doc('a')]
+        last = list_items.list_items('shirt', page_size=2, page_token=page['next_page_token'])
+
+        self.query.start_after.assert_called_once_with({'last_worn': worn, '__name__': 'b'})
+        self.assertEqual([e['id'] for e in last['items']], ['a'])
+        self.assertIsNone(last['next_page_token'])
+
+    def test_page_hashes_only_its_own_blobs(self):
+        self.storage.get_hashes.side_effect = lambda urls: [f'md5:{u}' for u in urls]
+        self.query.stream.return_value = [_doc('b'), _doc('a')]
+
+        page = list_items.list_items(page_size=1)
+
+        self.storage.get_hashes_by_path.assert_not_called()
+        self.storage.get_hashes.assert_called_once_with(['gs://bucket/cropped-items/shirt/b.jpg'])
+        self.assertEqual(page['items'][0]['image_hash'], 'md5:gs://bucket/cropped-items/shirt/b.jpg')
+
+    def test_page_size_capped(self):
+        self.query.stream.return_value = []
+        list_items.list_items(page_size=10000)
+        self.query.limit.assert_called_once_with(list_items.MAX_PAGE_SIZE + 1)
+
+    def test_invalid_page_token(self):
+        with self.assertRaises(ValueError):
+            list_items.list_items(page_token='not-a-token')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import numpy as np
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from embeddings.similarity import (
+    Matcher, ExactMatcher, IVFFlatMatcher, HNSWMatcher, create_matcher
+)
+
+
+def _clustered(n_items=200, samples_per_item=3, dim=64, noise=0.15, seed=0):
+    """Synthetic wardrobe: a few noisy samples around each item's direction."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_items, dim))
+    rows = np.repeat(centers, samples_per_item, axis=0)
+    rows += noise * rng.normal(size=rows.shape) * np.linalg.norm(centers[0]) / np.sqrt(dim)
+    rows /= np.linalg.norm(rows, axis=1, keepdims=True)
+    ids = np.array([f'item{i}' for i in range(n_items) for _ in range(samples_per_item)],
+                   dtype=object)
+    return rows.astype(np.float32), ids
+
+
+def _queries(matrix, n=50, noise=0.1, seed=1):
+    rng = np.random.default_rng(seed)
+    picks = matrix[rng.choice(len(matrix), n, replace=False)]
+    queries = picks + noise * rng.normal(size=picks.shape) / np.sqrt(matrix.shape[1])
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+class TestMatchers(unittest.TestCase):
+
+    def setUp(self):
+        self.matrix, self.ids = _clustered()
+        self.queries = _queries(self.matrix)
+        self.exact = ExactMatcher()
+        self.exact.build(self.matrix, self.ids)
+
+    def _recall(self, matcher):
+        hits = 0
+        for query in self.queries:
+            expected = self.exact.search(query, k=1)[0][0]
+            found = matcher.search(query, k=1)
+            hits += bool(found) and found[0][0] == expected
+        return hits / len(self.queries)
+
+    def test_ivf_recall(self):
+        matcher = IVFFlatMatcher(n_probe=4)
+        matcher.build(self.matrix, self.ids)
+        self.assertGreaterEqual(self._recall(matcher), 0.9)
+
+    def test_hnsw_recall(self):
+        matcher = HNSWMatcher(m=8, ef_construction=50, ef_search=32)
+        matcher.build(self.matrix, self.ids)
+        self.assertGreaterEqual(self._recall(matcher), 0.95)
+
+    def test_incremental_add_matches_build(self):
+        half = len(self.ids) // 2
+        for backend in ('exact', 'ivf', 'hnsw'):
+            matcher = create_matcher(backend)
+            matcher.build(self.matrix[:half], self.ids[:half])
+            matcher.add(self.matrix[half:], self.ids[half:])
+            self.assertEqual(len(matcher), len(self.ids))
+
+            # A stored row must find itself
+            found = matcher.search(self.matrix[-1], k=1)
+            self.assertEqual(found[0][0], self.ids[-1], backend)
+            self.assertAlmostEqual(found[0][1], 1.0, places=5)
+
+    def test_threshold_and_empty(self):
+        for backend in ('exact', 'ivf', 'hnsw'):
+            matcher = create_matcher(backend)
+            matcher.build(np.empty((0, 0), dtype=np.float32), np.empty(0, dtype=object))
+            self.assertEqual(matcher.search(self.queries[0], k=1), [])
+
+            matcher.build(self.matrix, self.ids)
+            self.assertEqual(matcher.search(-self.matrix[0], k=1, threshold=0.5), [])
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_matcher('annoy')
+
+    def test_matcher_is_abstract(self):
+        with self.assertRaises(TypeError):
+            Matcher()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from PIL import Image
+import flask
+import io
+import json
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import auth
+import main
+from functions import process_outfit, process_outfit_batch
+from utils import match_pipeline
+
+
+DELAY = 0.2
+
+
+def _make_test_image(width=640, height=480, color='blue'):
+    img = Image.new('RGB', (width, height), color=color)
+    buf = io.BytesIO()
+    img.save(buf, format='JPEG')
+    return buf.getvalue()
+
+
+def _slow(value):
+    def call(*args, **kwargs):
+        time.sleep(DELAY)
+        return value
+    return call
+
+
+class TestProcessOutfitPipeline(unittest.TestCase):
+    """process_outfit_image with every network client mocked out."""
+
+    def setUp(self):
+        self.storage = MagicMock()
+        self.storage.upload_original_photo.side_effect = _slow('gs://bucket/original.jpg')
+        self.storage.upload_cropped_item.side_effect = _slow('gs://bucket/crop.jpg')
+        self.storage.get_signed_url.side_effect = lambda url, *a, **kw: f'https://signed/{url}'
+
+        self.detector = MagicMock()
+        self.detector.detect_clothing.side_effect = _slow({
+            'shirt': {'detected': True, 'bounding_box': {'x_min': 0.2, 'y_min': 0.1, 'x_max': 0.8, 'y_max': 0.5}},
+            'pants': {'detected': True, 'bounding_box': {'x_min': 0.3, 'y_min': 0.5, 'x_max': 0.7, 'y_max': 0.95}},
+        })
+
+        self.embedder = MagicMock()
+        self.embedder.batch_generate_embeddings.side_effect = \
+            lambda crops: _slow([[0.0] * 1408 for _ in crops])()
+
+        self.index = MagicMock()
+        self.index.search.return_value = None
+
+        patches = [
+            patch.object(process_outfit, 'StorageClient', return_value=self.storage),
+            patch.object(process_outfit, 'VisionDetector', return_value=self.detector),
+            patch.object(process_outfit, 'VertexEmbedder', return_value=self.embedder),
+            patch.object(process_outfit.firestore, 'Client'),
+            patch.object(match_pipeline, 'get_index', return_value=self.index),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_result_shape(self):
+        result = process_outfit.process_outfit_image(_make_test_image())
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['original_photo_url'], 'https://signed/gs://bucket/original.jpg')
+        for item_type in ['shirt', 'pants']:
+            self.assertFalse(result[item_type]['matched'])
+            self.assertEqual(result[item_type]['cropped_url'], 'https://signed/gs://bucket/crop.jpg')
+            self.assertEqual(len(result[item_type]['embedding']), 1408)
+
+    def test_branches_overlap(self):
+        """Sequentially this is 5 slow calls; concurrently ~2 (detect, then embed/upload)."""
+        start = time.perf_counter()
+        process_outfit.process_outfit_image(_make_test_image())
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 4 * DELAY)
+
+    def test_undetected_item_skipped(self):
+        self.detector.detect_clothing.side_effect = None
+        self.detector.detect_clothing.return_value = {
+            'shirt': {'detected': False},
+            'pants': {'detected': True, 'bounding_box': {'x_min': 0.3, 'y_min': 0.5, 'x_max': 0.7, 'y_max': 0.95}},
+        }
+        result = process_outfit.process_outfit_image(_make_test_image())
+
+        self.assertIsNone(result['shirt'])
+        self.assertIsNotNone(result['pants'])
+
+    def test_vertex_gets_embedding_rendition(self):
+        process_outfit.process_outfit_image(_make_test_image(3000, 4000))
+
+        embedded = self.embedder.batch_generate_embeddings.call_args[0][0]
+        uploaded = [c[0][0] for c in self.storage.upload_cropped_item.call_args_list]
+        for crop in embedded:
+            self.assertLessEqual(max(Image.open(io.BytesIO(crop)).size), 512)
+        self.assertGreater(min(len(c) for c in uploaded), max(len(c) for c in embedded))
+
+    def test_crops_embedded_in_one_batch(self):
+        process_outfit.process_outfit_image(_make_test_image())
+
+        self.embedder.batch_generate_embeddings.assert_called_once()
+        self.assertEqual(len(self.embedder.batch_generate_embeddings.call_args[0][0]), 2)
+        self.embedder.generate_embedding.assert_not_called()
+
+
+class TestProcessOutfitBatch(unittest.TestCase):
+    """process_outfit_batch with process_outfit_image mocked out."""
+
+    def setUp(self):
+        self.clients = object()
+        patches = [
+            patch.object(process_outfit_batch, 'pipeline_clients', return_value=self.clients),
+            patch.object(process_outfit_batch, 'process_outfit_image', side_effect=self._process),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.seen_clients = []
+
+    def _process(self, image_bytes, embedding_encoding, clients):
+        self.seen_clients.append(clients)
+        time.sleep(DELAY)
+        if image_bytes == b'bad':
+            raise RuntimeError('detection failed')
+        return {'success': True, 'original_photo_url': image_bytes.decode()}
+
+    def test_photos_pipelined_with_shared_clients(self):
+        images = [(f'{i}.jpg', lambda i=i: f'photo-{i}'.encode()) for i in range(6)]
+
+        start = time.time()
+        results = list(process_outfit_batch.process_outfit_batch(images))
+        elapsed = time.time() - start
+
+        self.assertEqual(sorted(r['index'] for r in results), list(range(6)))
+        self.assertTrue(all(r['success'] for r in results))
+        self.assertEqual(results[0]['original_photo_url'], f"photo-{results[0]['index']}")
+        self.assertTrue(all(c is self.clients for c in self.seen_clients))
+        # 6 photos, BATCH_WORKERS at a time: well under 6 sequential delays
+        self.assertLess(elapsed, 6 * DELAY * 0.75)
+
+    def test_input_read_lazily(self):
+        consumed = []
+
+        def images():
+            for i in range(10):
+                consumed.append(i)
+                yield str(i), lambda: b'x'
+
+        stream = process_outfit_batch.process_outfit_batch(images())
+        next(stream)
+        self.assertLessEqual(len(consumed), process_outfit_batch.BATCH_WORKERS + 1)
+        self.assertEqual(len(list(stream)), 9)
+
+    def test_failed_photo_reported_inline(self):
+        def unreadable():
+            raise ValueError('not base64')
+
+        results = {r['index']: r for r in process_outfit_batch.process_outfit_batch(
+            [('a', lambda: b'bad'), ('b', unreadable), ('c', lambda: b'ok')])}
+
+        self.assertEqual(results[0], {'index': 0, 'name': 'a', 'success': False, 'error': 'detection failed'})
+        self.assertEqual(results[1]['error'], 'not base64')
+        self.assertTrue(results[2]['success'])
+
+    def test_images_past_limit_not_processed(self):
+        with patch.object(process_outfit_batch, 'MAX_BATCH_IMAGES', 1):
+            results = sorted(process_outfit_batch.process_outfit_batch(
+                [('a', lambda: b'ok'), ('b', lambda: b'ok')]), key=lambda r: r['index'])
+        self.assertTrue(results[0]['success'])
+        self.assertFalse(results[1]['success'])
+        self.assertEqual(len(self.seen_clients), 1)
+
+    def test_handler_ends_stream_with_error_line(self):
+        def failing_batch(images, embedding_encoding):
+            yield {'index': 0, 'name': 'a', 'success': True}
+            raise RuntimeError('quota exceeded')
+
+        app = flask.Flask(__name__)
+        with patch.object(auth, 'API_KEY', 'k'), \
+                patch.object(process_outfit_batch, 'process_outfit_batch', failing_batch), \
+                app.test_request_context('/process-outfit-batch', method='POST', headers={'X-API-Key': 'k'},
+                                         data='{"image": ""}\n', content_type='application/x-ndjson'):
+            response = main.process_outfit_batch_handler(flask.request)
+            lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(lines[0]['success'])
+        self.assertEqual(lines[-1], {'success': False, 'error': 'quota exceeded'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import base64
+import json
+import tempfile
+import threading
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from storage import storage_client
+from storage.storage_client import StorageClient
+
+
+def _storage():
+    with patch.object(storage_client.storage, 'Client'), \
+            patch.dict(os.environ, {'STORAGE_BUCKET': 'bucket'}):
+        client = StorageClient()
+    client._get_signing_credentials = MagicMock()
+
+    signed = []
+
+    def blob(name):
+        b = MagicMock()
+        b.generate_signed_url.side_effect = \
+            lambda **kw: signed.append(name) or f'https://signed/{name}?n={len(signed)}'
+        return b
+    client.bucket = MagicMock()
+    client.bucket.blob.side_effect = blob
+    return client, signed
+
+
+class TestSignedUrlCache(unittest.TestCase):
+
+    def setUp(self):
+        p = patch.object(storage_client, '_signed_urls', storage_client.OrderedDict())
+        p.start()
+        self.addCleanup(p.stop)
+
+    def test_warm_requests_reuse_signed_urls(self):
+        urls = [f'gs://bucket/cropped-items/shirts/{i}.jpg' for i in range(500)]
+
+        first, signed = _storage()
+        cold = [first.get_signed_url(u) for u in urls]
+        self.assertEqual(len(signed), 500)
+
+        # A later request builds a fresh StorageClient but shares the cache
+        second, signed_again = _storage()
+        warm = [second.get_signed_url(u) for u in urls]
+        self.assertEqual(signed_again, [])
+        self.assertEqual(warm, cold)
+
+    def test_gs_and_https_forms_share_entry(self):
+        client, signed = _storage()
+        client.get_signed_url('gs://bucket/cropped-items/a.jpg')
+        client.get_signed_url('https://storage.googleapis.com/bucket/cropped-items/a.jpg?X-Goog-Signature=old')
+        self.assertEqual(signed, ['cropped-items/a.jpg'])
+
+    def test_resigned_inside_safety_margin(self):
+        client, signed = _storage()
+        with patch.object(storage_client.time, 'time', return_value=0.0):
+            client.get_signed_url('gs://bucket/a.jpg')
+        # 60 min lifetime; 45 min later only 15 min remain (< 20 min margin)
+        with patch.object(storage_client.time, 'time', return_value=45 * 60.0):
+            client.get_signed_url('gs://bucket/a.jpg')
+        self.assertEqual(len(signed), 2)
+
+    def test_lru_eviction(self):
+        client, signed = _storage()
+        with patch.object(storage_client, 'SIGNED_URL_CACHE_SIZE', 2):
+            for name in ['a', 'b', 'a', 'c', 'a', 'b']:
+                client.get_signed_url(f'gs://bucket/{name}.jpg')
+        # b was least recently used when c arrived, so it is signed again
+        self.assertEqual(signed, ['a.jpg', 'b.jpg', 'c.jpg', 'b.jpg'])
+
+
+class TestLocalSigningKey(unittest.TestCase):
+
+    KEY = {'type': 'service_account', 'client_email': 'sa@example.iam.gserviceaccount.com'}
+
+    def test_key_from_mounted_file(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(self.KEY, f)
+        self.addCleanup(os.remove, f.name)
+
+        with patch.object(storage_client, 'SIGNING_KEY_FILE', f.name):
+            self.assertEqual(storage_client._load_signing_key(), self.KEY)
+
+    def test_key_from_secret_manager(self):
+        response = MagicMock()
+        response.json.return_value = {
+            'payload': {'data': base64.b64encode(json.dumps(self.KEY).encode()).decode()}}
+        session = MagicMock()
+        session.get.return_value = response
+
+        with patch.object(storage_client, 'SIGNING_KEY_FILE', None), \
+                patch.object(storage_client, 'SIGNING_KEY_SECRET', 'url-signing-key'), \
+                patch.dict(os.environ, {'GCP_PROJECT_ID': 'proj'}), \
+                patch.object(storage_client.google.auth, 'default', return_value=(MagicMock(), 'proj')), \
+                patch.object(storage_client.google_auth_requests, 'AuthorizedSession', return_value=session):
+            self.assertEqual(storage_client._load_signing_key(), self.KEY)
+
+        session.get.assert_called_once_with(
+            'https://secretmanager.googleapis.com/v1/projects/proj/secrets/url-signing-key/versions/latest:access')
+
+    def test_signing_credentials_resolved_once_per_process(self):
+        credentials = MagicMock()
+        with patch.object(storage_client, '_signing_credentials', None), \
+                patch.object(storage_client, '_resolve_signing_credentials',
+                             return_value=credentials) as resolve, \
+                patch.object(storage_client.storage, 'Client'):
+            first = StorageClient()._get_signing_credentials()
+            second = StorageClient()._get_signing_credentials()
+
+        self.assertIs(first, credentials)
+        self.assertIs(second, credentials)
+        resolve.assert_called_once()
+
+
+class TestSignUrls(unittest.TestCase):
+
+    def setUp(self):
+        p = patch.object(storage_client, '_signed_urls', storage_client.OrderedDict())
+        p.start()
+        self.addCleanup(p.stop)
+
+    def test_input_order_and_dedupe(self):
+        client, signed = _storage()
+        urls = ['gs://bucket/b.jpg', 'gs://bucket/a.jpg',
+                'https://storage.googleapis.com/bucket/b.jpg?sig=1', 'gs://bucket/c.jpg']
+
+        result = client.sign_urls(urls)
+
+        self.assertEqual(sorted(signed), ['a.jpg', 'b.jpg', 'c.jpg'])
+        self.assertEqual([r.split('?')[0] for r in result],
+                         ['https://signed/b.jpg', 'https://signed/a.jpg',
+                          'https://signed/b.jpg', 'https://signed/c.jpg'])
+        self.assertEqual(result[0], result[2])
+
+    def test_cached_urls_not_resigned(self):
+        client, signed = _storage()
+        client.get_signed_url('gs://bucket/a.jpg')
+
+        client.sign_urls(['gs://bucket/a.jpg', 'gs://bucket/b.jpg', 'gs://bucket/c.jpg'])
+
+        self.assertEqual(sorted(signed), ['a.jpg', 'b.jpg', 'c.jpg'])
+
+    def test_misses_signed_concurrently(self):
+        client, _ = _storage()
+        active = []
+        peak = [0]
+        lock = threading.Lock()
+
+        def slow_blob(name):
+            def sign(**kw):
+                with lock:
+                    active.append(name)
+                    peak[0] = max(peak[0], len(active))
+                time.sleep(0.05)
+                with lock:
+                    active.remove(name)
+                return f'https://signed/{name}'
+            b = MagicMock()
+            b.generate_signed_url.side_effect = sign
+            return b
+        client.bucket.blob.side_effect = slow_blob
+
+        with patch.object(storage_client, 'SIGN_URLS_WORKERS', 8):
+            start = time.perf_counter()
+            result = client.sign_urls([f'gs://bucket/{i}.jpg' for i in range(16)])
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(result, [f'https://signed/{i}.jpg' for i in range(16)])
+        self.assertGreater(peak[0], 1)
+        self.assertLess(elapsed, 16 * 0.05 / 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,249 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from datetime import datetime, timedelta, timezone
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils import stats_summary
+from functions import statistics
+
+
+NOW = datetime.now(timezone.utc)
+TODAY = NOW.date().isoformat()
+
+
+def _entry(item_id, item_type='shirt', wear_count=0, last_worn=None, thumbnail_url=None):
+    return {
+        'id': item_id,
+        'type': item_type,
+        'image_url': f'gs://bucket/cropped-items/{item_type}/{item_id}.jpg',
+        'thumbnail_url': thumbnail_url,
+        'wear_count': wear_count,
+        'last_worn': last_worn,
+    }
+
+
+def _item(item_type='shirt', wear_count=0, last_worn=None):
+    """clothing_items data as writers pass it to stats_summary.commit."""
+    return {'type': item_type, 'image_urls': ['gs://b/x.jpg'], 'thumbnail_url': None,
+            'wear_count': wear_count, 'last_worn': last_worn}
+
+
+def _doc(entry):
+    doc = MagicMock(id=entry['id'])
+    doc.to_dict.return_value = {'type': entry['type'], 'image_urls': [entry['image_url']],
+                                'thumbnail_url': entry['thumbnail_url'],
+                                'wear_count': entry['wear_count'], 'last_worn': entry['last_worn']}
+    return doc
+
+
+def _ranked(counts):
+    """Most- and least-worn lists for items i0..iN with the given wear counts."""
+    entries = [_entry(f'i{n}', wear_count=c) for n, c in enumerate(counts)]
+    most = sorted(entries, key=stats_summary._most_worn_key)
+    least = sorted(entries, key=stats_summary._least_worn_key)
+    return most, least
+
+
+class TestSummaryUpdates(unittest.TestCase):
+
+    def test_totals_follow_changes(self):
+        summary = {'totals': {'total_shirts': 2, 'total_pants': 1, 'total_items': 3, 'total_wears': 4},
+                   'most_worn': [], 'least_worn': []}
+
+        updated = stats_summary._apply_changes(summary, {
+            'worn': (_item(wear_count=1), _item(wear_count=2)),
+            'new': (None, _item('pants')),
+            'gone': (_item(wear_count=3), None),
+        }, read=MagicMock(), db=MagicMock())
+
+        self.assertEqual(updated['totals'], {
+            'total_shirts': 1, 'total_pants': 2, 'total_items': 3, 'total_wears': 2,
+        })
+        self.assertEqual(set(updated), {'totals', 'most_worn', 'least_worn'})
+
+    def test_reorders_within_list_without_query(self):
+        most, _ = _ranked([9, 8, 7, 6, 5, 1])
+        refill = MagicMock()
+
+        updated = stats_summary._updated_list(
+            most[:5], {'i3': _entry('i3', wear_count=10)}, stats_summary._most_worn_key, refill)
+
+        self.assertEqual([e['id'] for e in updated], ['i3', 'i0', 'i1', 'i2', 'i4'])
+        refill.assert_not_called()
+
+    def test_item_entering_list_needs_no_query(self):
+        most, _ = _ranked([9, 8, 7, 6, 5, 1])
+        refill = MagicMock()
+
+        updated = stats_summary._updated_list(
+            most[:5], {'i5': _entry('i5', wear_count=6)}, stats_summary._most_worn_key, refill)
+
+        self.assertEqual([e['id'] for e in updated], ['i0', 'i1', 'i2', 'i3', 'i5'])
+        refill.assert_not_called()
+
+    def test_item_leaving_list_refills_from_query(self):
+        _, least = _ranked([0, 1, 2, 3, 4, 5, 6])
+        refill = MagicMock(return_value=least[:6])
+
+        updated = stats_summary._updated_list(
+            least[:5], {'i0': _entry('i0', wear_count=9)}, stats_summary._least_worn_key, refill)
+
+        refill.assert_called_once_with(stats_summary.TOP_N + 1)
+        self.assertEqual([e['id'] for e in updated], ['i1', 'i2', 'i3', 'i4', 'i5'])
+        self.assertNotIn('i0', [e['id'] for e in updated])
+
+    def test_removed_item_refills_from_query(self):
+        most, _ = _ranked([9, 8, 7, 6, 5, 4])
+        refill = MagicMock(return_value=most)
+
+        updated = stats_summary._updated_list(
+            most[:5], {'i1': None}, stats_summary._most_worn_key, refill)
+
+        self.assertEqual([e['id'] for e in updated], ['i0', 'i2', 'i3', 'i4', 'i5'])
+
+    def test_short_list_holds_every_item(self):
+        refill = MagicMock()
+        updated = stats_summary._updated_list(
+            [_entry('a', wear_count=1)], {'b': _entry('b'), 'a': None},
+            stats_summary._least_worn_key, refill)
+
+        self.assertEqual([e['id'] for e in updated], ['b'])
+        refill.assert_not_called()
+
+    def test_refill_reads_in_transaction(self):
+        most, least = _ranked([5, 4, 3, 2, 1, 0])
+        summary = {'totals': {'total_shirts': 6, 'total_pants': 0, 'total_items': 6, 'total_wears': 15},
+                   'most_worn': most[:5], 'least_worn': least[:5]}
+        read = MagicMock(return_value=[_doc(e) for e in least])
+
+        updated = stats_summary._apply_changes(
+            summary, {'i5': (_item(wear_count=0), _item(wear_count=7))}, read, MagicMock())
+
+        read.assert_called_once()
+        self.assertEqual(updated['most_worn'][0]['id'], 'i5')
+        self.assertEqual([e['id'] for e in updated['least_worn']], ['i4', 'i3', 'i2', 'i1', 'i0'])
+        self.assertEqual(updated['totals']['total_wears'], 22)
+
+    def test_commit_writes_summary_with_item_writes(self):
+        db, transaction, write = MagicMock(), MagicMock(), MagicMock()
+        snapshot = db.collection.return_value.document.return_value.get.return_value
+        snapshot.exists = True
+        snapshot.to_dict.return_value = {
+            'totals': {'total_shirts': 0, 'total_pants': 0, 'total_items': 0, 'total_wears': 0},
+            'most_worn': [], 'least_worn': [],
+        }
+
+        stats_summary._commit_in_transaction.to_wrap(transaction, db, write, {'a': (None, _item())})
+
+        write.assert_called_once_with(transaction)
+        ref, stored = transaction.set.call_args[0]
+        self.assertIs(ref, stats_summary.summary_ref(db))
+        self.assertEqual(stored['totals']['total_items'], 1)
+        self.assertEqual([e['id'] for e in stored['most_worn']], ['a'])
+
+    def test_commit_without_summary_only_writes_items(self):
+        db, transaction, write = MagicMock(), MagicMock(), MagicMock()
+        db.collection.return_value.document.return_value.get.return_value.exists = False
+
+        stats_summary._commit_in_transaction.to_wrap(transaction, db, write, {'a': (None, _item())})
+
+        write.assert_called_once_with(transaction)
+        transaction.set.assert_not_called()
+
+
+class TestStatisticsFromSummary(unittest.TestCase):
+
+    def setUp(self):
+        self.storage = MagicMock()
+        self.storage.sign_urls.side_effect = lambda urls: [f'https://signed/{u}' for u in urls]
+        self.storage.get_hashes.side_effect = lambda urls: [f'md5:{u}' for u in urls]
+        self.db = MagicMock()
+
+        patches = [
+            patch.object(statistics, 'StorageClient', return_value=self.storage),
+            patch.object(statistics.firestore, 'Client', return_value=self.db),
+            patch.object(statistics.wear_rollups, 'get_wear_frequency', return_value={TODAY: 2}),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+        self.items = MagicMock()
+        for method in ('select', 'where', 'order_by', 'limit'):
+            getattr(self.items, method).return_value = self.items
+        self.stats = MagicMock()
+        collections = {'clothing_items': self.items, stats_summary.STATS_COLLECTION: self.stats}
+        self.db.collection.side_effect = lambda name: collections[name]
+
+    def _stored(self, summary):
+        snapshot = MagicMock()
+        snapshot.exists = summary is not None
+        snapshot.to_dict.return_value = summary
+        self.stats.document.return_value.get.return_value = snapshot
+
+    def test_single_document_read(self):
+        a = _entry('a', wear_count=5, last_worn=NOW - timedelta(days=1))
+        b = _entry('b', 'pants', 0)
+        self._stored({
+            'totals': {'total_shirts': 1, 'total_pants': 1, 'total_items': 2, 'total_wears': 5},
+            'most_worn': [a, b], 'least_worn': [b, a],
+        })
+        self.items.stream.side_effect = [[_doc(b)], []]  # never worn, then worn before the window
+
+        with patch.object(stats_summary, 'compute_summary') as compute:
+            result = statistics.get_statistics()
+        compute.assert_not_called()
+
+        self.assertEqual([i['id'] for i in result['most_worn']], ['a', 'b'])
+        self.assertEqual([i['id'] for i in result['not_worn_30_days']], ['b'])
+        self.assertEqual(result['most_worn'][0]['days_since_worn'], 1)
+        self.assertTrue(result['most_worn'][0]['image_url'].startswith('https://signed/'))
+        self.assertEqual(result['totals']['total_wears'], 5)
+        self.assertEqual(result['wear_frequency'], {TODAY: 2})
+        self.storage.sign_urls.assert_called_once()
+        self.items.order_by.assert_not_called()
+
+    def test_thumbnail_hashes_without_bucket_listing(self):
+        stored = {**_entry('a', thumbnail_url='gs://b/thumbnails/a.jpg'), 'thumbnail_hash': 'a-md5'}
+        legacy = _entry('b', thumbnail_url='gs://b/thumbnails/b.jpg')  # summary written before hashes
+        self._stored({
+            'totals': {'total_shirts': 2, 'total_pants': 0, 'total_items': 2, 'total_wears': 0},
+            'most_worn': [stored, legacy], 'least_worn': [stored, legacy],
+        })
+        self.items.stream.side_effect = [[], []]
+
+        result = statistics.get_statistics()
+
+        self.assertEqual([i['thumbnail_hash'] for i in result['most_worn']],
+                         ['a-md5', 'md5:gs://b/thumbnails/b.jpg'])
+        self.storage.get_hashes.assert_called_once_with(['gs://b/thumbnails/b.jpg'])
+        self.storage.get_hashes_by_path.assert_not_called()
+
+    def test_falls_back_to_queries_without_summary(self):
+        self._stored(None)
+
+        def aggregate(items, wears):
+            return [[MagicMock(alias='items', value=items), MagicMock(alias='wears', value=wears)]]
+        self.items.count.return_value.sum.return_value.get.side_effect = [aggregate(3, 7), aggregate(2, 1)]
+        self.items.stream.return_value = [_doc(_entry('a'))]
+
+        result = statistics.get_statistics()
+
+        self.assertEqual(result['totals'], {
+            'total_shirts': 3, 'total_pants': 2, 'total_items': 5, 'total_wears': 8,
+        })
+        self.assertEqual([i['id'] for i in result['most_worn']], ['a'])
+        self.items.limit.assert_called_with(stats_summary.TOP_N)
+        self.items.select.assert_called_with(stats_summary.SUMMARY_FIELDS)
+
+    def test_window_out_of_range(self):
+        with self.assertRaises(ValueError):
+            statistics.get_statistics(days=0)
+        with self.assertRaises(ValueError):
+            statistics.get_statistics(days=366)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from PIL import Image
+import io
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from storage import storage_client
+from storage.storage_client import StorageClient
+from storage.image_utils import THUMBNAIL_SIZE
+from functions import list_items
+
+
+def _make_test_image(width=640, height=480, color='blue'):
+    img = Image.new('RGB', (width, height), color=color)
+    buf = io.BytesIO()
+    img.save(buf, format='JPEG')
+    return buf.getvalue()
+
+
+class TestStorageThumbnails(unittest.TestCase):
+
+    def setUp(self):
+        with patch.object(storage_client.storage, 'Client'), \
+                patch.dict(os.environ, {'STORAGE_BUCKET': 'bucket'}):
+            self.storage = StorageClient()
+        self.blobs = {}
+
+        def blob(name):
+            return self.blobs.setdefault(name, MagicMock(name=name))
+        self.storage.bucket = MagicMock()
+        self.storage.bucket.blob.side_effect = blob
+
+    def test_thumbnail_path_mirrors_crop_path(self):
+        self.assertEqual(self.storage.thumbnail_path('gs://bucket/cropped-items/shirts/a_shirt.jpg'),
+                         'thumbnails/shirts/a_shirt.jpg')
+        signed = 'https://storage.googleapis.com/bucket/cropped-items/pants/b_pants.jpg?X-Goog-Signature=x'
+        self.assertEqual(self.storage.thumbnail_path(signed), 'thumbnails/pants/b_pants.jpg')
+
+    def test_upload_thumbnail_is_small_square(self):
+        self.blobs['thumbnails/shirts/a_shirt.jpg'] = MagicMock(md5_hash='thumb-md5')
+
+        url, md5 = self.storage.upload_thumbnail(_make_test_image(1200, 1600),
+                                                 'gs://bucket/cropped-items/shirts/a_shirt.jpg')
+
+        self.assertEqual(url, 'gs://bucket/thumbnails/shirts/a_shirt.jpg')
+        self.assertEqual(md5, 'thumb-md5')
+        data = self.blobs['thumbnails/shirts/a_shirt.jpg'].upload_from_string.call_args[0][0]
+        self.assertEqual(Image.open(io.BytesIO(data)).size, THUMBNAIL_SIZE)
+
+    def test_ensure_thumbnail_skips_existing(self):
+        self.storage.bucket.get_blob.return_value = MagicMock(md5_hash='thumb-md5')
+
+        result = self.storage.ensure_thumbnail('gs://bucket/cropped-items/shirts/a_shirt.jpg')
+
+        self.assertEqual(result, ('gs://bucket/thumbnails/shirts/a_shirt.jpg', 'thumb-md5'))
+        self.storage.bucket.get_blob.assert_called_once_with('thumbnails/shirts/a_shirt.jpg')
+        self.assertNotIn('thumbnails/shirts/a_shirt.jpg', self.blobs)
+        self.assertNotIn('cropped-items/shirts/a_shirt.jpg', self.blobs)
+
+    def test_ensure_thumbnail_generates_missing(self):
+        self.storage.bucket.get_blob.return_value = None
+        self.blobs['thumbnails/shirts/a_shirt.jpg'] = MagicMock(md5_hash='new-md5')
+        self.blobs['cropped-items/shirts/a_shirt.jpg'] = MagicMock(
+            **{'download_as_bytes.return_value': _make_test_image()})
+
+        _, md5 = self.storage.ensure_thumbnail('gs://bucket/cropped-items/shirts/a_shirt.jpg')
+
+        self.blobs['thumbnails/shirts/a_shirt.jpg'].upload_from_string.assert_called_once()
+        self.assertEqual(md5, 'new-md5')
+
+    def test_get_hashes_reads_only_requested_blobs(self):
+        hashes = {'cropped-items/shirts/a.jpg': 'a-md5', 'thumbnails/shirts/a.jpg': 't-md5'}
+        self.storage.bucket.get_blob.side_effect = \
+            lambda path: MagicMock(md5_hash=hashes[path]) if path in hashes else None
+
+        result = self.storage.get_hashes([
+            'gs://bucket/cropped-items/shirts/a.jpg',
+            'https://storage.googleapis.com/bucket/thumbnails/shirts/a.jpg?X-Goog-Signature=x',
+            'gs://bucket/cropped-items/shirts/missing.jpg',
+            'gs://bucket/cropped-items/shirts/a.jpg',
+        ])
+
+        self.assertEqual(result, ['a-md5', 't-md5', None, 'a-md5'])
+        self.assertEqual(self.storage.bucket.get_blob.call_count, 3)
+        self.storage.bucket.list_blobs.assert_not_called()
+
+
+class TestListItemsThumbnails(unittest.TestCase):
+
+    def test_entries_carry_signed_thumbnail_and_hash(self):
+        docs = []
+        for doc_id, thumbnail, thumbnail_hash in [
+                ('a', 'gs://bucket/thumbnails/shirts/a.jpg', 'thumb-hash'),
+                ('b', None, None),
+                ('c', 'gs://bucket/thumbnails/shirts/c.jpg', None)]:  # written before hashes were stored
+            doc = MagicMock()
+            doc.id = doc_id
+            doc.to_dict.return_value = {
+                'type': 'shirt',
+                'image_urls': [f'gs://bucket/cropped-items/shirts/{doc_id}.jpg'],
+                'thumbnail_url': thumbnail,
+                'thumbnail_hash': thumbnail_hash,
+                'wear_count': 0,
+                'last_worn': None,
+            }
+            docs.append(doc)
+
+        storage = MagicMock()
+        storage.sign_urls.side_effect = lambda urls: [f'https://signed/{url}' for url in urls]
+        storage._blob_path.side_effect = lambda url: url.replace('gs://bucket/', '')
+        storage.get_hashes_by_path.return_value = {'cropped-items/shirts/a.jpg': 'crop-hash'}
+        storage.get_hashes.return_value = ['old-thumb-hash']
+
+        with patch.object(list_items, 'StorageClient', return_value=storage), \
+                patch.object(list_items.firestore, 'Client') as client:
+            client.return_value.collection.return_value.select.return_value.stream.return_value = docs
+            result = list_items.list_items()
+
+        by_id = {entry['id']: entry for entry in result['shirts']}
+        self.assertEqual(by_id['a']['thumbnail_url'], 'https://signed/gs://bucket/thumbnails/shirts/a.jpg')
+        self.assertEqual(by_id['a']['thumbnail_hash'], 'thumb-hash')
+        self.assertEqual(by_id['a']['image_hash'], 'crop-hash')
+        self.assertIsNone(by_id['b']['thumbnail_url'])
+        self.assertIsNone(by_id['b']['thumbnail_hash'])
+        self.assertEqual(by_id['b']['image_url'], 'https://signed/gs://bucket/cropped-items/shirts/b.jpg')
+        self.assertEqual(by_id['c']['thumbnail_hash'], 'old-thumb-hash')
+        storage.get_hashes.assert_called_once_with(['gs://bucket/thumbnails/shirts/c.jpg'])
+        storage.get_hashes_by_path.assert_called_once_with('cropped-items/')
+        storage.sign_urls.assert_called_once()
+        storage.get_signed_url.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+from unittest.mock import MagicMock
+from datetime import datetime, timedelta, timezone
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils import wear_rollups
+
+
+NOW = datetime.now(timezone.utc)
+TODAY = NOW.date().isoformat()
+
+
+def _doc(data):
+    doc = MagicMock()
+    doc.to_dict.return_value = data
+    return doc
+
+
+def _fake_db(rollups=(), logs=()):
+    db = MagicMock()
+    collections = {
+        wear_rollups.ROLLUPS_COLLECTION: MagicMock(),
+        'wear_logs': MagicMock(),
+    }
+    collections[wear_rollups.ROLLUPS_COLLECTION].where.return_value.stream.return_value = \
+        [_doc(r) for r in rollups]
+    collections['wear_logs'].where.return_value.stream.return_value = [_doc(l) for l in logs]
+    db.collection.side_effect = lambda name: collections[name]
+    return db, collections
+
+
+class TestRecordWears(unittest.TestCase):
+
+    def test_increments_grouped_by_day(self):
+        db, collections = _fake_db()
+        batch = MagicMock()
+        yesterday = NOW - timedelta(days=1)
+
+        wear_rollups.record_wears(db, 'shirt', [NOW, None, yesterday], batch=batch)
+
+        refs = collections[wear_rollups.ROLLUPS_COLLECTION].document
+        self.assertEqual(sorted(c[0][0] for c in refs.call_args_list),
+                         sorted([TODAY, yesterday.date().isoformat()]))
+        today_write = batch.set.call_args_list[0]
+        data = today_write[0][1]
+        self.assertEqual(data['date'], TODAY)
+        self.assertEqual(data['total'].value, 2)
+        self.assertEqual(data['by_type']['shirt'].value, 2)
+        self.assertEqual(today_write[1], {'merge': True})
+
+    def test_days_are_utc(self):
+        # 00:30 on the 2nd in UTC+3 is still the 1st in UTC
+        local = datetime(2026, 3, 2, 0, 30, tzinfo=timezone(timedelta(hours=3)))
+        self.assertEqual(wear_rollups.day_key(local), '2026-03-01')
+        self.assertEqual(wear_rollups.day_key(datetime(2026, 3, 2, 0, 30)), '2026-03-02')
+
+    def test_deleted_logs_decrement(self):
+        db, _ = _fake_db()
+        batch = MagicMock()
+        wear_rollups.record_wears(db, 'pants', [NOW], delta=-1, batch=batch)
+        self.assertEqual(batch.set.call_args[0][1]['total'].value, -1)
+
+
+class TestWearFrequency(unittest.TestCase):
+
+    def test_reads_rollups(self):
+        db, collections = _fake_db(rollups=[
+            {'date': TODAY, 'total': 3, 'by_type': {'shirt': 2, 'pants': 1}},
+            {'date': '2000-01-01', 'total': 0, 'by_type': {}},
+        ])
+
+        self.assertEqual(wear_rollups.get_wear_frequency(db, 90), {TODAY: 3})
+        self.assertEqual(wear_rollups.get_wear_frequency(db, 90, 'pants'), {TODAY: 1})
+        oldest = (NOW - timedelta(days=90)).date().isoformat()
+        collections[wear_rollups.ROLLUPS_COLLECTION].where.assert_called_with('date', '>=', oldest)
+        collections['wear_logs'].where.assert_not_called()
+
+    def test_falls_back_to_logs_before_backfill(self):
+        db, _ = _fake_db(logs=[
+            {'worn_at': NOW, 'item_type': 'shirt'},
+            {'worn_at': NOW, 'item_type': 'pants'},
+        ])
+        self.assertEqual(wear_rollups.get_wear_frequency(db), {TODAY: 2})
+        self.assertEqual(wear_rollups.get_wear_frequency(db, item_type='shirt'), {TODAY: 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
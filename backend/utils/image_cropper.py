@@ -1,6 +1,9 @@
 from PIL import Image
 import io
-from typing import Dict, Optional
+import os
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
 
 # Per-garment-type padding: (pad_x, pad_y_top, pad_y_bottom)
 PADDING_BY_TYPE = {
@@ -9,6 +12,19 @@ PADDING_BY_TYPE = {
 }
 DEFAULT_PADDING = (0.10, 0.10, 0.10)
 
+# Crop output profile. The embedding model downsamples its input internally,
+# so Vertex only gets a small rendition; GCS keeps a larger archival one.
+EMBED_MAX_SIDE = int(os.getenv('EMBED_MAX_SIDE', '512'))
+ARCHIVE_MAX_SIDE = int(os.getenv('ARCHIVE_MAX_SIDE', '1600'))
+ARCHIVE_JPEG_QUALITY = 90
+
+
+@dataclass
+class CropRenditions:
+    """The two outputs of one crop: archival (GCS) and embedding (Vertex)."""
+    archive: bytes
+    embed: bytes
+
 
 def crop_clothing_item(image_bytes: bytes, bounding_box: Dict,
                        padding: float = 0.1,
@@ -25,39 +41,167 @@ def crop_clothing_item(image_bytes: bytes, bounding_box: Dict,
     Returns:
         Cropped image as JPEG bytes
     """
+    key = item_type or 'item'
+    return crop_clothing_items(image_bytes, {key: bounding_box}, padding=padding,
+                               use_type_padding=item_type is not None)[key]
+
+
+def crop_clothing_items(image_bytes: bytes, bounding_boxes: Dict[str, Dict],
+                        padding: float = 0.1,
+                        max_side: Optional[int] = None,
+                        executor: Optional[Executor] = None,
+                        use_type_padding: bool = True) -> Dict[str, bytes]:
+    """
+    Crop several items out of one photo, decoding it only once.
+
+    When ``max_side`` is set, JPEGs are decoded with PIL's draft mode at the
+    smallest power-of-two reduction that still gives every crop at least
+    ``max_side`` pixels on its longest side, and each crop is then resized
+    to fit ``max_side``.
+
+    Args:
+        image_bytes: Original image as bytes
+        bounding_boxes: item_type -> bounding box (normalized 0-1). Keys
+            found in PADDING_BY_TYPE get type-specific padding.
+        padding: Padding for keys without a type-specific entry
+        max_side: Cap on each crop's longest side (optional; None keeps
+            full source resolution)
+        executor: Executor to JPEG-encode the crops in parallel (optional)
+        use_type_padding: Set False to apply ``padding`` to every key
+
+    Returns:
+        item_type -> cropped image as JPEG bytes
+    """
+    crops = _decode_crops(image_bytes, bounding_boxes, padding, max_side, use_type_padding)
+
+    def encode(cropped: Image.Image) -> bytes:
+        if max_side:
+            cropped.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        return _encode_jpeg(cropped)
+
+    return _map(encode, crops, executor)
+
+
+def crop_renditions(image_bytes: bytes, bounding_boxes: Dict[str, Dict],
+                    executor: Optional[Executor] = None) -> Dict[str, CropRenditions]:
+    """
+    Crop several items from one decode, producing both renditions of each.
+
+    Args:
+        image_bytes: Original image as bytes
+        bounding_boxes: item_type -> bounding box (normalized 0-1)
+        executor: Executor to encode the crops in parallel (optional)
+
+    Returns:
+        item_type -> CropRenditions
+    """
+    crops = _decode_crops(image_bytes, bounding_boxes, 0.1, ARCHIVE_MAX_SIDE, True)
+    return _map(_renditions, crops, executor)
+
+
+def renditions_from_crop(crop_bytes: bytes) -> CropRenditions:
+    """
+    Both renditions of an already-cropped image (e.g. a manual crop).
+
+    Args:
+        crop_bytes: Cropped image bytes
+
+    Returns:
+        CropRenditions
+    """
+    image = Image.open(io.BytesIO(crop_bytes))
+    image.draft('RGB', (ARCHIVE_MAX_SIDE, ARCHIVE_MAX_SIDE))
+    return _renditions(image)
+
+
+def embedding_rendition(image_bytes: bytes) -> bytes:
+    """Downscale any stored crop to the rendition sent to Vertex AI."""
+    image = Image.open(io.BytesIO(image_bytes))
+    image.draft('RGB', (EMBED_MAX_SIDE, EMBED_MAX_SIDE))
+    image.thumbnail((EMBED_MAX_SIDE, EMBED_MAX_SIDE), Image.Resampling.LANCZOS)
+    return _encode_jpeg(image)
+
+
+def _renditions(cropped: Image.Image) -> CropRenditions:
+    cropped.thumbnail((ARCHIVE_MAX_SIDE, ARCHIVE_MAX_SIDE), Image.Resampling.LANCZOS)
+    archive = _encode_jpeg(cropped, ARCHIVE_JPEG_QUALITY)
+
+    small = cropped.copy()
+    small.thumbnail((EMBED_MAX_SIDE, EMBED_MAX_SIDE), Image.Resampling.LANCZOS)
+    return CropRenditions(archive=archive, embed=_encode_jpeg(small))
+
+
+def _map(fn, crops: Dict[str, Image.Image],
+         executor: Optional[Executor]) -> Dict[str, object]:
+    """Apply ``fn`` to every crop, on ``executor`` when there is more than one."""
+    if executor is not None and len(crops) > 1:
+        futures = {key: executor.submit(fn, cropped) for key, cropped in crops.items()}
+        return {key: f.result() for key, f in futures.items()}
+    return {key: fn(cropped) for key, cropped in crops.items()}
+
+
+def _decode_crops(image_bytes: bytes, bounding_boxes: Dict[str, Dict],
+                  padding: float, max_side: Optional[int],
+                  use_type_padding: bool) -> Dict[str, Image.Image]:
+    """Decode the photo once (draft-scaled for max_side) and cut every padded crop."""
     image = Image.open(io.BytesIO(image_bytes))
     width, height = image.size
 
+    paddings = {
+        key: (PADDING_BY_TYPE[key] if use_type_padding and key in PADDING_BY_TYPE
+              else (padding, padding, padding))
+        for key in bounding_boxes
+    }
+
+    if max_side and image.format == 'JPEG' and bounding_boxes:
+        # Scale at which even the smallest crop still covers max_side
+        longest = []
+        for key, bbox in bounding_boxes.items():
+            left, top, right, bottom = _padded_box(bbox, width, height, paddings[key])
+            longest.append(max(1, right - left, bottom - top))
+        scale = max_side / min(longest)
+        if scale < 1:
+            image.draft('RGB', (int(width * scale) + 1, int(height * scale) + 1))
+
+    # Decode once; every crop below reads the same pixels
+    image.load()
+    width, height = image.size
+
+    return {
+        key: image.crop(_padded_box(bbox, width, height, paddings[key]))
+        for key, bbox in bounding_boxes.items()
+    }
+
+
+def _padded_box(bounding_box: Dict, width: int, height: int,
+                padding: Tuple[float, float, float]) -> Tuple[int, int, int, int]:
+    """Pixel crop box for a normalized bounding box plus (x, top, bottom) padding."""
     # Convert normalized coordinates to pixels
     x_min = int(bounding_box['x_min'] * width)
     y_min = int(bounding_box['y_min'] * height)
     x_max = int(bounding_box['x_max'] * width)
     y_max = int(bounding_box['y_max'] * height)
 
-    # Add padding — use type-specific values if available
-    if item_type and item_type in PADDING_BY_TYPE:
-        pad_x_ratio, pad_y_top_ratio, pad_y_bottom_ratio = PADDING_BY_TYPE[item_type]
-    else:
-        pad_x_ratio, pad_y_top_ratio, pad_y_bottom_ratio = (padding, padding, padding)
-
+    pad_x_ratio, pad_y_top_ratio, pad_y_bottom_ratio = padding
     box_w = x_max - x_min
     box_h = y_max - y_min
     pad_x = int(box_w * pad_x_ratio)
     pad_y_top = int(box_h * pad_y_top_ratio)
     pad_y_bottom = int(box_h * pad_y_bottom_ratio)
 
-    x_min = max(0, x_min - pad_x)
-    y_min = max(0, y_min - pad_y_top)
-    x_max = min(width, x_max + pad_x)
-    y_max = min(height, y_max + pad_y_bottom)
+    return (
+        max(0, x_min - pad_x),
+        max(0, y_min - pad_y_top),
+        min(width, x_max + pad_x),
+        min(height, y_max + pad_y_bottom),
+    )
 
-    # Crop and return
-    cropped = image.crop((x_min, y_min, x_max, y_max))
 
-    # Convert RGBA/P to RGB for JPEG compatibility
-    if cropped.mode in ('RGBA', 'P'):
+def _encode_jpeg(cropped: Image.Image, quality: int = 90) -> bytes:
+    # Convert RGBA/P (and other non-JPEG modes) to RGB for JPEG compatibility
+    if cropped.mode not in ('RGB', 'L'):
         cropped = cropped.convert('RGB')
 
     output = io.BytesIO()
-    cropped.save(output, format='JPEG', quality=90)
+    cropped.save(output, format='JPEG', quality=quality)
     return output.getvalue()
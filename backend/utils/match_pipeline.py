@@ -1,61 +1,146 @@
 import uuid
+from concurrent.futures import Executor
+from typing import Dict, List, Optional
 from storage.storage_client import StorageClient
 from embeddings.vertex_embedder import VertexEmbedder
-from embeddings.similarity import find_most_similar
+from embeddings.embedding_index import get_index
+from embeddings import embedding_codec
 from google.cloud import firestore
 
 
+# Bounded pool per request: original upload + one branch and one crop upload
+# per item type, so nested submits never wait on a saturated pool.
+PIPELINE_WORKERS = 6
+
+
+def upload_original(storage: StorageClient, image_bytes: bytes) -> str:
+    """Upload the original outfit photo and return its signed URL."""
+    original_url = storage.upload_original_photo(image_bytes)
+    return storage.get_signed_url(original_url)
+
+
 def embed_and_match(crop_bytes: bytes, item_type: str,
                     storage: StorageClient, embedder: VertexEmbedder,
-                    db: firestore.Client) -> dict:
+                    db: firestore.Client,
+                    executor: Optional[Executor] = None,
+                    embed_bytes: Optional[bytes] = None,
+                    embedding_encoding: Optional[str] = None) -> dict:
     """
     Shared pipeline: upload crop, generate embedding, find match.
 
+    The crop upload and its URL signing run on ``executor`` when one is given,
+    overlapping the embedding call and the index search.
+
     Args:
-        crop_bytes: Cropped image bytes (JPEG)
+        crop_bytes: Cropped image bytes (JPEG), uploaded to Cloud Storage
         item_type: 'shirt' or 'pants'
         storage: StorageClient instance
         embedder: VertexEmbedder instance
         db: Firestore client
+        executor: Executor for the crop upload (optional; runs inline if None)
+        embed_bytes: Smaller rendition sent to Vertex AI instead of
+            ``crop_bytes`` (optional)
+        embedding_encoding: 'float16' or 'int8' to return the embedding as a
+            base64 blob (see embeddings/embedding_codec.py); None returns a
+            plain float list
 
     Returns:
         Dict with match result (matched, item_id, similarity, image_url, cropped_url, embedding)
     """
-    # Generate embedding
-    embedding = embedder.generate_embedding(crop_bytes)
+    embed_crops = {item_type: embed_bytes} if embed_bytes is not None else None
+    return embed_and_match_many({item_type: crop_bytes}, storage, embedder, db,
+                                executor, embed_crops, embedding_encoding)[item_type]
 
-    # Upload cropped image
-    temp_id = str(uuid.uuid4())
-    cropped_url = storage.upload_cropped_item(crop_bytes, item_type, temp_id)
 
-    # Search for similar items in Firestore
-    existing_items = db.collection('clothing_items')\
-        .where('type', '==', item_type)\
-        .stream()
+def embed_and_match_many(crops: Dict[str, bytes],
+                         storage: StorageClient, embedder: VertexEmbedder,
+                         db: firestore.Client,
+                         executor: Optional[Executor] = None,
+                         embed_crops: Optional[Dict[str, bytes]] = None,
+                         embedding_encoding: Optional[str] = None) -> Dict[str, dict]:
+    """
+    Embed several crops from one photo in a single batch, then match each.
+
+    Args:
+        crops: item_type -> cropped image bytes (JPEG), uploaded to Cloud Storage
+        storage: StorageClient instance
+        embedder: VertexEmbedder instance
+        db: Firestore client
+        executor: Executor for the crop uploads (optional; run inline if None)
+        embed_crops: item_type -> embedding rendition sent to Vertex AI in
+            place of the uploaded crop (optional, per item)
+        embedding_encoding: Wire encoding of the returned embeddings (see
+            embed_and_match)
+
+    Returns:
+        item_type -> match result dict (see embed_and_match)
+    """
+    item_types = list(crops)
+
+    # Upload cropped images (in the background when an executor is available)
+    upload_futures = {}
+    temp_ids = {item_type: str(uuid.uuid4()) for item_type in item_types}
+    if executor is not None:
+        for item_type in item_types:
+            upload_futures[item_type] = executor.submit(
+                _upload_crop, storage, crops[item_type], item_type, temp_ids[item_type]
+            )
+
+    # Generate all embeddings in one batch, 1:1 with item_types
+    embed_crops = embed_crops or {}
+    embeddings = embedder.batch_generate_embeddings(
+        [embed_crops.get(t, crops[t]) for t in item_types]
+    )
 
-    candidates = []
-    for item in existing_items:
-        data = item.to_dict()
-        for emb in data['embeddings'].values():
-            candidates.append((item.id, emb))
+    results = {}
+    for item_type, embedding in zip(item_types, embeddings):
+        if item_type in upload_futures:
+            signed_cropped_url = upload_futures[item_type].result()
+        else:
+            signed_cropped_url = _upload_crop(
+                storage, crops[item_type], item_type, temp_ids[item_type]
+            )
+        results[item_type] = _match(embedding, item_type, signed_cropped_url, storage, db,
+                                    embedding_encoding)
 
-    match = find_most_similar(embedding, candidates, threshold=0.85)
+    return results
+
+
+def _match(embedding: List[float], item_type: str, signed_cropped_url: str,
+           storage: StorageClient, db: firestore.Client,
+           embedding_encoding: Optional[str] = None) -> dict:
+    """Search the embedding index and build the match result for one crop."""
+    # Search the warm per-type index (rebuilt from Firestore only when stale)
+    index = get_index(db, item_type, storage)
+    match = index.search(embedding, threshold=0.85)
 
     if match:
         item_id, similarity = match
-        item_doc = db.collection('clothing_items').document(item_id).get()
-        item_data = item_doc.to_dict()
+        image_url = index.image_url(item_id)
+        if image_url is None:
+            item_data = db.collection('clothing_items').document(item_id).get().to_dict()
+            image_url = item_data['image_urls'][0]
         return {
             'matched': True,
             'item_id': item_id,
             'similarity': float(similarity),
-            'image_url': storage.get_signed_url(item_data['image_urls'][0]),
-            'cropped_url': storage.get_signed_url(cropped_url),
-            'embedding': embedding
+            'image_url': storage.get_signed_url(image_url),
+            'cropped_url': signed_cropped_url,
+            'embedding': embedding_codec.to_wire(embedding, embedding_encoding)
         }
     else:
         return {
             'matched': False,
-            'cropped_url': storage.get_signed_url(cropped_url),
-            'embedding': embedding
+            'cropped_url': signed_cropped_url,
+            'embedding': embedding_codec.to_wire(embedding, embedding_encoding)
         }
+
+
+def _upload_crop(storage: StorageClient, crop_bytes: bytes,
+                 item_type: str, temp_id: str) -> str:
+    """Upload a crop and its thumbnail, and return the crop's signed URL."""
+    cropped_url = storage.upload_cropped_item(crop_bytes, item_type, temp_id)
+    # Thumbnail lives at a path derived from the crop URL, so add_new_item /
+    # confirm_match only need to read its metadata (for the stored hash)
+    storage.upload_thumbnail(crop_bytes, cropped_url)
+    return storage.get_signed_url(cropped_url)
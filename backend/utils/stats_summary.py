@@ -0,0 +1,197 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from google.cloud import firestore
+
+
+# Materialized /statistics input, one small document of bounded size:
+#   stats/summary = {
+#     totals: {total_shirts, total_pants, total_items, total_wears},
+#     most_worn: [entry, ...], least_worn: [entry, ...],   # TOP_N each, ordered
+#     updated_at
+#   }
+#   entry = {id, type, image_url, thumbnail_url, thumbnail_hash, wear_count, last_worn}
+# Writers commit their item writes through commit(), which updates the
+# summary in the same transaction, so the two can't disagree. A list only
+# needs a (TOP_N-sized) query when an item leaves it and the next one in
+# line isn't known. scripts/rebuild_stats.py recomputes it all.
+# Per-day wear counts live in wear_daily_rollups (utils/wear_rollups.py).
+STATS_COLLECTION = 'stats'
+SUMMARY_DOC = 'summary'
+
+TOP_N = 5
+
+# clothing_items fields an entry is built from
+SUMMARY_FIELDS = ['type', 'image_urls', 'thumbnail_url', 'thumbnail_hash', 'wear_count', 'last_worn']
+
+# (item data before the write, item data after it); None = absent
+ItemChange = Tuple[Optional[dict], Optional[dict]]
+
+
+def summary_ref(db: firestore.Client):
+    return db.collection(STATS_COLLECTION).document(SUMMARY_DOC)
+
+
+def summary_entry(item_data: dict) -> dict:
+    """The summary's copy of one clothing_items document (no embeddings)."""
+    return {
+        'type': item_data['type'],
+        'image_url': item_data['image_urls'][0],
+        'thumbnail_url': item_data.get('thumbnail_url'),
+        'thumbnail_hash': item_data.get('thumbnail_hash'),
+        'wear_count': item_data.get('wear_count', 0),
+        'last_worn': item_data.get('last_worn'),
+    }
+
+
+def most_worn_query(db: firestore.Client, limit: int = TOP_N):
+    """clothing_items in most_worn order (ties by id)."""
+    return db.collection('clothing_items').select(SUMMARY_FIELDS) \
+        .order_by('wear_count', direction=firestore.Query.DESCENDING) \
+        .order_by('__name__').limit(limit)
+
+
+def least_worn_query(db: firestore.Client, limit: int = TOP_N):
+    """clothing_items in least_worn order (ties by id)."""
+    return db.collection('clothing_items').select(SUMMARY_FIELDS) \
+        .order_by('wear_count').order_by('__name__').limit(limit)
+
+
+def compute_summary(db: firestore.Client) -> dict:
+    """
+    Build the summary from clothing_items without loading every item.
+
+    Totals are server-side count()/sum() aggregations and the lists are
+    ordered limit(TOP_N) queries, so the cost follows TOP_N, not the
+    wardrobe size.
+
+    Returns:
+        Summary dict (as stored, minus updated_at)
+    """
+    items = db.collection('clothing_items')
+
+    counts, total_wears = {}, 0
+    for item_type in ('shirt', 'pants'):
+        aggregation = items.where('type', '==', item_type) \
+            .count(alias='items').sum('wear_count', alias='wears')
+        result = {r.alias: r.value for r in aggregation.get()[0]}
+        counts[item_type] = int(result['items'])
+        total_wears += int(result['wears'] or 0)
+
+    return {
+        'totals': {
+            'total_shirts': counts['shirt'],
+            'total_pants': counts['pants'],
+            'total_items': counts['shirt'] + counts['pants'],
+            'total_wears': total_wears,
+        },
+        'most_worn': _entries(most_worn_query(db).stream()),
+        'least_worn': _entries(least_worn_query(db).stream()),
+    }
+
+
+def rebuild_summary(db: firestore.Client) -> dict:
+    """Recompute the summary and overwrite the stored document."""
+    summary = compute_summary(db)
+    summary_ref(db).set({**summary, 'updated_at': firestore.SERVER_TIMESTAMP})
+    return summary
+
+
+def commit(db: firestore.Client, write: Callable[[firestore.Transaction], None],
+           changes: Dict[str, ItemChange]) -> None:
+    """
+    Commit an item write together with its summary update, in one transaction.
+
+    Args:
+        db: Firestore client
+        write: Adds the caller's writes to the transaction it is given (the
+            same set/update/delete calls as on a WriteBatch). It may run more
+            than once if the transaction is retried.
+        changes: item_id -> (data before, data after) for every item the
+            write creates, updates or deletes. After-data must hold real
+            values, not Increment / SERVER_TIMESTAMP sentinels.
+
+    A missing summary is left missing, so /statistics keeps computing from
+    scratch until scripts/rebuild_stats.py creates it.
+    """
+    _commit_in_transaction(db.transaction(), db, write, changes)
+
+
+@firestore.transactional
+def _commit_in_transaction(transaction, db, write, changes) -> None:
+    # Firestore transactions take every read before the first write
+    ref = summary_ref(db)
+    snapshot = ref.get(transaction=transaction)
+    summary = None
+    if snapshot.exists:
+        summary = _apply_changes(snapshot.to_dict(), changes,
+                                 lambda query: list(transaction.get(query)), db)
+
+    write(transaction)
+    if summary is not None:
+        transaction.set(ref, {**summary, 'updated_at': firestore.SERVER_TIMESTAMP})
+
+
+def _apply_changes(summary: dict, changes: Dict[str, ItemChange],
+                   read: Callable, db: firestore.Client) -> dict:
+    """
+    The summary after ``changes``.
+
+    Args:
+        summary: Stored summary
+        changes: As for commit()
+        read: Runs a query and returns its document snapshots (in the
+            transaction); only called when a list has to be refilled
+        db: Firestore client the refill queries are built on
+    """
+    totals = dict(summary['totals'])
+    for before, after in changes.values():
+        for data, sign in ((before, -1), (after, 1)):
+            if data is None:
+                continue
+            totals['total_shirts' if data['type'] == 'shirt' else 'total_pants'] += sign
+            totals['total_items'] += sign
+            totals['total_wears'] += sign * data.get('wear_count', 0)
+
+    entries = {item_id: (summary_entry(after) if after is not None else None)
+               for item_id, (_, after) in changes.items()}
+    return {
+        'totals': totals,
+        'most_worn': _updated_list(summary['most_worn'], entries, _most_worn_key,
+                                   lambda n: _entries(read(most_worn_query(db, n)))),
+        'least_worn': _updated_list(summary['least_worn'], entries, _least_worn_key,
+                                    lambda n: _entries(read(least_worn_query(db, n)))),
+    }
+
+
+def _updated_list(current: List[dict], entries: Dict[str, Optional[dict]],
+                  key: Callable, refill: Callable[[int], List[dict]]) -> List[dict]:
+    """
+    One ordered TOP_N list after entry upserts / removals (None = removed).
+
+    Every item outside a full list sorts after its last entry, so the
+    updated list is exact whenever its TOP_N-th candidate still sorts no
+    later than that. Otherwise (an item left the list) it is refilled from
+    the top TOP_N + len(entries) items as stored before this write.
+    """
+    changed = [{'id': item_id, **entry} for item_id, entry in entries.items() if entry is not None]
+    candidates = sorted([e for e in current if e['id'] not in entries] + changed, key=key)
+
+    if len(current) >= TOP_N:
+        boundary = key(current[-1])
+        if len(candidates) < TOP_N or key(candidates[TOP_N - 1]) > boundary:
+            stored = [e for e in refill(TOP_N + len(entries)) if e['id'] not in entries]
+            candidates = sorted(stored + changed, key=key)
+
+    return candidates[:TOP_N]
+
+
+def _most_worn_key(entry: dict):
+    return -entry.get('wear_count', 0), entry['id']
+
+
+def _least_worn_key(entry: dict):
+    return entry.get('wear_count', 0), entry['id']
+
+
+def _entries(docs) -> List[dict]:
+    return [{'id': doc.id, **summary_entry(doc.to_dict())} for doc in docs]
+
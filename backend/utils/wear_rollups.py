@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+from google.cloud import firestore
+
+
+# Per-day wear counts, one small document per UTC day:
+#   wear_daily_rollups/{YYYY-MM-DD} = {date, total, by_type: {shirt, pants}, updated_at}
+# Writers bump them with firestore.Increment in the same batch as the
+# wear_logs write, so the wear_frequency chart reads at most one document per
+# day of its window instead of every log. scripts/backfill_wear_rollups.py
+# builds them from existing logs.
+ROLLUPS_COLLECTION = 'wear_daily_rollups'
+
+MAX_WINDOW_DAYS = 365
+
+
+def day_key(worn_at: Optional[datetime] = None) -> str:
+    """Rollup document ID (UTC day) for a wear timestamp (None = now; naive = UTC)."""
+    worn_at = worn_at or datetime.now(timezone.utc)
+    if worn_at.tzinfo is not None:
+        worn_at = worn_at.astimezone(timezone.utc)
+    return worn_at.date().isoformat()
+
+
+def rollup_ref(db: firestore.Client, date_str: str):
+    return db.collection(ROLLUPS_COLLECTION).document(date_str)
+
+
+def record_wears(db: firestore.Client, item_type: str,
+                 worn_at: Iterable[Optional[datetime]], delta: int = 1,
+                 batch=None) -> None:
+    """
+    Add (or with delta=-1, remove) wears to their days' rollups.
+
+    Args:
+        db: Firestore client
+        item_type: 'shirt' or 'pants'
+        worn_at: One timestamp per wear log (None = now)
+        delta: +1 per log written, -1 per log deleted
+        batch: WriteBatch to add the increments to, so they commit together
+            with the wear_logs writes (optional; written immediately if None)
+    """
+    per_day = {}
+    for ts in worn_at:
+        date_str = day_key(ts)
+        per_day[date_str] = per_day.get(date_str, 0) + delta
+
+    for date_str, count in per_day.items():
+        data = {
+            'date': date_str,
+            'total': firestore.Increment(count),
+            'by_type': {item_type: firestore.Increment(count)},
+            'updated_at': firestore.SERVER_TIMESTAMP,
+        }
+        ref = rollup_ref(db, date_str)
+        if batch is not None:
+            batch.set(ref, data, merge=True)
+        else:
+            ref.set(data, merge=True)
+
+
+def get_wear_frequency(db: firestore.Client, days: int = 30,
+                       item_type: Optional[str] = None) -> Dict[str, int]:
+    """
+    Wears per day over the last ``days`` days.
+
+    Args:
+        db: Firestore client
+        days: Window length (1 .. MAX_WINDOW_DAYS)
+        item_type: Count only this type (optional)
+
+    Returns:
+        Date string -> wear count (days without wears are omitted)
+    """
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    docs = db.collection(ROLLUPS_COLLECTION) \
+        .where('date', '>=', since.date().isoformat()).stream()
+
+    frequency = {}
+    for doc in docs:
+        data = doc.to_dict()
+        count = data.get('by_type', {}).get(item_type, 0) if item_type else data.get('total', 0)
+        if count > 0:
+            frequency[data['date']] = count
+    if frequency:
+        return frequency
+
+    # Nothing rolled up in the window: either there were no wears (and this
+    # scan reads nothing) or the backfill hasn't run yet
+    query = db.collection('wear_logs').where('worn_at', '>=', since)
+    for log in query.stream():
+        log_data = log.to_dict()
+        if item_type and log_data.get('item_type') != item_type:
+            continue
+        date_str = day_key(log_data['worn_at'])
+        frequency[date_str] = frequency.get(date_str, 0) + 1
+    return frequency
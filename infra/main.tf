@@ -37,6 +37,11 @@ resource "google_project_service" "cloudbuild" {
   disable_on_destroy = false
 }
 
+resource "google_project_service" "secretmanager" {
+  service            = "secretmanager.googleapis.com"
+  disable_on_destroy = false
+}
+
 # --- Service Account ---
 
 resource "google_service_account" "main" {
@@ -64,6 +69,29 @@ resource "google_project_iam_member" "run_developer" {
   member  = "serviceAccount:${google_service_account.main.email}"
 }
 
+# --- URL signing key ---
+# Holds a service-account JSON key so functions sign URLs locally instead of
+# one IAM signBlob call per URL. Add the key as a version out of band:
+#   gcloud iam service-accounts keys create /dev/stdout --iam-account=SA \
+#     | gcloud secrets versions add url-signing-key --data-file=-
+
+resource "google_secret_manager_secret" "url_signing_key" {
+  secret_id = "url-signing-key"
+
+  replication {
+    auto {}
+  }
+
+  depends_on = [google_project_service.secretmanager]
+}
+
+# Functions deploy with the default compute service account
+resource "google_secret_manager_secret_iam_member" "url_signing_key_accessor" {
+  secret_id = google_secret_manager_secret.url_signing_key.id
+  role      = "roles/secretmanager.secretAccessor"
+  member    = "serviceAccount:${var.project_number}-compute@developer.gserviceaccount.com"
+}
+
 # --- Firestore Database ---
 
 resource "google_firestore_database" "default" {
@@ -75,6 +103,92 @@ resource "google_firestore_database" "default" {
   depends_on = [google_project_service.firestore]
 }
 
+# Expire content-hash embedding cache entries (backend/embeddings/embedding_cache.py)
+resource "google_firestore_field" "embedding_cache_ttl" {
+  database   = google_firestore_database.default.name
+  collection = "embedding_cache"
+  field      = "expires_at"
+
+  ttl_config {}
+
+  # TTL fields don't need single-field indexes
+  index_config {}
+}
+
+# Expire Gemini detection cache entries (backend/gemini/detection_cache.py)
+resource "google_firestore_field" "detection_cache_ttl" {
+  database   = google_firestore_database.default.name
+  collection = "detection_cache"
+  field      = "expires_at"
+
+  ttl_config {}
+
+  index_config {}
+}
+
+# Paginated /list-items?type=...: type filter, newest-worn first, id tiebreak
+resource "google_firestore_index" "clothing_items_by_type_last_worn" {
+  database   = google_firestore_database.default.name
+  collection = "clothing_items"
+
+  fields {
+    field_path = "type"
+    order      = "ASCENDING"
+  }
+
+  fields {
+    field_path = "last_worn"
+    order      = "DESCENDING"
+  }
+
+  fields {
+    field_path = "__name__"
+    order      = "DESCENDING"
+  }
+}
+
+# /statistics most-worn fallback query: wear_count DESC, id tiebreak
+resource "google_firestore_index" "clothing_items_by_wear_count" {
+  database   = google_firestore_database.default.name
+  collection = "clothing_items"
+
+  fields {
+    field_path = "wear_count"
+    order      = "DESCENDING"
+  }
+
+  fields {
+    field_path = "__name__"
+    order      = "ASCENDING"
+  }
+}
+
+# Embedding samples split off clothing_items (backend/embeddings/embedding_store.py)
+# Index replays: type filter + updated_at range
+resource "google_firestore_index" "item_embeddings_by_type_updated_at" {
+  database   = google_firestore_database.default.name
+  collection = "item_embeddings"
+
+  fields {
+    field_path = "type"
+    order      = "ASCENDING"
+  }
+
+  fields {
+    field_path = "updated_at"
+    order      = "ASCENDING"
+  }
+}
+
+# The sample vectors are never queried; skip indexing ~14k floats per write
+resource "google_firestore_field" "item_embeddings_vectors" {
+  database   = google_firestore_database.default.name
+  collection = "item_embeddings"
+  field      = "embeddings"
+
+  index_config {}
+}
+
 # --- Cloud Storage Bucket ---
 
 resource "google_storage_bucket" "app" {
@@ -11,6 +11,7 @@
 #   1: process-outfit    2: confirm-match      3: add-new-item
 #   4: statistics        5: get-item-images    6: delete-item-image
 #   7: process-manual-crop                     8: list-items
+#   9: process-outfit-batch
 
 set -e
 
@@ -37,6 +38,15 @@ for var in GCP_PROJECT_ID GEMINI_API_KEY STORAGE_BUCKET GCP_REGION API_KEY; do
   fi
 done
 
+# Optional: mount the URL signing key (Secret Manager) so functions that sign
+# URLs do it locally instead of calling IAM signBlob per URL
+SIGNING_FLAGS=()
+SIGNING_ENV=""
+if [ -n "$SIGNING_KEY_SECRET" ]; then
+  SIGNING_FLAGS=(--set-secrets="/etc/secrets/signing/key.json=${SIGNING_KEY_SECRET}:latest")
+  SIGNING_ENV=",SIGNING_KEY_FILE=/etc/secrets/signing/key.json"
+fi
+
 DEPLOYED=0
 
 deploy() {
@@ -62,7 +72,7 @@ should_deploy() {
   return 1
 }
 
-ALL_FUNCTIONS=(process-outfit confirm-match add-new-item statistics get-item-images delete-item-image process-manual-crop list-items)
+ALL_FUNCTIONS=(process-outfit confirm-match add-new-item statistics get-item-images delete-item-image process-manual-crop list-items process-outfit-batch)
 
 # Collect target functions from arguments, expanding N+ ranges
 TARGETS=()
@@ -118,7 +128,8 @@ should_deploy process-outfit && deploy process-outfit \
   --memory=1GB \
   --max-instances=1 \
   --concurrency=1 \
-  --set-env-vars GCP_PROJECT_ID=$GCP_PROJECT_ID,GEMINI_API_KEY=$GEMINI_API_KEY,STORAGE_BUCKET=$STORAGE_BUCKET,GCP_REGION=$GCP_REGION,API_KEY=$API_KEY
+  --set-env-vars GCP_PROJECT_ID=$GCP_PROJECT_ID,GEMINI_API_KEY=$GEMINI_API_KEY,STORAGE_BUCKET=$STORAGE_BUCKET,GCP_REGION=$GCP_REGION,API_KEY=$API_KEY${SIGNING_ENV} \
+  "${SIGNING_FLAGS[@]}"
 
 should_deploy confirm-match && deploy confirm-match \
   --gen2 \
@@ -132,7 +143,7 @@ should_deploy confirm-match && deploy confirm-match \
   --memory=256MB \
   --max-instances=1 \
   --concurrency=1 \
-  --set-env-vars GCP_PROJECT_ID=$GCP_PROJECT_ID,API_KEY=$API_KEY
+  --set-env-vars GCP_PROJECT_ID=$GCP_PROJECT_ID,STORAGE_BUCKET=$STORAGE_BUCKET,API_KEY=$API_KEY
 
 should_deploy add-new-item && deploy add-new-item \
   --gen2 \
@@ -146,7 +157,7 @@ should_deploy add-new-item && deploy add-new-item \
   --memory=256MB \
   --max-instances=1 \
   --concurrency=1 \
-  --set-env-vars GCP_PROJECT_ID=$GCP_PROJECT_ID,API_KEY=$API_KEY
+  --set-env-vars GCP_PROJECT_ID=$GCP_PROJECT_ID,STORAGE_BUCKET=$STORAGE_BUCKET,API_KEY=$API_KEY
 
 should_deploy statistics && deploy statistics \
   --gen2 \
@@ -160,7 +171,8 @@ should_deploy statistics && deploy statistics \
   --memory=256MB \
   --max-instances=1 \
   --concurrency=1 \
-  --set-env-vars GCP_PROJECT_ID=$GCP_PROJECT_ID,STORAGE_BUCKET=$STORAGE_BUCKET,API_KEY=$API_KEY
+  --set-env-vars GCP_PROJECT_ID=$GCP_PROJECT_ID,STORAGE_BUCKET=$STORAGE_BUCKET,API_KEY=$API_KEY${SIGNING_ENV} \
+  "${SIGNING_FLAGS[@]}"
 
 should_deploy get-item-images && deploy get-item-images \
   --gen2 \
@@ -174,7 +186,8 @@ should_deploy get-item-images && deploy get-item-images \
   --memory=256MB \
   --max-instances=1 \
   --concurrency=1 \
-  --set-env-vars GCP_PROJECT_ID=$GCP_PROJECT_ID,STORAGE_BUCKET=$STORAGE_BUCKET,API_KEY=$API_KEY
+  --set-env-vars GCP_PROJECT_ID=$GCP_PROJECT_ID,STORAGE_BUCKET=$STORAGE_BUCKET,API_KEY=$API_KEY${SIGNING_ENV} \
+  "${SIGNING_FLAGS[@]}"
 
 should_deploy delete-item-image && deploy delete-item-image \
   --gen2 \
@@ -202,7 +215,8 @@ should_deploy process-manual-crop && deploy process-manual-crop \
   --memory=1GB \
   --max-instances=1 \
   --concurrency=1 \
-  --set-env-vars GCP_PROJECT_ID=$GCP_PROJECT_ID,GEMINI_API_KEY=$GEMINI_API_KEY,STORAGE_BUCKET=$STORAGE_BUCKET,GCP_REGION=$GCP_REGION,API_KEY=$API_KEY
+  --set-env-vars GCP_PROJECT_ID=$GCP_PROJECT_ID,GEMINI_API_KEY=$GEMINI_API_KEY,STORAGE_BUCKET=$STORAGE_BUCKET,GCP_REGION=$GCP_REGION,API_KEY=$API_KEY${SIGNING_ENV} \
+  "${SIGNING_FLAGS[@]}"
 
 should_deploy list-items && deploy list-items \
   --gen2 \
@@ -216,7 +230,24 @@ should_deploy list-items && deploy list-items \
   --memory=256MB \
   --max-instances=1 \
   --concurrency=1 \
-  --set-env-vars GCP_PROJECT_ID=$GCP_PROJECT_ID,STORAGE_BUCKET=$STORAGE_BUCKET,API_KEY=$API_KEY
+  --set-env-vars GCP_PROJECT_ID=$GCP_PROJECT_ID,STORAGE_BUCKET=$STORAGE_BUCKET,API_KEY=$API_KEY${SIGNING_ENV} \
+  "${SIGNING_FLAGS[@]}"
+
+# Streams one result line per photo; long timeout for large imports
+should_deploy process-outfit-batch && deploy process-outfit-batch \
+  --gen2 \
+  --runtime=python311 \
+  --region=us-central1 \
+  --source="$BACKEND_DIR" \
+  --entry-point=process_outfit_batch_handler \
+  --trigger-http \
+  --allow-unauthenticated \
+  --timeout=900s \
+  --memory=2GB \
+  --max-instances=1 \
+  --concurrency=1 \
+  --set-env-vars GCP_PROJECT_ID=$GCP_PROJECT_ID,GEMINI_API_KEY=$GEMINI_API_KEY,STORAGE_BUCKET=$STORAGE_BUCKET,GCP_REGION=$GCP_REGION,API_KEY=$API_KEY${SIGNING_ENV} \
+  "${SIGNING_FLAGS[@]}"
 
 echo ""
 echo "Done! $DEPLOYED function(s) deployed."